@@ -0,0 +1,244 @@
+"""
+Shared stand-ins for the benchmarks - a stub chat model that returns canned
+JSON after a configurable delay, an in-memory Firestore and frame corpora,
+so runs need no API key or network
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from langchain_core.messages import AIMessage
+
+# Mirror the consumer container layout, where core/ is the working directory
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core")
+if CORE_DIR not in sys.path:
+    sys.path.insert(0, CORE_DIR)
+
+FIRE_JPG = os.path.join(CORE_DIR, "agent", "fire.jpg")
+
+NORMAL_VERDICT = {
+    "is_problem": False,
+    "incident_type": "normal",
+    "severity": "low",
+    "confidence": 0.95,
+    "description": "People are walking through the corridor normally",
+    "recommended_action": "No action needed",
+    "people_count": 3,
+    "additional_concerns": []
+}
+
+
+class StubChatModel:
+    """Chat model double: sleeps for `latency` seconds and returns canned output"""
+
+    def __init__(self, latency: float = 0.0, verdict: dict = None):
+        self.latency = latency
+        self.verdict = verdict or NORMAL_VERDICT
+        self.calls = 0
+
+    def bind_tools(self, tools):
+        return self
+
+    def _respond(self, messages):
+        self.calls += 1
+        # Analysis requests carry an image part; Firebase requests are plain text
+        if isinstance(messages[0].content, list):
+            return AIMessage(content=json.dumps(self.verdict))
+        return AIMessage(content="No action needed")
+
+    def invoke(self, messages, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def ainvoke(self, messages, *args, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+
+def stub_model_factory(latency: float = 0.0, verdict: dict = None):
+    """Factory with the AgentRuntime signature returning stub models"""
+    return lambda temperature: StubChatModel(latency, verdict)
+
+
+class _FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self._collection = collection
+        self.id = doc_id
+
+    def set(self, data):
+        self._db._write(lambda docs: docs.__setitem__(self.id, dict(data)), self._collection)
+
+    def update(self, fields):
+        self._db._write(lambda docs: docs[self.id].update(fields), self._collection)
+
+
+class _FakeQuery:
+    def __init__(self, db, collection, filters=()):
+        self._db = db
+        self._collection = collection
+        self._filters = filters
+
+    def where(self, field, op, value):
+        if op != "==":
+            raise NotImplementedError(f"FakeFirestore only supports '==' filters, not {op!r}")
+        return _FakeQuery(self._db, self._collection, self._filters + ((field, value),))
+
+    def stream(self):
+        self._db._round_trip()
+        with self._db._lock:
+            docs = list(self._db._collections.get(self._collection, {}).items())
+        return iter([
+            _FakeSnapshot(doc_id, data) for doc_id, data in docs
+            if all(data.get(field) == value for field, value in self._filters)
+        ])
+
+    def on_snapshot(self, callback):
+        # Nothing else writes to the fake, so there are never changes to deliver
+        return _FakeWatch()
+
+
+class _FakeWatch:
+    def unsubscribe(self):
+        pass
+
+
+class _FakeCollection(_FakeQuery):
+    def add(self, data):
+        doc = self.document()
+        doc.set(data)
+        return None, doc
+
+    def document(self, doc_id=None):
+        return _FakeDocument(self._db, self._collection, doc_id or f"doc{next(self._db._ids)}")
+
+
+class _FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+        self._updates = []
+        self._sets = set()
+
+    def set(self, ref, data):
+        self._writes.append((ref.id, ref._collection, lambda docs, i=ref.id, d=dict(data): docs.__setitem__(i, d)))
+        self._sets.add((ref.id, ref._collection))
+
+    def update(self, ref, fields):
+        self._writes.append((ref.id, ref._collection, lambda docs, i=ref.id, f=fields: docs[i].update(f)))
+        self._updates.append((ref.id, ref._collection))
+
+    def commit(self):
+        self._db._round_trip()
+        with self._db._lock:
+            # Atomic like Firestore: an update of a missing document fails the whole batch
+            for doc_id, collection in self._updates:
+                if doc_id not in self._db._collections.get(collection, {}) and (doc_id, collection) not in self._sets:
+                    raise KeyError(f"No document to update: {collection}/{doc_id}")
+            for _, collection, write in self._writes:
+                write(self._db._collections.setdefault(collection, {}))
+        self._db.batches += 1
+
+
+class FakeFirestore:
+    """
+    In-memory Firestore client covering what firebase_tools uses: add, set,
+    update, equality queries, batches and (silent) snapshot listeners. Every
+    round trip sleeps for `latency` seconds.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.round_trips = 0
+        self.batches = 0
+        self._collections = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _write(self, apply, collection):
+        self._round_trip()
+        with self._lock:
+            apply(self._collections.setdefault(collection, {}))
+
+    def collection(self, name):
+        return _FakeCollection(self, name)
+
+    def batch(self):
+        return _FakeBatch(self)
+
+    def documents(self, collection) -> dict:
+        """Every stored document of a collection, by id"""
+        with self._lock:
+            return {doc_id: dict(data) for doc_id, data in self._collections.get(collection, {}).items()}
+
+
+def synthetic_frames(count, empty_share, seed=0):
+    """(location, jpeg bytes) pairs: noisy empty scenes mixed with the fire frame"""
+    from agent.imaging import encode_jpeg
+
+    rng = np.random.default_rng(seed)
+    with open(FIRE_JPG, "rb") as f:
+        fire = f.read()
+
+    frames = []
+    for i in range(count):
+        location = f"Camera {i % 8}"
+        if rng.random() >= empty_share:
+            frames.append((location, fire))
+            continue
+        wall = rng.integers(60, 200, size=3)
+        floor = rng.integers(20, 90, size=3)
+        scene = np.empty((720, 1280, 3), dtype=np.float32)
+        horizon = int(rng.integers(300, 500))
+        scene[:horizon] = wall
+        scene[horizon:] = floor
+        scene += rng.normal(0, 6, scene.shape)
+        frames.append((location, encode_jpeg(Image.fromarray(np.clip(scene, 0, 255).astype(np.uint8)), 90)))
+    return frames
+
+
+def recorded_frames(root):
+    """(location, bytes) pairs from root/<camera>/<frame>, in name order"""
+    frames = []
+    for camera in sorted(os.listdir(root)):
+        directory = os.path.join(root, camera)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, name), "rb") as f:
+                frames.append((camera, f.read()))
+    return frames
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
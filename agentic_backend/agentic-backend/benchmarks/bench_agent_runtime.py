@@ -0,0 +1,88 @@
+"""
+Per-frame agent overhead: rebuilding the graph and model clients for every
+frame versus the shared AgentRuntime.
+
+Usage:
+    python benchmarks/bench_agent_runtime.py --frames 200
+    python benchmarks/bench_agent_runtime.py --real-clients   # also construct real Gemini clients
+
+The model itself is stubbed (zero latency), so the numbers are pure overhead.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from _stubs import FIRE_JPG, StubChatModel, percentile, stub_model_factory
+
+from agent.agent import (
+    FIREBASE_TOOLS,
+    build_initial_state,
+    create_security_monitoring_agent,
+    get_security_monitoring_agent,
+)
+from agent.runtime import AgentRuntime
+
+
+def real_client_factory(temperature):
+    """Construct a real Gemini client (no request is sent) and hand back a stub"""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    ChatGoogleGenerativeAI(
+        model=os.getenv("LLM_MODEL", "gemini-2.0-flash-exp"),
+        temperature=temperature,
+        google_api_key=os.getenv("GOOGLE_API_KEY", "benchmark-key")
+    )
+    return StubChatModel()
+
+
+def run_per_frame(frames, factory):
+    """Old behaviour: compile the graph and build clients for each frame"""
+    timings = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        agent = create_security_monitoring_agent()
+        runtime = AgentRuntime(model_factory=factory, pool_size=1, tools=FIREBASE_TOOLS)
+        agent.invoke(build_initial_state(FIRE_JPG, location="Bench"), config=runtime.config())
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_shared(frames, factory):
+    """Shared compiled graph and warmed runtime"""
+    agent = get_security_monitoring_agent()
+    runtime = AgentRuntime(model_factory=factory, tools=FIREBASE_TOOLS)
+    runtime.warm_up()
+
+    timings = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        agent.invoke(build_initial_state(FIRE_JPG, location="Bench"), config=runtime.config())
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    ms = [t * 1000 for t in timings]
+    print(f"{name:<12} mean {statistics.mean(ms):7.2f} ms   p50 {percentile(ms, 50):7.2f} ms   "
+          f"p95 {percentile(ms, 95):7.2f} ms")
+    return statistics.mean(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--real-clients", action="store_true",
+                        help="construct real ChatGoogleGenerativeAI clients instead of bare stubs")
+    args = parser.parse_args()
+
+    factory = real_client_factory if args.real_clients else stub_model_factory()
+
+    before = report("per-frame", run_per_frame(args.frames, factory))
+    after = report("shared", run_shared(args.frames, factory))
+    print(f"overhead saved per frame: {before - after:.2f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Frame archiving: one image file per frame (the consumer's old archive_frame)
+against the packed segment archive, on the frame's thread and for reading back.
+
+Usage:
+    python benchmarks/bench_archive.py
+    python benchmarks/bench_archive.py --frames 20000 --threads 8 --frame-kb 120 --dir /mnt/disk/bench
+
+Reported: wall-clock cost of archiving on the frame's own thread (p50/p99),
+files created, how long the packed writer took to finish after the last
+frame was queued, time to list the directory, and random reads of 500 frames
+(open + read per file, against checksummed mmap slices). The packed archive
+also reports 500 index lookups by camera and time, which files named only by
+arrival time cannot answer without a directory scan. Use --dir on the disk
+the consumer writes to; a tmpfs hides most of the file-per-frame cost.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from _stubs import percentile
+
+from frame_archive import FrameArchive, FrameArchiveReader
+
+READS = 500
+
+
+def write_file(directory, image_bytes):
+    """What archive_frame did for every frame before"""
+    suffix = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+    image_path = os.path.join(directory, f"image_{suffix}.jpg")
+    with open(image_path, "wb") as f:
+        f.write(image_bytes)
+    return image_path
+
+
+def run_frames(frames, threads, archive_one):
+    """Archive `frames` frames from `threads` threads; returns per-call milliseconds"""
+    latencies = [[] for _ in range(threads)]
+
+    def worker(index):
+        for i in range(index, frames, threads):
+            started = time.perf_counter()
+            archive_one(i)
+            latencies[index].append(1000 * (time.perf_counter() - started))
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return [ms for per_thread in latencies for ms in per_thread]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return value, 1000 * (time.perf_counter() - started)
+
+
+def bench_files(root, args, payloads):
+    directory = os.path.join(root, "files")
+    os.makedirs(directory)
+    paths = [None] * args.frames
+
+    def archive_one(i):
+        paths[i] = write_file(directory, payloads[i % len(payloads)])
+
+    latencies = run_frames(args.frames, args.threads, archive_one)
+    listed, list_ms = timed(lambda: len(os.listdir(directory)))
+
+    def read_back():
+        for path in random.sample(paths, min(READS, len(paths))):
+            with open(path, "rb") as f:
+                f.read()
+
+    _, read_ms = timed(read_back)
+    return latencies, listed, 0.0, list_ms, read_ms, None
+
+
+def bench_packed(root, args, payloads):
+    directory = os.path.join(root, "packed")
+    archive = FrameArchive(directory, segment_bytes=args.segment_mb * 1024 * 1024,
+                           queue_frames=args.frames)  # no drops, so both sides store every frame
+    start = time.time()
+
+    def archive_one(i):
+        archive.archive(payloads[i % len(payloads)], "image/jpeg", f"Camera {i % 16}", start + i / 30)
+
+    latencies = run_frames(args.frames, args.threads, archive_one)
+    _, drain_ms = timed(archive.close)
+    listed, list_ms = timed(lambda: len(os.listdir(directory)))
+
+    reader = FrameArchiveReader(directory)
+    # The first pass reads the indexes; later lookups hit the cached ones
+    frames = reader.find()
+    sample = random.sample(range(args.frames), min(READS, args.frames))
+
+    def look_up():
+        for i in sample:
+            reader.find(location=f"Camera {i % 16}", start=start + i / 30, end=start + i / 30 + 1 / 60)
+
+    def read_back():
+        for i in sample:
+            reader.read(frames[i])
+
+    _, lookup_ms = timed(look_up)
+    _, read_ms = timed(read_back)
+    reader.close()
+    return latencies, listed, drain_ms, list_ms, read_ms, lookup_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--frame-kb", type=int, default=80)
+    parser.add_argument("--segment-mb", type=int, default=256)
+    parser.add_argument("--dir", help="directory to write under (default: a temporary directory)")
+    args = parser.parse_args()
+
+    payloads = [os.urandom(args.frame_kb * 1024) for _ in range(8)]
+    root = tempfile.mkdtemp(prefix="bench-archive-", dir=args.dir)
+    print(f"{args.frames} frames of {args.frame_kb} KB from {args.threads} threads under {root}")
+    print(f"{'':<16}{'p50 ms':>9}{'p99 ms':>9}{'files':>9}{'drain ms':>10}{'list ms':>9}{'read ms':>9}"
+          f"{'lookup ms':>11}")
+    try:
+        for name, bench in (("file per frame", bench_files), ("packed", bench_packed)):
+            latencies, files, drain_ms, list_ms, read_ms, lookup_ms = bench(root, args, payloads)
+            print(f"{name:<16}{percentile(latencies, 50):>9.3f}{percentile(latencies, 99):>9.3f}"
+                  f"{files:>9}{drain_ms:>10.0f}{list_ms:>9.1f}{read_ms:>9.1f}"
+                  + (f"{lookup_ms:>11.1f}" if lookup_ms is not None else f"{'-':>11}"))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-frame CPU and memory of getting a Kafka frame into a model request:
+the old disk round trip (decode, re-encode, write, re-open, read, base64)
+versus the in-memory path (pass JPEG through, base64 once).
+
+Usage:
+    python benchmarks/bench_image_path.py --frames 200 [--image path/to/frame.jpg]
+
+CPU is process time per frame; memory is the tracemalloc peak per frame
+(Python-level buffers only, Pillow's decode buffers are not included).
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from PIL import Image
+
+from _stubs import FIRE_JPG
+
+from agent.imaging import flatten_to_rgb, prepare_image_bytes, to_data_url
+
+
+def legacy_path(image_bytes, tmp_dir):
+    """The pre-change pipeline from consumer_service.process_image and agent.py"""
+    image_path = os.path.join(tmp_dir, "frame.jpg")
+    flatten_to_rgb(Image.open(BytesIO(image_bytes))).save(image_path, format="JPEG")
+    Image.open(image_path)  # load_and_validate_image
+    with open(image_path, "rb") as f:  # encode_image_to_base64
+        data = base64.b64encode(f.read()).decode("utf-8")
+    os.remove(image_path)
+    return f"data:image/jpeg;base64,{data}"
+
+
+def in_memory_path(image_bytes, tmp_dir):
+    """Current pipeline: bytes stay in memory end to end"""
+    data, mime = prepare_image_bytes(image_bytes)
+    Image.open(BytesIO(data))  # load_and_validate_image only parses the header
+    return to_data_url(data, mime)
+
+
+def measure(fn, image_bytes, frames, tmp_dir):
+    fn(image_bytes, tmp_dir)  # warm-up
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(frames):
+        fn(image_bytes, tmp_dir)
+    cpu = (time.process_time() - cpu_start) / frames
+    wall = (time.perf_counter() - wall_start) / frames
+
+    tracemalloc.start()
+    fn(image_bytes, tmp_dir)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--image", default=FIRE_JPG)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+    print(f"frame: {args.image} ({len(image_bytes) / 1024:.0f} KB)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, fn in (("disk round trip", legacy_path), ("in-memory", in_memory_path)):
+            cpu, wall, peak = measure(fn, image_bytes, args.frames, tmp_dir)
+            print(f"{name:<16} cpu {cpu * 1000:7.2f} ms   wall {wall * 1000:7.2f} ms   "
+                  f"peak py mem {peak / 1024:8.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
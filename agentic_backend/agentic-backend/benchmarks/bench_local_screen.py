@@ -0,0 +1,71 @@
+"""
+Local CPU screen: throughput per core and LLM calls avoided on a frame replay.
+
+Usage:
+    python benchmarks/bench_local_screen.py                        # synthetic replay
+    python benchmarks/bench_local_screen.py --frames-dir recorded/ # one subdirectory per camera
+
+The synthetic replay mixes empty scenes (plain walls and floors with sensor
+noise) with the fire sample frame; --empty-share sets the mix. Frames go
+through the full graph with a stub model, once with the screen off and once
+on, and the model calls of both runs are compared. Open-incident lookups are
+stubbed to "none open" so the screen is free to skip frames.
+
+Throughput is single-threaded process time, i.e. frames per second per core.
+"""
+
+import argparse
+import time
+
+from _stubs import StubChatModel, recorded_frames, synthetic_frames
+
+import agent.agent as agent_module
+from agent.agent import FIREBASE_TOOLS, monitor_security_image
+from agent.local_screen import LocalScreen
+from agent.runtime import AgentRuntime
+
+
+def throughput(screen, frames):
+    """Frames per second per core of LocalScreen.screen"""
+    start = time.process_time()
+    for _, data in frames:
+        screen.screen(data)
+    return len(frames) / (time.process_time() - start)
+
+
+def replay(frames, local_screen):
+    """Model calls made when every frame goes through the graph"""
+    model = StubChatModel()
+    runtime = AgentRuntime(
+        model_factory=lambda temperature: model, pool_size=1, tools=FIREBASE_TOOLS, local_screen=local_screen,
+        result_cache=False  # replayed frames repeat, every one must reach the screen and model
+    )
+    for location, data in frames:
+        monitor_security_image(image_bytes=data, location=location, organization_id="bench", runtime=runtime)
+    return model.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--empty-share", type=float, default=0.7)
+    parser.add_argument("--frames-dir")
+    args = parser.parse_args()
+
+    frames = recorded_frames(args.frames_dir) if args.frames_dir else synthetic_frames(args.frames, args.empty_share)
+    screen = LocalScreen()
+    agent_module.find_open_incidents = lambda location, organization_id=None, incident_type=None: []
+
+    print(f"replaying {len(frames)} frames")
+    print(f"local screen: {throughput(screen, frames):.1f} frames/s per core "
+          f"(HOG people detector: {'on' if screen.people_detector else 'off - OpenCV missing'})")
+
+    baseline = replay(frames, local_screen=False)
+    cascaded = replay(frames, local_screen=screen)
+    print(f"LLM calls without screen: {baseline}")
+    print(f"LLM calls with screen:    {cascaded} "
+          f"({baseline - cascaded} avoided, {100 * (baseline - cascaded) / max(baseline, 1):.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Per-frame logging cost on the frame's own thread: the old print() banner and
+synchronous handlers against the background text/JSON handlers, with and
+without sampling.
+
+Usage:
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --frames 20000 --threads 8 --sample-rate 0.05
+
+Each frame logs what the consumer and the agent log for an analysed frame.
+Output goes to line-buffered files, like the containers' unbuffered stdout
+(PYTHONUNBUFFERED=1). Reported: CPU microseconds of logging per frame on the
+frame's thread, records the background handlers dropped because their queue
+was full (frames are logged back to back here, far above a real frame rate),
+and how long the writer threads took to catch up afterwards.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from _stubs import NORMAL_VERDICT
+
+from structured_logging import TEXT_FORMAT, build_logging_config, log_context
+
+consumer_log = logging.getLogger("consumer_service")
+agent_log = logging.getLogger("agent.agent")
+
+
+def print_banner(out, timestamp, result):
+    """What apply_verdict printed for every frame before"""
+    print(f"\n{'='*60}", file=out)
+    print(f"SECURITY ANALYSIS - {timestamp}", file=out)
+    print(f"{'='*60}", file=out)
+    print(f"Status: {'⚠️  INCIDENT DETECTED' if result['is_problem'] else '✓ All Clear'}", file=out)
+    print(f"Incident Type: {result['incident_type']}", file=out)
+    print(f"Severity: {result['severity']}", file=out)
+    print(f"Confidence: {result['confidence']:.0%}", file=out)
+    print(f"People Count: {result.get('people_count', 'N/A')}", file=out)
+    print(f"\nDescription: {result['description']}", file=out)
+    print(f"\nRecommended Action: {result['recommended_action']}", file=out)
+    print(f"{'='*60}\n", file=out)
+    print("\n✓ Security monitoring complete with Firebase management", file=out)
+
+
+def log_verdict(timestamp, location, result):
+    """What apply_verdict logs now"""
+    agent_log.info(
+        f"{'⚠️ INCIDENT DETECTED' if result['is_problem'] else '✓ All clear'} at {location} "
+        f"({timestamp}): {result['incident_type']}, severity {result['severity']}, "
+        f"confidence {result['confidence']:.0%} - {result['description']}",
+        extra={"incident_type": result["incident_type"], "severity": result["severity"]}
+    )
+
+
+def run_frames(frames, threads, banner_out=None):
+    """Log `frames` frames from `threads` threads; returns CPU seconds spent logging per frame"""
+    spent = [0.0] * threads
+
+    def worker(index):
+        for i in range(index, frames, threads):
+            location = f"Camera {i % 16}"
+            timestamp = "2025-01-01 12:00:00"
+            start = time.thread_time()
+            with log_context(trace_id=uuid.uuid4().hex, location=location):
+                consumer_log.info(f"Received message - Partition: {i % 4}, Offset: {i}")
+                if banner_out is not None:
+                    print_banner(banner_out, timestamp, NORMAL_VERDICT)
+                else:
+                    log_verdict(timestamp, location, NORMAL_VERDICT)
+                consumer_log.info(f"✓ No issues detected - {NORMAL_VERDICT['incident_type']}")
+                consumer_log.info(f"Statistics - Processed: {i}, Incidents: 0, Errors: 0")
+            spent[index] += time.thread_time() - start
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(spent) / frames
+
+
+def configure_sync(out):
+    """The consumer's old basicConfig: a synchronous StreamHandler"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    handler = logging.StreamHandler(out)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def configure_background(out, json_format, sample_rate):
+    os.environ["LOG_FORMAT"] = "json" if json_format else "text"
+    os.environ["LOG_SAMPLE_RATE"] = str(sample_rate)
+    stderr, sys.stderr = sys.stderr, out  # the console handler writes to stderr
+    try:
+        logging.config.dictConfig(build_logging_config())
+    finally:
+        sys.stderr = stderr
+
+
+def drain():
+    """Close the root handlers, waiting for background writers; returns (seconds taken, records dropped)"""
+    start = time.perf_counter()
+    root = logging.getLogger()
+    dropped = 0
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+        dropped += getattr(handler, "dropped", 0)
+    return time.perf_counter() - start, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    scenarios = (
+        ("print banner + sync", lambda out: configure_sync(out), True),
+        ("sync handler", lambda out: configure_sync(out), False),
+        ("background text", lambda out: configure_background(out, False, 1.0), False),
+        ("background json", lambda out: configure_background(out, True, 1.0), False),
+        (f"json, {args.sample_rate:.0%} sampled", lambda out: configure_background(out, True, args.sample_rate), False),
+    )
+    print(f"{args.frames} frames from {args.threads} threads")
+    print(f"{'':<24}{'us/frame':>10}{'dropped':>10}{'drain ms':>10}{'MB written':>12}")
+    for name, configure, banner in scenarios:
+        with tempfile.NamedTemporaryFile("w", buffering=1, encoding="utf-8", suffix=".log") as out:
+            configure(out)
+            per_frame = run_frames(args.frames, args.threads, out if banner else None)
+            drained, dropped = drain()
+            out.flush()
+            size = os.path.getsize(out.name) / 1e6
+        print(f"{name:<24}{per_frame * 1e6:>10.1f}{dropped:>10}{drained * 1000:>10.0f}{size:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Offline replay of the full frame pipeline: Kafka consume loop, process_image,
+the agent graph and incident reconciliation, with no Kafka, Gemini or
+Firestore running.
+
+Usage:
+    python benchmarks/bench_pipeline.py                                # synthetic corpus
+    python benchmarks/bench_pipeline.py --frames-dir recorded/         # one subdirectory per camera
+    python benchmarks/bench_pipeline.py --mode async --model-ms 1200 --output after.json
+    python benchmarks/bench_pipeline.py --output after.json --compare before.json
+    python benchmarks/bench_pipeline.py --traces /tmp/replay.jsonl && python benchmarks/trace_report.py /tmp/replay.jsonl
+
+Frames are encoded like the Django view sends them and served by an
+in-process Kafka source; the model is the stub (fixed latency, canned JSON
+verdict) and Firestore is the in-memory fake with a fixed round-trip time.
+Everything else (preprocessing, motion gate, dedup, local screen, batching,
+result cache, ...) follows the same environment variables as the consumer.
+Only the "pool" (thread workers) and "async" consumer modes can be replayed;
+process workers would not see the stand-ins.
+
+Reported: frames per second, p50/p95/p99 per stage (the "timings" of each
+result plus "e2e", from delivery by the source to the handled result), peak
+RSS, model calls and Firestore round trips. --output writes the report as
+JSON to compare across commits. Every frame carries a trace context as if the
+whole corpus had been produced at once; --traces exports the consumer's traces.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+
+from _stubs import NORMAL_VERDICT, FakeFirestore, StubChatModel, percentile, recorded_frames, synthetic_frames
+
+import agent.firebase_tools as firebase_tools
+from agent import configure_runtime
+from consumer_service import SecurityImageConsumer
+from frame_format import encode_frame
+from tracing import JsonlTraceExporter, start_trace
+
+
+class FakeRecord:
+    """The fields of a kafka-python ConsumerRecord the consumer reads"""
+    __slots__ = ("topic", "partition", "offset", "value", "headers")
+
+    def __init__(self, topic, partition, offset, value, headers):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+        self.value = value
+        self.headers = headers
+
+
+class FakeKafkaSource:
+    """
+    In-process stand-in for KafkaConsumer. Messages are keyed by location
+    onto partitions like the producer does; poll() honours pause/resume and
+    max_records, and once every message is delivered on_drained is called.
+    """
+
+    def __init__(self, messages, partitions=4, topic="images", on_drained=None):
+        from kafka import TopicPartition
+
+        self.topic = topic
+        self.on_drained = on_drained
+        self.delivered_at = {}  # timestamp header -> perf_counter at delivery
+        self._committed = {}
+        self._partitions = [TopicPartition(topic, p) for p in range(partitions)]
+        self._queues = {tp: deque() for tp in self._partitions}
+        self._positions = dict.fromkeys(self._partitions, 0)
+        self._paused = set()
+        self._drained = False
+        for location, value, headers in messages:
+            tp = self._partitions[zlib.crc32(location.encode()) % partitions]
+            queue = self._queues[tp]
+            queue.append(FakeRecord(topic, tp.partition, len(queue), value, headers))
+
+    def subscribe(self, topics, listener=None):
+        pass
+
+    def assignment(self):
+        return set(self._partitions)
+
+    def pause(self, *partitions):
+        self._paused.update(partitions)
+
+    def resume(self, *partitions):
+        self._paused.difference_update(partitions)
+
+    def paused(self):
+        return set(self._paused)
+
+    def commit(self, offsets):
+        self._committed.update({tp: meta.offset for tp, meta in offsets.items()})
+
+    def committed(self, tp):
+        return self._committed.get(tp)
+
+    def position(self, tp):
+        return self._positions[tp]
+
+    def end_offsets(self, partitions):
+        return {tp: self._positions[tp] + len(self._queues[tp]) for tp in partitions}
+
+    def close(self):
+        pass
+
+    def poll(self, timeout_ms=0, max_records=500):
+        records = {}
+        budget = max_records
+        for tp in self._partitions:
+            queue = self._queues[tp]
+            if tp in self._paused or not queue or budget <= 0:
+                continue
+            batch = [queue.popleft() for _ in range(min(budget, len(queue)))]
+            budget -= len(batch)
+            self._positions[tp] += len(batch)
+            now = time.perf_counter()
+            for record in batch:
+                self.delivered_at[dict(record.headers)["timestamp"].decode()] = now
+            records[tp] = batch
+
+        if not records:
+            if not self._drained and not any(self._queues.values()):
+                self._drained = True
+                if self.on_drained:
+                    self.on_drained()
+            time.sleep(min(timeout_ms, 20) / 1000)
+        return records
+
+
+def build_messages(frames, organization_id="replay"):
+    """Kafka messages (location, value, headers) with a unique timestamp and a trace context per frame"""
+    start = datetime(2025, 1, 1, 12, 0, 0)
+    messages = []
+    for index, (location, data) in enumerate(frames):
+        timestamp = (start + timedelta(milliseconds=index)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        trace = start_trace()
+        trace["produced_at"] = trace["received_at"]
+        value, headers = encode_frame(data, timestamp, location, organization_id, trace=trace)
+        messages.append((location, value, headers))
+    return messages
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarise(values):
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+    }
+
+
+def replay(args, frames):
+    """Run the corpus through the consumer and return the report"""
+    model = StubChatModel(args.model_ms / 1000, args.verdict)
+    configure_runtime(model_factory=lambda temperature: model)
+    db = FakeFirestore(args.firestore_ms / 1000)
+    firebase_tools.set_db(db)
+
+    image_dir = tempfile.mkdtemp(prefix="replay-images-")
+    service = SecurityImageConsumer(
+        save_images=args.save_images,
+        image_dir=image_dir,
+        num_workers=args.workers,
+        max_in_flight=args.workers,
+        tracer=JsonlTraceExporter(args.traces) if args.traces else False
+    )
+    source = FakeKafkaSource(build_messages(frames), partitions=args.partitions, on_drained=service.stop)
+    service.consumer = source
+
+    results, lock = [], threading.Lock()
+    handle = service.handle_analysis_result
+
+    def collect(result):
+        finished = time.perf_counter()
+        with lock:
+            results.append((result, finished))
+        handle(result)
+
+    service.handle_analysis_result = collect
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if args.mode == "async":
+        asyncio.run(service.aconsume())
+    else:
+        service.consume()
+    elapsed = time.perf_counter() - started
+
+    stages = {}
+    for result, finished in results:
+        for stage, ms in (result.get("timings") or {}).items():
+            stages.setdefault(stage, []).append(ms)
+        delivered = source.delivered_at.get(result.get("timestamp"))
+        if delivered is not None:
+            stages.setdefault("e2e", []).append(1000 * (finished - delivered))
+
+    return {
+        "commit": git_commit(),
+        "config": {
+            "mode": args.mode,
+            "workers": args.workers,
+            "partitions": args.partitions,
+            "model_ms": args.model_ms,
+            "firestore_ms": args.firestore_ms,
+            "save_images": args.save_images,
+            "corpus": args.frames_dir or f"synthetic ({args.frames} frames, {args.empty_share:.0%} empty)",
+        },
+        "frames": len(frames),
+        "handled": len(results),
+        "errors": service.errors,
+        "incidents": service.incidents_detected,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(len(frames) / elapsed, 2),
+        "stages_ms": {stage: summarise(values) for stage, values in sorted(stages.items())},
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_rss_before_mb": round(rss_before / 1024, 1),
+        "model_calls": model.calls,
+        "firestore_round_trips": db.round_trips,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"{report['frames']} frames in {report['elapsed_s']:.2f}s: {report['fps']:.1f} frames/s "
+          f"({report['errors']} errors, {report['model_calls']} model calls, "
+          f"{report['firestore_round_trips']} Firestore round trips, peak RSS {report['peak_rss_mb']:.0f} MB)")
+    if baseline is not None:
+        print(f"  baseline {baseline.get('commit')}: {baseline['fps']:.1f} frames/s "
+              f"({100 * (report['fps'] / baseline['fps'] - 1):+.0f}%)")
+    print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'count':>8}")
+    for stage, stats in report["stages_ms"].items():
+        line = f"{stage:<16}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['count']:>8}"
+        old = (baseline or {}).get("stages_ms", {}).get(stage)
+        if old:
+            line += f"   p95 was {old['p95']:.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200, help="size of the synthetic corpus")
+    parser.add_argument("--empty-share", type=float, default=0.7, help="share of empty scenes in the synthetic corpus")
+    parser.add_argument("--frames-dir", help="recorded corpus, one subdirectory per camera")
+    parser.add_argument("--mode", choices=("pool", "async"), default="pool")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--model-ms", type=float, default=500, help="stub model latency")
+    parser.add_argument("--verdict", type=argparse.FileType(), help="JSON file with the canned verdict")
+    parser.add_argument("--firestore-ms", type=float, default=20, help="fake Firestore round-trip time")
+    parser.add_argument("--save-images", action="store_true")
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", type=argparse.FileType(), help="earlier JSON report to compare against")
+    parser.add_argument("--traces", help="export the consumer's frame traces to this JSON-lines file")
+    parser.add_argument("--verbose", action="store_true", help="keep the consumer's INFO logging")
+    args = parser.parse_args()
+    args.verdict = json.load(args.verdict) if args.verdict else NORMAL_VERDICT
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    # The stub stands in for every model, so no tier may build a real client
+    os.environ.pop("LLM_FAST_MODEL", None)
+
+    frames = recorded_frames(args.frames_dir) if args.frames_dir else synthetic_frames(args.frames, args.empty_share)
+    report = replay(args, frames)
+    print_report(report, json.load(args.compare) if args.compare else None)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Bytes sent to the model and per-frame latency across camera resolutions, with
+frames passed through as-is versus downscaled by FramePreprocessor.
+
+Usage:
+    python benchmarks/bench_preprocess.py --frames 20 [--max-long-edge 1024 --quality 80]
+
+The model is a stub whose latency grows with the request size (--base-ms plus
+--ms-per-100kb), standing in for upload time and image tokens. "prep" is the
+decode + resize + encode time spent in the consumer; "e2e" is prep plus the
+full agent run.
+"""
+
+import argparse
+import time
+
+from PIL import Image
+
+from _stubs import FIRE_JPG, StubChatModel, percentile
+
+from agent.agent import FIREBASE_TOOLS, monitor_security_image
+from agent.imaging import encode_jpeg, prepare_image_bytes
+from agent.runtime import AgentRuntime
+from camera_config import CameraConfig
+from frame_preprocess import DEFAULT_SETTINGS, FramePreprocessor
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080), (2560, 1440), (3840, 2160)]
+
+
+class SizedStubModel(StubChatModel):
+    """Stub whose latency scales with the size of the image parts it receives"""
+
+    def __init__(self, base_ms, ms_per_100kb):
+        super().__init__()
+        self.base_ms = base_ms
+        self.ms_per_100kb = ms_per_100kb
+
+    def invoke(self, messages, *args, **kwargs):
+        content = messages[0].content
+        size = sum(len(part["image_url"]) for part in content if part.get("type") == "image_url") \
+            if isinstance(content, list) else 0
+        time.sleep((self.base_ms + self.ms_per_100kb * size / 100_000) / 1000)
+        return self._respond(messages)
+
+
+def make_frame(source, size):
+    """Camera-like frame at the given resolution"""
+    return encode_jpeg(source.resize(size, Image.BICUBIC), quality=92)
+
+
+def run(frame, frames, prepare, runtime):
+    prep_times, e2e_times, sent = [], [], 0
+    for _ in range(frames):
+        start = time.perf_counter()
+        data, mime = prepare(frame)
+        prepared = time.perf_counter()
+        monitor_security_image(image_bytes=data, image_mime=mime, location="Bench", runtime=runtime)
+        end = time.perf_counter()
+        prep_times.append((prepared - start) * 1000)
+        e2e_times.append((end - start) * 1000)
+        sent = len(data)
+    return sent, prep_times, e2e_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--image", default=FIRE_JPG)
+    parser.add_argument("--max-long-edge", type=int, default=DEFAULT_SETTINGS["max_long_edge"])
+    parser.add_argument("--quality", type=int, default=DEFAULT_SETTINGS["quality"])
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_SETTINGS["max_bytes"])
+    parser.add_argument("--base-ms", type=float, default=50)
+    parser.add_argument("--ms-per-100kb", type=float, default=20)
+    args = parser.parse_args()
+
+    source = Image.open(args.image).convert("RGB")
+    preprocessor = FramePreprocessor(CameraConfig({
+        **DEFAULT_SETTINGS,
+        "max_long_edge": args.max_long_edge,
+        "quality": args.quality,
+        "max_bytes": args.max_bytes,
+    }))
+    runtime = AgentRuntime(
+        model_factory=lambda temperature: SizedStubModel(args.base_ms, args.ms_per_100kb),
+        tools=FIREBASE_TOOLS,
+        result_cache=False  # the same sample frames are sent repeatedly
+    )
+    runtime.warm_up()
+
+    print(f"{'resolution':<11} {'mode':<12} {'bytes sent':>10} {'prep p50':>9} {'prep p95':>9} "
+          f"{'e2e p50':>9} {'e2e p95':>9}")
+    for size in RESOLUTIONS:
+        frame = make_frame(source, size)
+        for name, prepare in (
+            ("as-is", prepare_image_bytes),
+            ("preprocessed", lambda data: preprocessor.apply("Bench", data)),
+        ):
+            sent, prep, e2e = run(frame, args.frames, prepare, runtime)
+            print(f"{size[0]}x{size[1]:<6} {name:<12} {sent:>10} {percentile(prep, 50):>7.2f}ms "
+                  f"{percentile(prep, 95):>7.2f}ms {percentile(e2e, 50):>7.1f}ms {percentile(e2e, 95):>7.1f}ms")
+
+    stats = preprocessor.stats()
+    print(f"\npreprocessed total: {stats['bytes_in']} -> {stats['bytes_out']} bytes "
+          f"({100 * (1 - stats['bytes_out'] / stats['bytes_in']):.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Model call protection: analysis latency and failed frames against a fake
+model server that injects slow responses, errors and outages.
+
+Usage:
+    python benchmarks/bench_resilience.py
+    python benchmarks/bench_resilience.py --frames 800 --concurrency 32 --tail-share 0.05
+
+The fake server answers after a log-normal delay; a share of requests land in
+a slow tail (tail-factor times slower) and a share fail with a 503. Frames go
+through the analysis node with the model called
+  - directly (no guard),
+  - through the guard (timeouts and jittered retries),
+  - through the guard with hedged requests past the observed p95.
+The outage run takes the server down for a while to show the circuit breaker
+sending frames to the local-screen degraded path instead of failing them.
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage
+
+from _stubs import FIRE_JPG, NORMAL_VERDICT, percentile
+
+from agent.agent import analyze_security_incident, build_initial_state
+from agent.resilience import CircuitBreaker, ModelGuard
+from agent.runtime import AgentRuntime
+
+
+class FakeServerError(Exception):
+    """An HTTP error from the fake server"""
+
+    def __init__(self, status_code):
+        super().__init__(f"{status_code} from fake model server")
+        self.status_code = status_code
+
+
+class FakeModelServer:
+    """In-process stand-in for the model API with injectable latency and errors"""
+
+    def __init__(self, median=0.08, tail_share=0.05, tail_factor=12.0, error_rate=0.02, seed=0):
+        self.median = median
+        self.tail_share = tail_share
+        self.tail_factor = tail_factor
+        self.error_rate = error_rate
+        self.down_until = 0.0
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def outage(self, seconds):
+        """Fail every request for the next `seconds`"""
+        self.down_until = time.monotonic() + seconds
+
+    def _draw(self):
+        with self._lock:
+            self.requests += 1
+            delay = self.median * self._rng.lognormvariate(0, 0.25)
+            if self._rng.random() < self.tail_share:
+                delay *= self.tail_factor
+            return delay, self._rng.random() < self.error_rate
+
+    def handle(self):
+        if time.monotonic() < self.down_until:
+            time.sleep(0.01)
+            raise FakeServerError(503)
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeServerError(503)
+        return AIMessage(content=json.dumps(NORMAL_VERDICT))
+
+    def client(self):
+        return FakeChatModel(self)
+
+
+class FakeChatModel:
+    """Chat model whose requests go to a FakeModelServer"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def bind_tools(self, tools):
+        return self
+
+    def invoke(self, messages, *args, **kwargs):
+        return self.server.handle()
+
+
+def run(server, guard, frames, concurrency, outage_at=None, outage_seconds=0.0):
+    """Per-frame analysis latencies and outcome counts"""
+    runtime = AgentRuntime(
+        model_factory=lambda temperature: server.client(),
+        pool_size=concurrency,
+        local_screen=False,  # the degraded path builds its own
+        prefetch_incidents=False,
+        result_cache=False  # every frame is the same image
+    )
+    runtime.fast_tier = None
+    runtime.strong_tier.guard = guard
+    with open(FIRE_JPG, "rb") as f:
+        image = f.read()
+
+    latencies, outcomes = [], {"ok": 0, "degraded": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def analyse(index):
+        if index == outage_at:
+            server.outage(outage_seconds)
+        state = build_initial_state(image_bytes=image, location=f"Camera {index % 8}", organization_id="bench")
+        start = time.perf_counter()
+        result = analyze_security_incident(state, runtime.config())
+        elapsed = time.perf_counter() - start
+        outcome = "failed" if result.get("error") else "degraded" if result.get("model_tier") == "degraded" else "ok"
+        with lock:
+            latencies.append(elapsed)
+            outcomes[outcome] += 1
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(analyse, range(frames)))
+    return latencies, outcomes
+
+
+def report(name, latencies, outcomes, server_requests):
+    print(f"{name:<22} p50 {1000 * percentile(latencies, 50):6.0f} ms  "
+          f"p95 {1000 * percentile(latencies, 95):6.0f} ms  "
+          f"p99 {1000 * percentile(latencies, 99):6.0f} ms  "
+          f"ok {outcomes['ok']:4d}  degraded {outcomes['degraded']:4d}  failed {outcomes['failed']:4d}  "
+          f"requests {server_requests}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--median-ms", type=float, default=80)
+    parser.add_argument("--tail-share", type=float, default=0.05)
+    parser.add_argument("--tail-factor", type=float, default=12)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    args = parser.parse_args()
+    # Degraded verdicts and retries log a warning per frame
+    logging.getLogger("agent").setLevel(logging.ERROR)
+
+    def server():
+        return FakeModelServer(args.median_ms / 1000, args.tail_share, args.tail_factor, args.error_rate)
+
+    def guard(hedge):
+        return ModelGuard(timeout=args.timeout, backoff=0.05, hedge=hedge, breaker=CircuitBreaker(10, 1.0))
+
+    print(f"{args.frames} frames, {args.concurrency} concurrent, median {args.median_ms:.0f} ms, "
+          f"{args.tail_share:.0%} slow x{args.tail_factor:.0f}, {args.error_rate:.0%} errors")
+    for name, make_guard in (("no guard", lambda: None),
+                             ("retries + timeouts", lambda: guard(False)),
+                             ("+ hedging past p95", lambda: guard(True))):
+        fake = server()
+        report(name, *run(fake, make_guard(), args.frames, args.concurrency), fake.requests)
+
+    print("\n2 s outage a quarter of the way in")
+    for name, make_guard in (("no guard", lambda: None), ("guard + breaker", lambda: guard(True))):
+        fake = server()
+        latencies, outcomes = run(fake, make_guard(), args.frames, args.concurrency, args.frames // 4, 2.0)
+        report(name, latencies, outcomes, fake.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Where capture-to-alert latency goes: reads the consumer's trace export
+(TRACE_EXPORT_PATH) and breaks end-to-end latency down by span, with waiting
+(Kafka queue, worker lanes) separated from work on the frame.
+
+Usage:
+    python benchmarks/trace_report.py traces/frames.jsonl
+    python benchmarks/trace_report.py traces/frames.jsonl --incidents       # frames that wrote to Firestore
+    python benchmarks/trace_report.py traces/frames.jsonl --location Lobby --slowest 10
+
+End to end runs from capture (when the client sent captured_at, else from the
+ingest API) to the last Firestore write of the frame, or to the handled result
+for frames that wrote nothing. Child spans of "process" are listed under it
+and nest (agent holds the graph nodes, analyze holds model), so their shares
+overlap.
+"""
+
+import argparse
+from collections import defaultdict
+
+from _stubs import percentile
+
+from tracing import WAIT_SPANS, end_to_end_ms, load_traces
+
+HOPS = ("upload", "ingest", "queue", "decode", "worker_queue", "process", "write")
+
+
+def span_totals(record):
+    """Milliseconds per span name (top-level) and per child span of process"""
+    hops, children = defaultdict(float), defaultdict(float)
+    for span in record["spans"]:
+        if span.get("parent"):
+            children[span["name"]] += span["ms"]
+        else:
+            hops[span["name"]] += span["ms"]
+    return hops, children
+
+
+def report(records, slowest=0):
+    e2e = [end_to_end_ms(r) for r in records]
+    total_e2e = sum(e2e)
+    print(f"{len(records)} traces, end to end p50 {percentile(e2e, 50):.0f} ms, "
+          f"p95 {percentile(e2e, 95):.0f} ms, p99 {percentile(e2e, 99):.0f} ms")
+
+    hops, children = defaultdict(list), defaultdict(list)
+    for record in records:
+        record_hops, record_children = span_totals(record)
+        for name, ms in record_hops.items():
+            hops[name].append(ms)
+        for name, ms in record_children.items():
+            children[name].append(ms)
+
+    print(f"\n{'span':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'traces':>8}{'share':>8}")
+
+    def line(name, values, indent=""):
+        share = sum(values) / total_e2e if total_e2e else 0.0
+        print(f"{indent + name:<20}{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{len(values):>8}{share:>8.0%}")
+
+    for name in HOPS:
+        if name in hops:
+            line(name, hops[name])
+        if name == "process":
+            for child in sorted(children, key=lambda c: -sum(children[c])):
+                line(child, children[child], "  ")
+
+    waiting = sum(sum(hops[name]) for name in WAIT_SPANS)
+    writing = sum(hops["write"])
+    upload = sum(hops["upload"])
+    if total_e2e:
+        working = total_e2e - waiting - writing - upload
+        print(f"\nwaiting {waiting / total_e2e:.0%} (Kafka queue + worker lanes), "
+              f"processing {working / total_e2e:.0%}, Firestore writes {writing / total_e2e:.0%}"
+              + (f", upload {upload / total_e2e:.0%}" if upload else ""))
+
+    if slowest:
+        print(f"\nslowest {slowest}:")
+        ranked = sorted(zip(e2e, records), key=lambda pair: -pair[0])[:slowest]
+        for ms, record in ranked:
+            record_hops, _ = span_totals(record)
+            worst = max(record_hops, key=record_hops.get)
+            print(f"  {record['trace_id']}  {ms:8.0f} ms  {record.get('location') or '-':<20} "
+                  f"mostly {worst} ({record_hops[worst]:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="trace file written by the consumer")
+    parser.add_argument("--incidents", action="store_true", help="only frames that created or resolved an incident")
+    parser.add_argument("--location", help="only frames from this camera")
+    parser.add_argument("--slowest", type=int, default=0, help="list the N slowest traces")
+    args = parser.parse_args()
+
+    records = list(load_traces(args.path).values())
+    if args.incidents:
+        records = [r for r in records if any(span["name"] == "write" for span in r["spans"])]
+    if args.location:
+        records = [r for r in records if r.get("location") == args.location]
+    if not records:
+        print("no traces")
+        return
+    report(records, args.slowest)
+
+
+if __name__ == "__main__":
+    main()
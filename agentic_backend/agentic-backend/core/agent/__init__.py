@@ -1,3 +1,12 @@
-from .agent import monitor_security_image
+from .agent import (
+    monitor_security_image,
+    amonitor_security_image,
+    monitor_security_batch,
+    get_runtime,
+    configure_runtime,
+    close_runtime,
+)
 
-monitor_security_image = monitor_security_image
\ No newline at end of file
+monitor_security_image = monitor_security_image
+amonitor_security_image = amonitor_security_image
+monitor_security_batch = monitor_security_batch
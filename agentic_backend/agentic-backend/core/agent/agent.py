@@ -5,24 +5,47 @@ With automated Firebase incident management using tool calling
 
 from typing import TypedDict, Literal, Annotated
 from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from PIL import Image
+import asyncio
 import json
 from datetime import datetime
-import base64
+from functools import lru_cache
+import hashlib
 import io
-import os
-from .firebase_tools import fetch_all_incidents, find_incident, report_incident, mark_incident_fixed
+import logging
+import threading
+import time
+from .firebase_tools import (
+    collect_writes,
+    fetch_open_incidents,
+    find_incident,
+    find_open_incidents,
+    report_incident,
+    mark_incident_fixed,
+)
+from .reconcile import UNVERIFIED_PREFIX, build_incident_record, reconcile_incidents
+from .imaging import sniff_mime, to_data_url
+from .resilience import CircuitOpenError
+from .result_cache import result_key
+from .runtime import AgentRuntime
+
+logger = logging.getLogger(__name__)
 
 
 class SecurityIncidentState(TypedDict):
     """State for the security monitoring agent"""
     # Inputs
-    image_path: str  # Path to image file or base64 string
+    image_path: str | None  # Path to image file or base64 string
+    image_bytes: bytes | memoryview | None  # In-memory frame (preferred over image_path)
+    image_mime: str | None  # Mime type of image_bytes
     timestamp: str  # Time of the incident
     location: str | None  # Optional: location/camera ID
+    organization_id: str | None  # Organization the camera belongs to
+    roi: list | None  # Regions of interest sent instead of the full frame: name, box (full-frame pixels), frame_size
+    roi_images: list | None  # JPEG crop for each entry in roi
     
     # Analysis outputs
     is_problem: bool | None  # True if any issue detected
@@ -32,9 +55,15 @@ class SecurityIncidentState(TypedDict):
     description: str | None  # Brief description of what's detected
     recommended_action: str | None  # Suggested response
     people_count: int | None  # Approximate number of people visible
+    incident_region: dict | None  # Entry of roi the incident was seen in
+    local_screen: dict | None  # Scores from the local CPU screen (fire/smoke fractions, people count)
+    model_tier: str | None  # Model tier that produced the verdict ("fast", "strong", "degraded" or "cache")
+    escalation_reason: str | None  # Why the fast tier's verdict went to the strong tier
+    fast_verdict: dict | None  # Escalated fast-tier verdict, kept in case the strong tier can't answer
+    escalation_error: str | None  # Why the strong tier failed, when the fast verdict stood unescalated
     
     # Firebase management
-    existing_incidents: list | None  # All existing incidents from Firebase
+    existing_incidents: list | None  # Open incidents at the location (prefetched during analysis)
     incident_reported: bool  # Whether incident was reported to Firebase
     incident_resolved: bool  # Whether incident was marked as resolved
     firebase_doc_id: str | None  # Document ID in Firebase
@@ -44,13 +73,16 @@ class SecurityIncidentState(TypedDict):
     firebase_complete: bool
     error: str | None
     messages: Annotated[list, "messages"]  # For tool calling
+    timings: dict | None  # Milliseconds spent in each stage, by stage name
+    trace_id: str | None  # Capture-to-alert trace of the frame, stored on the incidents it raises or resolves
+    write_futures: list | None  # Futures of the frame's queued Firestore writes (batch writer only)
 
 
 # Define tools for the agent
 @tool
 def get_all_incidents() -> dict:
-    """Fetch all incidents from Firebase to check for existing reports."""
-    return fetch_all_incidents()
+    """Fetch all open incidents from Firebase to check for existing reports."""
+    return fetch_open_incidents()
 
 
 @tool
@@ -68,22 +100,14 @@ def create_incident_report(
     description: str,
     confidence: float,
     people_count: int,
-    recommended_action: str
+    recommended_action: str,
+    organization_id: str = None
 ) -> dict:
     """Create a new incident report in Firebase."""
-    data = {
-        "timestamp": timestamp,
-        "location": location,
-        "incident_type": incident_type,
-        "severity": severity,
-        "description": description,
-        "confidence": confidence,
-        "people_count": people_count,
-        "recommended_action": recommended_action,
-        "is_fixed": False,
-        "reported_at": datetime.now().isoformat()
-    }
-    return report_incident(data)
+    return report_incident(build_incident_record(
+        timestamp, location, incident_type, severity, description,
+        confidence, people_count, recommended_action, organization_id
+    ))
 
 
 @tool
@@ -92,60 +116,53 @@ def resolve_incident(doc_id: str) -> dict:
     return mark_incident_fixed(doc_id)
 
 
-def encode_image_to_base64(image_path: str) -> str:
-    """Convert image to base64 string"""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+FIREBASE_TOOLS = [
+    get_all_incidents,
+    search_incident,
+    create_incident_report,
+    resolve_incident
+]
 
 
-def load_and_validate_image(state: SecurityIncidentState) -> SecurityIncidentState:
-    """Load and validate the image file"""
-    try:
-        # Try to load as file path
-        if state["image_path"].startswith("data:image") or state["image_path"].startswith("base64,"):
-            # Handle base64 encoded image
-            print("✓ Loading base64 encoded image")
-            return state
-        else:
-            # Load from file path
-            image = Image.open(state["image_path"])
-            print(f"✓ Image loaded successfully: {state['image_path']}")
-            print(f"  Size: {image.size}, Mode: {image.mode}")
-            return state
-            
-    except Exception as e:
-        return {
-            **state,
-            "error": f"Failed to load image: {str(e)}",
-            "analysis_complete": True,
-            "is_problem": None
-        }
+_runtime = None
+_runtime_lock = threading.Lock()
 
 
-def analyze_security_incident(state: SecurityIncidentState) -> SecurityIncidentState:
-    """Analyze image using Gemini for security incidents"""
-    try:
-        # Initialize Gemini model
-        model = ChatGoogleGenerativeAI(
-            model=os.getenv("LLM_MODEL", "gemini-2.0-flash-exp"),
-            temperature=0.3
-        )
-        
-        # Encode image to base64
-        image_data = encode_image_to_base64(state["image_path"])
-        
-        # Comprehensive security analysis prompt
-        prompt = f"""You are a security monitoring AI assistant analyzing live surveillance footage.
+def get_runtime() -> AgentRuntime:
+    """Process-wide agent runtime shared by every frame"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime(tools=FIREBASE_TOOLS)
+        return _runtime
 
-**Context:**
-- Timestamp: {state['timestamp']}
-- Location: {state.get('location', 'Unknown')}
 
-**Your Task:**
-Analyze this image for ANY security concerns, safety hazards, or incidents that require attention.
+def configure_runtime(**kwargs) -> AgentRuntime:
+    """Replace the shared runtime, e.g. with a different model factory or pool size"""
+    global _runtime
+    with _runtime_lock:
+        kwargs.setdefault("tools", FIREBASE_TOOLS)
+        _runtime = AgentRuntime(**kwargs)
+        return _runtime
 
-This is image from live video stream so don't report like 'this image shows' do something like this thing is happening
-**Incidents to detect (but not limited to):**
+
+def close_runtime():
+    """Stop the shared runtime's threads; the next get_runtime builds a new one"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is not None:
+            _runtime.close()
+            _runtime = None
+
+
+def _runtime_from(config: RunnableConfig = None) -> AgentRuntime:
+    """Runtime passed through the graph config, or the shared one"""
+    runtime = ((config or {}).get("configurable") or {}).get("runtime")
+    return runtime or get_runtime()
+
+
+# Prompt sections shared by the single-frame and batched analysis requests
+INCIDENT_CATALOGUE = """**Incidents to detect (but not limited to):**
 - Fire/Smoke (any signs of flames, smoke, or burning)
 - Fighting/Violence (physical altercations, aggressive behavior)
 - Stampede/Crowd Crush (dangerous crowd density or movement)
@@ -157,7 +174,27 @@ This is image from live video stream so don't report like 'this image shows' do
 - Slip/Trip/Fall Hazards
 - Overcrowding (exceeding safe capacity)
 - Missing/Lost Person (child alone, distressed individual)
-- Natural Hazards (flooding, structural damage)
+- Natural Hazards (flooding, structural damage)"""
+
+ANALYSIS_GUIDELINES = """**Important Guidelines:**
+- Be accurate but cautious - false alarms are better than missed incidents
+- If image quality is poor, indicate lower confidence
+- If nothing is wrong, mark is_problem as false and incident_type as "normal"
+- Focus on actionable information for security personnel
+- Consider context: time of day, location type, normal vs abnormal behavior"""
+
+
+ANALYSIS_PROMPT = """You are a security monitoring AI assistant analyzing live surveillance footage.
+
+**Context:**
+- Timestamp: {timestamp}
+- Location: {location}{region_note}
+
+**Your Task:**
+Analyze this image for ANY security concerns, safety hazards, or incidents that require attention.
+
+This is image from live video stream so don't report like 'this image shows' do something like this thing is happening
+{catalogue}
 
 **Response Format:**
 Provide your analysis in JSON format with these fields:
@@ -170,74 +207,466 @@ Provide your analysis in JSON format with these fields:
   "description": string,
   "recommended_action": string,
   "people_count": number,
-  "additional_concerns": [list of strings]
+  "additional_concerns": [list of strings]{region_field}
 }}
 
-**Important Guidelines:**
-- Be accurate but cautious - false alarms are better than missed incidents
-- If image quality is poor, indicate lower confidence
-- If nothing is wrong, mark is_problem as false and incident_type as "normal"
-- Focus on actionable information for security personnel
-- Consider context: time of day, location type, normal vs abnormal behavior
+{guidelines}
 
 Return ONLY valid JSON, no markdown formatting or extra text."""
 
-        # Create message with image
-        message = HumanMessage(
-            content=[
-                {"type": "text", "text": prompt},
-                {
-                    "type": "image_url",
-                    "image_url": f"data:image/jpeg;base64,{image_data}"
-                }
-            ]
-        )
-        
-        # Generate response
-        response = model.invoke([message])
-        response_text = response.content.strip()
-        
-        # Clean up response
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        # Parse JSON response
-        result = json.loads(response_text)
-        
-        # Log analysis results
-        print(f"\n{'='*60}")
-        print(f"SECURITY ANALYSIS - {state['timestamp']}")
-        print(f"{'='*60}")
-        print(f"Status: {'⚠️  INCIDENT DETECTED' if result['is_problem'] else '✓ All Clear'}")
-        print(f"Incident Type: {result['incident_type']}")
-        print(f"Severity: {result['severity']}")
-        print(f"Confidence: {result['confidence']:.0%}")
-        print(f"People Count: {result.get('people_count', 'N/A')}")
-        print(f"\nDescription: {result['description']}")
-        print(f"\nRecommended Action: {result['recommended_action']}")
-        
-        if result.get('additional_concerns'):
-            print(f"\nAdditional Concerns:")
-            for concern in result['additional_concerns']:
-                print(f"  - {concern}")
-        print(f"{'='*60}\n")
-        
+REGION_NOTE = (
+    "\n- The camera only watches these regions, sent as separate labelled images: {names}. "
+    "Greyed-out areas are outside the region."
+)
+REGION_FIELD = ',\n  "region": string (name of the region the incident is in, or null)'
+
+BATCH_ANALYSIS_PROMPT = """You are a security monitoring AI assistant analyzing live surveillance footage from several cameras.
+
+**Your Task:**
+You will receive {count} frames, each introduced by a "Frame N" label with its timestamp and location.
+Analyze EACH frame independently for ANY security concerns, safety hazards, or incidents that require attention.
+Frames come from different cameras - never carry what you see in one frame over to another.
+
+These are images from live video streams so don't report like 'this image shows' do something like this thing is happening
+{catalogue}
+
+**Response Format:**
+Return a JSON array with exactly one object per frame, in frame order:
+
+[
+  {{
+    "frame": number (the N of "Frame N"),
+    "is_problem": boolean,
+    "incident_type": string,
+    "severity": string,
+    "confidence": float,
+    "description": string,
+    "recommended_action": string,
+    "people_count": number,
+    "additional_concerns": [list of strings],
+    "region": string (name of the region the incident is in, only for frames sent as regions, else null)
+  }}
+]
+
+{guidelines}
+
+Return ONLY a valid JSON array, no markdown formatting or extra text."""
+
+BATCH_FRAME_LABEL = "Frame {number} - Timestamp: {timestamp}, Location: {location}"
+BATCH_REGION_NOTE = " (sent as regions {names}; greyed-out areas are outside the region)"
+
+# Changes whenever the prompt text does, so cached verdicts of an older prompt are never reused
+PROMPT_VERSION = hashlib.sha256("\n".join((
+    ANALYSIS_PROMPT, REGION_NOTE, REGION_FIELD, INCIDENT_CATALOGUE, ANALYSIS_GUIDELINES,
+    BATCH_ANALYSIS_PROMPT, BATCH_FRAME_LABEL, BATCH_REGION_NOTE
+)).encode()).hexdigest()[:16]
+
+
+def load_and_validate_image(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+    """Load and validate the image file"""
+    try:
+        if state.get("image_bytes") is not None:
+            # In-memory frame: Image.open only parses the header, nothing is decoded or copied
+            image = Image.open(io.BytesIO(state["image_bytes"]))
+            logger.debug(f"✓ Image received in memory ({len(state['image_bytes'])} bytes, {image.size}, {image.mode})")
+            return state
+        # Try to load as file path
+        if state["image_path"].startswith("data:image") or state["image_path"].startswith("base64,"):
+            # Handle base64 encoded image
+            logger.debug("✓ Loading base64 encoded image")
+            return state
+        else:
+            # Load from file path
+            image = Image.open(state["image_path"])
+            logger.debug(f"✓ Image loaded successfully: {state['image_path']} ({image.size}, {image.mode})")
+            return state
+            
+    except Exception as e:
         return {
             **state,
-            "is_problem": result["is_problem"],
+            "error": f"Failed to load image: {str(e)}",
+            "analysis_complete": True,
+            "is_problem": None
+        }
+
+
+def frame_data_url(state: SecurityIncidentState) -> str:
+    """Data URL for the frame, built from in-memory bytes when available"""
+    if state.get("image_bytes") is not None:
+        return to_data_url(state["image_bytes"], state.get("image_mime") or "image/jpeg")
+    if state["image_path"].startswith("data:image"):
+        return state["image_path"]
+    if state["image_path"].startswith("base64,"):
+        return f"data:image/jpeg;{state['image_path']}"
+    
+    # Encode image to base64
+    with open(state["image_path"], "rb") as image_file:
+        data = image_file.read()
+    return to_data_url(data, sniff_mime(data) or "image/jpeg")
+
+
+def image_parts(state: SecurityIncidentState) -> list:
+    """
+    Image content parts for a frame - the full frame, or one labelled part
+    per region of interest when the camera has regions configured
+    """
+    if not state.get("roi_images"):
+        return [{"type": "image_url", "image_url": frame_data_url(state)}]
+    
+    parts = []
+    for region, crop in zip(state["roi"], state["roi_images"]):
+        parts.append({"type": "text", "text": f"Region: {region['name']}"})
+        parts.append({"type": "image_url", "image_url": to_data_url(crop)})
+    return parts
+
+
+def build_analysis_message(state: SecurityIncidentState) -> HumanMessage:
+    """Build the multimodal analysis request for a frame"""
+    region_note = ""
+    region_field = ""
+    if state.get("roi_images"):
+        names = ", ".join(f'"{region["name"]}"' for region in state["roi"])
+        region_note = REGION_NOTE.format(names=names)
+        region_field = REGION_FIELD
+    
+    # Comprehensive security analysis prompt
+    prompt = ANALYSIS_PROMPT.format(
+        timestamp=state['timestamp'],
+        location=state.get('location', 'Unknown'),
+        region_note=region_note,
+        region_field=region_field,
+        catalogue=INCIDENT_CATALOGUE,
+        guidelines=ANALYSIS_GUIDELINES
+    )
+
+    # Create message with image
+    message = HumanMessage(
+        content=[{"type": "text", "text": prompt}, *image_parts(state)]
+    )
+    return message
+
+
+def parse_json_response(response):
+    """JSON payload of a model response, with any markdown fences stripped"""
+    response_text = response.content.strip()
+    
+    # Clean up response
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].split("```")[0].strip()
+    
+    return json.loads(response_text)
+
+
+def parse_analysis_response(state: SecurityIncidentState, response) -> SecurityIncidentState:
+    """Parse the model's JSON verdict into the agent state"""
+    return apply_verdict(state, parse_json_response(response))
+
+
+def apply_verdict(state: SecurityIncidentState, result: dict) -> SecurityIncidentState:
+    """Copy one frame's verdict into its agent state"""
+    # One line per frame; the verdict's fields go along as structured data
+    logger.info(
+        f"{'⚠️ INCIDENT DETECTED' if result['is_problem'] else '✓ All clear'} at {state.get('location')} "
+        f"({state['timestamp']}): {result['incident_type']}, severity {result['severity']}, "
+        f"confidence {result['confidence']:.0%} - {result['description']}",
+        extra={
             "incident_type": result["incident_type"],
             "severity": result["severity"],
-            "confidence": result.get("confidence", 0.0),
-            "description": result["description"],
-            "recommended_action": result["recommended_action"],
+            "confidence": result["confidence"],
             "people_count": result.get("people_count"),
-            "analysis_complete": True,
-            "messages": state.get("messages", []),
+            "recommended_action": result["recommended_action"],
+            "additional_concerns": result.get("additional_concerns"),
+        }
+    )
+    
+    return {
+        **state,
+        "is_problem": result["is_problem"],
+        "incident_type": result["incident_type"],
+        "severity": result["severity"],
+        "confidence": result.get("confidence", 0.0),
+        "description": result["description"],
+        "recommended_action": result["recommended_action"],
+        "people_count": result.get("people_count", state.get("people_count")),
+        "incident_region": next(
+            (region for region in state.get("roi") or [] if region["name"] == result.get("region")), None
+        ),
+        "analysis_complete": True,
+        "messages": state.get("messages", []),
+        "error": None
+    }
+
+
+def local_screen_frame(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+    """
+    Run the local CPU screen. A confidently normal frame at a location with
+    no open incident is completed here without an LLM call; every other frame
+    goes on to the analysis node with its locally counted people.
+    """
+    screen = _runtime_from(config).local_screen
+    if not screen or state.get("image_bytes") is None or state.get("local_screen") is not None:
+        return state
+    
+    try:
+        scores = screen.screen(state["image_bytes"])
+    except Exception as e:
+        logger.warning(f"⚠️  Local screen failed, sending frame to the model: {e}")
+        return state
+    
+    state = {**state, "local_screen": scores, "people_count": scores["people_count"]}
+    if not scores["normal"]:
+        return state
+    
+    # An open incident needs the model to confirm it is over
+    try:
+        open_incidents = find_open_incidents(state.get("location"), state.get("organization_id"))
+    except Exception as e:
+        logger.warning(f"⚠️  Could not check open incidents, sending frame to the model: {e}")
+        return state
+    if open_incidents:
+        # Already looked up, so reconciliation needn't prefetch them again
+        return {**state, "existing_incidents": open_incidents}
+    
+    logger.info(f"✓ Local screen: nothing of concern at {state.get('location')}, skipping the model")
+    return {
+        **state,
+        "is_problem": False,
+        "incident_type": "normal",
+        "severity": "low",
+        "confidence": scores["confidence"],
+        "description": "Local screen found no people, fire or smoke in view",
+        "recommended_action": "No action needed",
+        "existing_incidents": [],
+        "analysis_complete": True,
+        "firebase_complete": True
+    }
+
+
+async def alocal_screen_frame(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+    """Async variant of local_screen_frame; the CPU work runs in a thread"""
+    return await asyncio.to_thread(local_screen_frame, state, config)
+
+
+def prefetch_open_incidents(state: SecurityIncidentState, runtime: AgentRuntime):
+    """
+    Start looking up the location's open incidents on the runtime's lookup
+    threads, so the Firestore round trip overlaps the model call
+
+    Returns:
+        Future of the incident list, or None when nothing needs fetching
+    """
+    if not runtime.prefetch_incidents or state.get("existing_incidents") is not None:
+        return None
+    return runtime.lookups.submit(find_open_incidents, state.get("location"), state.get("organization_id"))
+
+
+def join_prefetch(state: SecurityIncidentState, prefetch) -> SecurityIncidentState:
+    """Store a finished prefetch in existing_incidents; on failure reconciliation looks them up itself"""
+    if prefetch is None:
+        return state
+    try:
+        incidents = prefetch.result()
+    except Exception as e:
+        logger.warning(f"⚠️  Open-incident prefetch failed: {e}")
+        return state
+    return {**state, "existing_incidents": incidents}
+
+
+async def ajoin_prefetch(state: SecurityIncidentState, prefetch) -> SecurityIncidentState:
+    """Async variant of join_prefetch that waits without blocking the event loop"""
+    if prefetch is not None:
+        await asyncio.wait([asyncio.wrap_future(prefetch)])
+    return join_prefetch(state, prefetch)
+
+
+def first_pass_verdict(state: SecurityIncidentState, response, runtime: AgentRuntime) -> SecurityIncidentState:
+    """
+    Apply a fast-tier verdict, or mark the frame for the strong tier when the
+    verdict is unusable or the escalation policy asks for a second opinion
+    """
+    try:
+        result = parse_json_response(response)
+        verdict = apply_verdict(state, result)
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return {**state, "escalation_reason": "unparseable"}
+    
+    reason = runtime.escalation.escalation_reason(verdict)
+    if reason is None:
+        return {**verdict, "model_tier": runtime.fast_tier.name}
+    logger.info(f"⤴ Escalating {state.get('location')} to the strong model ({reason})")
+    return {**state, "escalation_reason": reason, "fast_verdict": result}
+
+
+def unescalated_verdict(state: SecurityIncidentState, error: Exception) -> SecurityIncidentState:
+    """The escalated fast-tier verdict, standing on its own because the strong tier failed"""
+    logger.warning(f"⚠️  Strong model failed for {state.get('location')} ({error}), keeping the fast model's verdict")
+    return {
+        **apply_verdict(state, state["fast_verdict"]),
+        "model_tier": "fast",
+        "escalation_error": str(error) or type(error).__name__
+    }
+
+
+def analyze_security_incident(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+    """
+    Analyze the frame while the location's open incidents are fetched
+    concurrently; both are joined before reconciliation
+    """
+    runtime = _runtime_from(config)
+    prefetch = prefetch_open_incidents(state, runtime)
+    return join_prefetch(analyze_frame(state, runtime), prefetch)
+
+
+async def aanalyze_security_incident(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+    """Async variant of analyze_security_incident"""
+    runtime = _runtime_from(config)
+    prefetch = prefetch_open_incidents(state, runtime)
+    return await ajoin_prefetch(await aanalyze_frame(state, runtime), prefetch)
+
+
+def degraded_verdict(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """
+    Verdict from the local screen while the model's circuit breaker is open.
+    Flame- or smoke-coloured areas are reported as an unverified fire for
+    review (a sunset or an orange jacket looks the same to colour checks);
+    the model's next verdict at the location supersedes it. Anything else
+    stays unconfirmed, and open incidents are not resolved without the model.
+    """
+    if state.get("image_bytes") is None:
+        return {**state, "error": "Analysis failed: model unavailable", "analysis_complete": True}
+    
+    screen = runtime.fallback_screen()
+    try:
+        scores = state.get("local_screen") or screen.screen(state["image_bytes"])
+    except Exception as e:
+        return {**state, "error": f"Analysis failed: model unavailable, local screen failed: {e}", "analysis_complete": True}
+    state = {**state, "local_screen": scores, "model_tier": "degraded", "analysis_complete": True}
+    if scores["fire_fraction"] >= screen.fire_fraction or scores["smoke_fraction"] >= screen.smoke_fraction:
+        logger.warning(f"⚡ Model unavailable - local screen flags possible fire at {state.get('location')}")
+        return {
+            **state,
+            "is_problem": True,
+            "incident_type": f"{UNVERIFIED_PREFIX}fire",
+            "severity": "medium",
+            "confidence": 0.5,
+            "description": "Model unavailable; the local screen found flame- or smoke-coloured areas (not confirmed)",
+            "recommended_action": "Check the camera feed to confirm or dismiss a fire",
+            "people_count": scores["people_count"],
             "error": None
         }
+    
+    logger.warning(f"⚡ Model unavailable - no local findings at {state.get('location')}, incidents left unchanged")
+    return {
+        **state,
+        "is_problem": False,
+        "incident_type": "unverified",
+        "severity": "low",
+        "confidence": scores["confidence"] if scores["normal"] else 0.0,
+        "description": "Model unavailable; the local screen found no flame- or smoke-coloured areas",
+        "recommended_action": "No action needed",
+        "people_count": scores["people_count"],
+        "firebase_complete": True,
+        "error": None
+    }
+
+
+def result_cache_key(state: SecurityIncidentState, runtime: AgentRuntime) -> str | None:
+    """Result cache key of the image parts the model would see, or None when the frame can't be cached"""
+    if not runtime.result_cache:
+        return None
+    if state.get("roi_images"):
+        parts = [part for region, crop in zip(state["roi"], state["roi_images"]) for part in (region["name"], crop)]
+    elif state.get("image_bytes") is not None:
+        parts = [state["image_bytes"]]
+    else:
+        return None
+    return result_key(parts, PROMPT_VERSION, runtime.model_signature())
+
+
+def reuse_cached_verdict(state: SecurityIncidentState, verdict: dict) -> SecurityIncidentState:
+    """Apply the cached verdict of an identical frame"""
+    logger.info(f"✓ Identical frame analysed before, reusing its verdict for {state.get('location')}")
+    return {**apply_verdict(state, verdict), "model_tier": "cache"}
+
+
+def remember_verdict(state: SecurityIncidentState, runtime: AgentRuntime, key: str | None) -> SecurityIncidentState:
+    """Cache a model verdict (not degraded, failed or unescalated analyses) under key"""
+    if key is None or state.get("error") or state.get("escalation_error"):
+        return state
+    if state.get("model_tier") not in ("fast", "strong"):
+        return state
+    runtime.result_cache.put(key, {
+        "is_problem": state["is_problem"],
+        "incident_type": state["incident_type"],
+        "severity": state["severity"],
+        "confidence": state["confidence"],
+        "description": state["description"],
+        "recommended_action": state["recommended_action"],
+        "people_count": state["people_count"],
+        "region": (state.get("incident_region") or {}).get("name"),
+    })
+    return state
+
+
+def analyze_frame(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """Verdict for a frame: from the result cache when an identical frame was analysed, else from the model"""
+    key = result_cache_key(state, runtime)
+    cached = runtime.result_cache.get(key) if key else None
+    if cached is not None:
+        return reuse_cached_verdict(state, cached)
+    return remember_verdict(model_verdict(state, runtime), runtime, key)
+
+
+async def aanalyze_frame(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """Async variant of analyze_frame"""
+    key = result_cache_key(state, runtime)
+    cached = runtime.result_cache.get(key) if key else None
+    if cached is not None:
+        return reuse_cached_verdict(state, cached)
+    return remember_verdict(await amodel_verdict(state, runtime), runtime, key)
+
+
+def lookup_cached_verdict(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """A pending frame with the cached verdict applied on a hit, else unchanged"""
+    if state.get("analysis_complete"):
+        return state
+    key = result_cache_key(state, runtime)
+    cached = runtime.result_cache.get(key) if key else None
+    return state if cached is None else reuse_cached_verdict(state, cached)
+
+
+def model_verdict(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """Analyze image using Gemini for security incidents (fast tier first when tiering is on)"""
+    try:
+        # Pooled Gemini clients from the runtime
+        message = build_analysis_message(state)
+        
+        if runtime.fast_tier is not None and state.get("escalation_reason") is None:
+            started = time.perf_counter()
+            try:
+                state = first_pass_verdict(state, runtime.fast_tier.invoke([message]), runtime)
+            except Exception as e:
+                state = {**state, "escalation_reason": f"fast_error: {e}"}
+            state = record_timing(state, "model", started)
+            if state.get("analysis_complete"):
+                return state
+        
+        # Generate response
+        started = time.perf_counter()
+        try:
+            response = runtime.strong_tier.invoke([message])
+            state = record_timing(state, "model", started)
+            return {**parse_analysis_response(state, response), "model_tier": runtime.strong_tier.name}
+        except Exception as e:
+            # An escalation that fails must not cost the frame the verdict it already has
+            if state.get("fast_verdict") is None:
+                raise
+            return unescalated_verdict(record_timing(state, "model", started), e)
         
+    except CircuitOpenError:
+        return degraded_verdict(state, runtime)
     except json.JSONDecodeError as e:
         return {
             **state,
@@ -252,32 +681,180 @@ Return ONLY valid JSON, no markdown formatting or extra text."""
         }
 
 
-def manage_firebase_incidents(state: SecurityIncidentState) -> SecurityIncidentState:
+async def amodel_verdict(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """Async variant of model_verdict using the model's async invoke"""
+    try:
+        message = await asyncio.to_thread(build_analysis_message, state)
+        
+        if runtime.fast_tier is not None and state.get("escalation_reason") is None:
+            started = time.perf_counter()
+            try:
+                state = first_pass_verdict(state, await runtime.fast_tier.ainvoke([message]), runtime)
+            except Exception as e:
+                state = {**state, "escalation_reason": f"fast_error: {e}"}
+            state = record_timing(state, "model", started)
+            if state.get("analysis_complete"):
+                return state
+        
+        started = time.perf_counter()
+        try:
+            response = await runtime.strong_tier.ainvoke([message])
+            state = record_timing(state, "model", started)
+            return {**parse_analysis_response(state, response), "model_tier": runtime.strong_tier.name}
+        except Exception as e:
+            if state.get("fast_verdict") is None:
+                raise
+            return unescalated_verdict(record_timing(state, "model", started), e)
+        
+    except CircuitOpenError:
+        return await asyncio.to_thread(degraded_verdict, state, runtime)
+    except json.JSONDecodeError as e:
+        return {
+            **state,
+            "error": f"Failed to parse AI response: {str(e)}",
+            "analysis_complete": True
+        }
+    except Exception as e:
+        return {
+            **state,
+            "error": f"Analysis failed: {str(e)}",
+            "analysis_complete": True
+        }
+
+
+def build_batch_analysis_message(states: list) -> HumanMessage:
     """
-    Use AI agent with tool calling to automatically manage incidents in Firebase:
-    1. Fetch all existing incidents
-    2. Check if current incident already exists
-    3. Report new incidents
-    4. Resolve incidents that are now clear
+    One multimodal request covering frames from several cameras. The static
+    instructions are sent once; each frame follows as a labelled block.
+    """
+    prompt = BATCH_ANALYSIS_PROMPT.format(
+        count=len(states),
+        catalogue=INCIDENT_CATALOGUE,
+        guidelines=ANALYSIS_GUIDELINES
+    )
+
+    content = [{"type": "text", "text": prompt}]
+    for number, state in enumerate(states, start=1):
+        label = BATCH_FRAME_LABEL.format(
+            number=number, timestamp=state['timestamp'], location=state.get('location', 'Unknown')
+        )
+        if state.get("roi_images"):
+            names = ", ".join(f'"{region["name"]}"' for region in state["roi"])
+            label += BATCH_REGION_NOTE.format(names=names)
+        content.append({"type": "text", "text": label})
+        content.extend(image_parts(state))
+    return HumanMessage(content=content)
+
+
+def parse_batch_verdicts(response, count: int) -> dict:
+    """
+    Split a batched JSON array back into per-frame verdicts
+
+    Returns:
+        dict: Frame position (0-based) -> verdict; frames the model skipped are absent
+    """
+    results = parse_json_response(response)
+    if not isinstance(results, list):
+        raise ValueError("Batched analysis did not return a JSON array")
+    
+    verdicts = {}
+    for position, result in enumerate(results):
+        # Trust the frame number the model echoed back, fall back to array order
+        number = result.get("frame")
+        index = number - 1 if isinstance(number, int) and 1 <= number <= count else position
+        if index < count and index not in verdicts:
+            verdicts[index] = result
+    return verdicts
+
+
+def _batchable(state: SecurityIncidentState) -> bool:
+    """In-memory frames whose header parses (a bad frame must not sink the whole batch)"""
+    if state.get("image_bytes") is None or state.get("analysis_complete"):
+        return False
+    try:
+        Image.open(io.BytesIO(state["image_bytes"]))
+        return True
+    except Exception:
+        return False
+
+
+def _batch_failed(states, batch, error) -> list:
+    """The batched request itself failed: every frame in it reports the error"""
+    states = list(states)
+    for index in batch:
+        states[index] = {**states[index], "error": f"Analysis failed: {error}", "analysis_complete": True}
+    return states
+
+
+def _apply_batch_response(states, batch, response, runtime: AgentRuntime) -> list:
+    """
+    Copy the per-frame verdicts of a batched response into the frame states.
+    If the response can't be split, every frame falls back to its own request.
+    With tiering on the batch ran on the fast tier, so verdicts the escalation
+    policy flags are left for the strong tier.
     """
     try:
-        # Initialize model with tools
-        model = ChatGoogleGenerativeAI(
-            model=os.getenv("LLM_MODEL", "gemini-2.0-flash-exp"),
-            temperature=0
-        ).bind_tools([
-            get_all_incidents,
-            search_incident,
-            create_incident_report,
-            resolve_incident
-        ])
+        verdicts = parse_batch_verdicts(response, len(batch))
+    except (ValueError, AttributeError, TypeError) as e:
+        logger.warning(f"⚠️  Batched analysis response unusable ({e}), analysing frames one by one")
+        return list(states)
+    
+    states = list(states)
+    for position, index in enumerate(batch):
+        if position not in verdicts:
+            continue
+        try:
+            verdict = apply_verdict(states[index], verdicts[position])
+        except (KeyError, TypeError, ValueError):
+            continue  # malformed verdict, this frame gets its own request
         
-        # Create decision-making prompt
-        decision_prompt = f"""You are an automated incident management system. Based on the security analysis, manage incidents in Firebase.
+        reason = runtime.escalation.escalation_reason(verdict) if runtime.fast_tier is not None else None
+        if reason is None:
+            states[index] = {**verdict, "model_tier": runtime.first_tier().name}
+            remember_verdict(states[index], runtime, result_cache_key(states[index], runtime))
+        else:
+            states[index] = {**states[index], "escalation_reason": reason, "fast_verdict": verdicts[position]}
+    return states
+
+
+def analyze_security_batch(states: list, runtime: AgentRuntime = None) -> list:
+    """
+    Analyze several frames with one model request. Frames left without a
+    usable verdict keep analysis_complete False and are analysed on their own
+    when they go through the graph.
+    """
+    runtime = runtime or get_runtime()
+    # Identical frames analysed before stay out of the request
+    states = [lookup_cached_verdict(state, runtime) for state in states]
+    batch = [index for index, state in enumerate(states) if _batchable(state)]
+    if len(batch) < 2:
+        return states
+    
+    prefetches = {index: prefetch_open_incidents(states[index], runtime) for index in batch}
+    try:
+        message = build_batch_analysis_message([states[i] for i in batch])
+        started = time.perf_counter()
+        response = runtime.first_tier().invoke([message])
+    except CircuitOpenError:
+        return list(states)  # each frame takes the degraded path on its own
+    except Exception as e:
+        return _batch_failed(states, batch, e)
+    states = _apply_batch_response(states, batch, response, runtime)
+    for index, prefetch in prefetches.items():
+        states[index] = record_timing(states[index], "model", started)
+        states[index] = join_prefetch(states[index], prefetch)
+    return states
+
+
+def build_decision_prompt(state: SecurityIncidentState) -> str:
+    """Prompt asking the model to reconcile the analysis with Firebase"""
+    # Create decision-making prompt
+    decision_prompt = f"""You are an automated incident management system. Based on the security analysis, manage incidents in Firebase.
 
 **Current Analysis:**
 - Timestamp: {state['timestamp']}
 - Location: {state.get('location', 'Unknown')}
+- Organization: {state.get('organization_id')}
 - Problem Detected: {state['is_problem']}
 - Incident Type: {state['incident_type']}
 - Severity: {state['severity']}
@@ -297,58 +874,148 @@ def manage_firebase_incidents(state: SecurityIncidentState) -> SecurityIncidentS
 4. After taking action, respond with a summary of what you did.
 
 Be autonomous - make decisions and use tools without asking for confirmation."""
+    return decision_prompt
 
-        messages = [HumanMessage(content=decision_prompt)]
-        
-        print(f"\n{'='*60}")
-        print(f"FIREBASE INCIDENT MANAGEMENT")
-        print(f"{'='*60}")
-        
-        max_iterations = 10
-        iteration = 0
+
+def execute_tool_call(tool_call: dict) -> ToolMessage:
+    """Run one tool requested by the model and wrap its result"""
+    tool_name = tool_call["name"]
+    tool_args = tool_call["args"]
+    
+    logger.info(f"🔧 Executing: {tool_name} {tool_args}")
+    
+    # Execute the tool
+    if tool_name == "get_all_incidents":
+        tool_result = get_all_incidents.invoke({})
+    elif tool_name == "search_incident":
+        tool_result = search_incident.invoke(tool_args)
+    elif tool_name == "create_incident_report":
+        tool_result = create_incident_report.invoke(tool_args)
+    elif tool_name == "resolve_incident":
+        tool_result = resolve_incident.invoke(tool_args)
+    else:
+        tool_result = {"error": f"Unknown tool: {tool_name}"}
+    
+    logger.info(f"   Result of {tool_name}: {tool_result}")
+    
+    return ToolMessage(
+        content=json.dumps(tool_result),
+        tool_call_id=tool_call["id"]
+    )
+
+
+MAX_FIREBASE_ITERATIONS = 10
+
+
+def manage_firebase_incidents(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+    """
+    Reconcile the analysis with Firebase. By default the rules run directly
+    (no model call); with INCIDENT_RECONCILER=llm the tool-calling agent decides.
+    """
+    runtime = _runtime_from(config)
+    # The consumer commits the frame's offset once these writes land
+    with collect_writes() as writes:
+        state = _manage_firebase_incidents(state, runtime)
+    return {**state, "write_futures": writes}
+
+
+def _manage_firebase_incidents(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    if runtime.reconciler == "llm":
+        return manage_firebase_incidents_llm(state, runtime)
+    
+    try:
+        return {**state, **reconcile_incidents(state)}
+    except Exception as e:
+        logger.error(f"❌ Firebase management error: {str(e)}")
+        return {
+            **state,
+            "firebase_complete": True,
+            "error": f"Firebase management failed: {str(e)}"
+        }
+
+
+async def amanage_firebase_incidents(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+    """Async variant of manage_firebase_incidents; Firestore calls run in a thread"""
+    runtime = _runtime_from(config)
+    # Threads started with asyncio.to_thread copy the context, so their writes land in the same list
+    with collect_writes() as writes:
+        state = await _amanage_firebase_incidents(state, runtime)
+    return {**state, "write_futures": writes}
+
+
+async def _amanage_firebase_incidents(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    if runtime.reconciler == "llm":
+        return await amanage_firebase_incidents_llm(state, runtime)
+    
+    try:
+        return {**state, **(await asyncio.to_thread(reconcile_incidents, state))}
+    except Exception as e:
+        logger.error(f"❌ Firebase management error: {str(e)}")
+        return {
+            **state,
+            "firebase_complete": True,
+            "error": f"Firebase management failed: {str(e)}"
+        }
+
+
+def manage_firebase_incidents_llm(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """
+    Use AI agent with tool calling to automatically manage incidents in Firebase:
+    1. Fetch all existing incidents
+    2. Check if current incident already exists
+    3. Report new incidents
+    4. Resolve incidents that are now clear
+    """
+    try:
+        # Pooled model already bound to the Firebase tools
+        model = runtime.firebase_model()
+        messages = [HumanMessage(content=build_decision_prompt(state))]
         
-        while iteration < max_iterations:
-            iteration += 1
+        for _ in range(MAX_FIREBASE_ITERATIONS):
             response = model.invoke(messages)
             messages.append(response)
             
             # Check if the model wants to use tools
             if not response.tool_calls:
                 # No more tool calls, agent is done
-                print(f"\n✓ Agent Decision: {response.content}")
+                logger.info(f"✓ Agent Decision: {response.content}")
                 break
             
             # Execute tool calls
             for tool_call in response.tool_calls:
-                tool_name = tool_call["name"]
-                tool_args = tool_call["args"]
-                
-                print(f"\n🔧 Executing: {tool_name}")
-                print(f"   Args: {tool_args}")
-                
-                # Execute the tool
-                if tool_name == "get_all_incidents":
-                    tool_result = get_all_incidents.invoke({})
-                elif tool_name == "search_incident":
-                    tool_result = search_incident.invoke(tool_args)
-                elif tool_name == "create_incident_report":
-                    tool_result = create_incident_report.invoke(tool_args)
-                elif tool_name == "resolve_incident":
-                    tool_result = resolve_incident.invoke(tool_args)
-                else:
-                    tool_result = {"error": f"Unknown tool: {tool_name}"}
-                
-                print(f"   Result: {tool_result}")
-                
-                # Add tool result to messages
-                messages.append(
-                    ToolMessage(
-                        content=json.dumps(tool_result),
-                        tool_call_id=tool_call["id"]
-                    )
-                )
+                messages.append(execute_tool_call(tool_call))
         
-        print(f"{'='*60}\n")
+        return {
+            **state,
+            "firebase_complete": True,
+            "messages": messages
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Firebase management error: {str(e)}")
+        return {
+            **state,
+            "firebase_complete": True,
+            "error": f"Firebase management failed: {str(e)}"
+        }
+
+
+async def amanage_firebase_incidents_llm(state: SecurityIncidentState, runtime: AgentRuntime) -> SecurityIncidentState:
+    """Async variant of manage_firebase_incidents_llm; Firestore tools run in a thread"""
+    try:
+        model = runtime.firebase_model()
+        messages = [HumanMessage(content=build_decision_prompt(state))]
+        
+        for _ in range(MAX_FIREBASE_ITERATIONS):
+            response = await model.ainvoke(messages)
+            messages.append(response)
+            
+            if not response.tool_calls:
+                logger.info(f"✓ Agent Decision: {response.content}")
+                break
+            
+            for tool_call in response.tool_calls:
+                messages.append(await asyncio.to_thread(execute_tool_call, tool_call))
         
         return {
             **state,
@@ -357,7 +1024,7 @@ Be autonomous - make decisions and use tools without asking for confirmation."""
         }
         
     except Exception as e:
-        print(f"❌ Firebase management error: {str(e)}")
+        logger.error(f"❌ Firebase management error: {str(e)}")
         return {
             **state,
             "firebase_complete": True,
@@ -366,19 +1033,49 @@ Be autonomous - make decisions and use tools without asking for confirmation."""
 
 
 def route_after_validation(state: SecurityIncidentState) -> str:
-    """Route based on image validation"""
-    if state.get("error"):
+    """Route based on image validation; frames analysed in a batch skip the analysis node"""
+    if state.get("error") or state.get("firebase_complete"):
+        return END
+    if state.get("analysis_complete"):
+        return route_after_analysis(state)
+    return "prescreen"
+
+
+def route_after_local_screen(state: SecurityIncidentState) -> str:
+    """Frames the local screen completed need neither the model nor incident management"""
+    if state.get("firebase_complete"):
         return END
     return "analyze"
 
 
 def route_after_analysis(state: SecurityIncidentState) -> str:
-    """Route based on analysis completion"""
-    if state.get("error") or not state.get("analysis_complete"):
+    """Route based on analysis completion (degraded verdicts may need no incident management)"""
+    if state.get("error") or not state.get("analysis_complete") or state.get("firebase_complete"):
         return END
     return "manage_firebase"
 
 
+def record_timing(state: SecurityIncidentState, stage: str, started: float) -> SecurityIncidentState:
+    """State with the milliseconds since started (a perf_counter reading) added to the stage's timing"""
+    timings = state.get("timings") or {}
+    elapsed = 1000 * (time.perf_counter() - started)
+    return {**state, "timings": {**timings, stage: round(timings.get(stage, 0.0) + elapsed, 3)}}
+
+
+def timed_node(stage: str, func, afunc=None) -> RunnableLambda:
+    """Graph node that records how long it ran in state["timings"][stage]"""
+    def run(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+        started = time.perf_counter()
+        return record_timing(func(state, config), stage, started)
+    
+    async def arun(state: SecurityIncidentState, config: RunnableConfig = None) -> SecurityIncidentState:
+        started = time.perf_counter()
+        result = await afunc(state, config) if afunc is not None else func(state, config)
+        return record_timing(result, stage, started)
+    
+    return RunnableLambda(run, afunc=arun, name=stage)
+
+
 def create_security_monitoring_agent():
     """Create and compile the LangGraph security monitoring workflow with Firebase management"""
     
@@ -386,9 +1083,21 @@ def create_security_monitoring_agent():
     workflow = StateGraph(SecurityIncidentState)
     
     # Add nodes
-    workflow.add_node("load_image", load_and_validate_image)
-    workflow.add_node("analyze", analyze_security_incident)
-    workflow.add_node("manage_firebase", manage_firebase_incidents)
+    # Each model-calling node has a sync and an async implementation so the
+    # same graph serves both invoke() and ainvoke(); every node is timed
+    workflow.add_node("load_image", timed_node("load_image", load_and_validate_image))
+    workflow.add_node(
+        "prescreen",
+        timed_node("prescreen", local_screen_frame, alocal_screen_frame)
+    )
+    workflow.add_node(
+        "analyze",
+        timed_node("analyze", analyze_security_incident, aanalyze_security_incident)
+    )
+    workflow.add_node(
+        "manage_firebase",
+        timed_node("manage_firebase", manage_firebase_incidents, amanage_firebase_incidents)
+    )
     
     # Define edges
     workflow.set_entry_point("load_image")
@@ -396,6 +1105,16 @@ def create_security_monitoring_agent():
     workflow.add_conditional_edges(
         "load_image",
         route_after_validation,
+        {
+            "prescreen": "prescreen",
+            "manage_firebase": "manage_firebase",
+            END: END
+        }
+    )
+    
+    workflow.add_conditional_edges(
+        "prescreen",
+        route_after_local_screen,
         {
             "analyze": "analyze",
             END: END
@@ -417,35 +1136,38 @@ def create_security_monitoring_agent():
     return workflow.compile()
 
 
-# Convenience function to run the agent
-def monitor_security_image(
-    image_path: str,
+@lru_cache(maxsize=None)
+def get_security_monitoring_agent():
+    """Compiled graph shared by every frame (it holds no per-frame state)"""
+    return create_security_monitoring_agent()
+
+
+def build_initial_state(
+    image_path: str = None,
     timestamp: str = None,
     location: str = None,
-    organization_id: str = None
-) -> dict:
-    """
-    Run security monitoring on a single image with automated Firebase management
-    
-    Args:
-        image_path: Path to image file or base64 string
-        timestamp: Time of capture (defaults to current time)
-        location: Optional location/camera identifier
-        organization_id: this is the id of organizaiton this footage is
-    Returns:
-        Dictionary with analysis results
-    """
+    organization_id: str = None,
+    image_bytes: bytes = None,
+    image_mime: str = None,
+    roi: list = None,
+    roi_images: list = None,
+    trace_id: str = None
+) -> SecurityIncidentState:
+    """Initial agent state for a single frame"""
     if timestamp is None:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if image_path is None and image_bytes is None:
+        raise ValueError("Either image_path or image_bytes is required")
     
-    # Create agent
-    agent = create_security_monitoring_agent()
-    
-    # Initial state
-    initial_state = {
+    return {
         "image_path": image_path,
+        "image_bytes": image_bytes,
+        "image_mime": image_mime or (sniff_mime(image_bytes) if image_bytes is not None else None),
         "timestamp": timestamp,
         "location": location,
+        "organization_id": organization_id,
+        "roi": roi,
+        "roi_images": roi_images,
         "is_problem": None,
         "incident_type": None,
         "severity": None,
@@ -453,6 +1175,12 @@ def monitor_security_image(
         "description": None,
         "recommended_action": None,
         "people_count": None,
+        "incident_region": None,
+        "local_screen": None,
+        "model_tier": None,
+        "escalation_reason": None,
+        "fast_verdict": None,
+        "escalation_error": None,
         "existing_incidents": None,
         "incident_reported": False,
         "incident_resolved": False,
@@ -460,18 +1188,124 @@ def monitor_security_image(
         "analysis_complete": False,
         "firebase_complete": False,
         "error": None,
-        "messages": []
+        "messages": [],
+        "timings": {},
+        "trace_id": trace_id,
+        "write_futures": None
     }
+
+
+# Convenience function to run the agent
+def monitor_security_image(
+    image_path: str = None,
+    timestamp: str = None,
+    location: str = None,
+    organization_id: str = None,
+    runtime: AgentRuntime = None,
+    image_bytes: bytes = None,
+    image_mime: str = None,
+    roi: list = None,
+    roi_images: list = None,
+    trace_id: str = None
+) -> dict:
+    """
+    Run security monitoring on a single image with automated Firebase management
+    
+    Args:
+        image_path: Path to image file or base64 string
+        timestamp: Time of capture (defaults to current time)
+        location: Optional location/camera identifier
+        organization_id: this is the id of organizaiton this footage is
+        runtime: Model runtime to use (defaults to the shared one)
+        image_bytes: In-memory frame; used instead of image_path, nothing is written to disk
+        image_mime: Mime type of image_bytes (sniffed when omitted)
+        roi: Regions of interest (name, box, frame_size) analysed instead of the full frame
+        roi_images: JPEG crop for each entry in roi
+        trace_id: Trace of the frame, stored on the incidents it raises or resolves
+    Returns:
+        Dictionary with analysis results
+    """
+    # Shared compiled graph and model clients
+    agent = get_security_monitoring_agent()
+    runtime = runtime or get_runtime()
     
     # Run the agent
-    result = agent.invoke(initial_state)
-    print("\n✓ Security monitoring complete with Firebase management")
+    result = agent.invoke(
+        build_initial_state(
+            image_path, timestamp, location, organization_id, image_bytes, image_mime, roi, roi_images, trace_id
+        ),
+        config=runtime.config()
+    )
+    logger.debug("✓ Security monitoring complete with Firebase management")
     
     return result
 
 
+async def amonitor_security_image(
+    image_path: str = None,
+    timestamp: str = None,
+    location: str = None,
+    organization_id: str = None,
+    runtime: AgentRuntime = None,
+    image_bytes: bytes = None,
+    image_mime: str = None,
+    roi: list = None,
+    roi_images: list = None,
+    trace_id: str = None
+) -> dict:
+    """
+    Async variant of monitor_security_image. Model calls are awaited, so many
+    frames can be in flight on one event loop.
+    """
+    agent = get_security_monitoring_agent()
+    runtime = runtime or get_runtime()
+    return await agent.ainvoke(
+        build_initial_state(
+            image_path, timestamp, location, organization_id, image_bytes, image_mime, roi, roi_images, trace_id
+        ),
+        config=runtime.config()
+    )
+
+
+def _record_batch_timing(before: list, after: list, started: float) -> list:
+    """Frames the batched request (or the result cache) completed carry its time as their analysis time"""
+    return [
+        record_timing(state, "analyze", started)
+        if state.get("analysis_complete") and not previous.get("analysis_complete") else state
+        for previous, state in zip(before, after)
+    ]
+
+
+def monitor_security_batch(frames: list, runtime: AgentRuntime = None) -> list:
+    """
+    Run security monitoring on frames from several cameras with one model
+    request for the analysis; incident management still runs per frame
+    
+    Args:
+        frames: Keyword arguments of monitor_security_image for each frame
+        runtime: Model runtime to use (defaults to the shared one)
+    Returns:
+        list: Analysis results in the order of frames (the exception, for a
+            frame whose run failed)
+    """
+    agent = get_security_monitoring_agent()
+    runtime = runtime or get_runtime()
+    
+    # Frames the local screen completes stay out of the batched request
+    states = []
+    for frame in frames:
+        started = time.perf_counter()
+        state = local_screen_frame(build_initial_state(**frame), runtime.config())
+        states.append(record_timing(state, "prescreen", started))
+    
+    started = time.perf_counter()
+    states = _record_batch_timing(states, analyze_security_batch(states, runtime), started)
+    return agent.batch(states, config=runtime.config(), return_exceptions=True)
+
+
 # Example usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     result = monitor_security_image(
         image_path="fire.jpg",
         timestamp="2025-11-08 14:30:45",
@@ -1,23 +1,121 @@
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.auth.credentials import AnonymousCredentials
 from typing import Dict, Any
 
+from .firestore_writer import BatchedFirestoreWriter
+from .incident_index import OpenIncidentIndex
+
+logger = logging.getLogger(__name__)
+
+
 # ---------- INITIALIZATION ----------
 
+_db = None
+
+
+class _EmulatorCredential(credentials.Base):
+    """No-op credential for the local Firestore emulator (FIRESTORE_EMULATOR_HOST)."""
+
+    def get_credential(self):
+        return AnonymousCredentials()
+
+
 def get_db():
-    """Initialize Firebase once and return Firestore client."""
-    if not firebase_admin._apps:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        cred_path = os.path.join(current_dir, "serviceAccountKey.json")
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-    return firestore.client()
+    """Initialize Firebase once (on first use) and return the shared Firestore client."""
+    global _db
+    if _db is None:
+        if not firebase_admin._apps:
+            if os.getenv("FIRESTORE_EMULATOR_HOST"):
+                firebase_admin.initialize_app(
+                    _EmulatorCredential(),
+                    {"projectId": os.getenv("FIREBASE_PROJECT_ID", "demo-security-monitor")}
+                )
+            else:
+                current_dir = os.path.dirname(os.path.abspath(__file__))
+                cred_path = os.path.join(current_dir, "serviceAccountKey.json")
+                cred = credentials.Certificate(cred_path)
+                firebase_admin.initialize_app(cred)
+        _db = firestore.client()
+    return _db
+
+
+def set_db(client):
+    """Use a different Firestore client (e.g. an in-memory fake) and reset the index and writer."""
+    global _db, _index
+    close_writer()
+    _db = client
+    with _index_lock:
+        if _index is not None:
+            _index.stop()
+        _index = None
 
 
-db = get_db()
 INCIDENTS_COLLECTION = "incidents"
 
+_index = None
+_index_lock = threading.Lock()
+
+
+def _open_incidents_query():
+    return get_db().collection(INCIDENTS_COLLECTION).where("is_fixed", "==", False)
+
+
+def get_incident_index():
+    """
+    Shared open-incident index, seeded on first use. Returns None when
+    INCIDENT_INDEX_ENABLED=false (every lookup then queries Firestore).
+    """
+    global _index
+    if os.getenv("INCIDENT_INDEX_ENABLED", "true").lower() != "true":
+        return None
+    with _index_lock:
+        if _index is None:
+            index = OpenIncidentIndex()
+            index.seed(_open_incidents_query(), _serialize_doc)
+            if os.getenv("INCIDENT_INDEX_LISTENER", "false").lower() == "true":
+                index.watch(_open_incidents_query(), _serialize_doc)
+            _index = index
+        return _index
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """
+    Shared background batch writer. Returns None when FIRESTORE_BATCH_WRITES=false
+    (writes then happen synchronously in the caller).
+    """
+    global _writer
+    if os.getenv("FIRESTORE_BATCH_WRITES", "true").lower() != "true":
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = BatchedFirestoreWriter(
+                get_db(),
+                max_batch=int(os.getenv("FIRESTORE_BATCH_SIZE", "100")),
+                flush_interval=float(os.getenv("FIRESTORE_FLUSH_INTERVAL_MS", "50")) / 1000,
+                max_retries=int(os.getenv("FIRESTORE_WRITE_RETRIES", "5")),
+            )
+        return _writer
+
+
+def close_writer(timeout: float = None):
+    """Flush pending writes and stop the batch writer"""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close(timeout)
+            _writer = None
+
 
 # ---------- HELPERS ----------
 
@@ -43,14 +141,35 @@ def _serialize_doc(doc) -> Dict[str, Any]:
 
 def fetch_all_incidents() -> dict:
     """Fetch all incident documents from Firestore, JSON-safe."""
-    docs = db.collection(INCIDENTS_COLLECTION).stream()
+    docs = get_db().collection(INCIDENTS_COLLECTION).stream()
     incidents = [_serialize_doc(doc) for doc in docs]
     return {"count": len(incidents), "incidents": incidents}
 
 
+def fetch_open_incidents() -> dict:
+    """Fetch open incidents, from the index when enabled, JSON-safe."""
+    index = get_incident_index()
+    if index is not None:
+        incidents = index.all()
+    else:
+        incidents = [_serialize_doc(doc) for doc in _open_incidents_query().stream()]
+    return {"count": len(incidents), "incidents": incidents}
+
+
 def find_incident(timestamp: str, location: str, incident_type: str) -> dict:
     """Find an incident matching timestamp + location + type."""
-    coll = db.collection(INCIDENTS_COLLECTION)
+    index = get_incident_index()
+    if index is not None:
+        for incident in index.all():
+            if (
+                incident.get("timestamp") == timestamp
+                and incident.get("location") == location
+                and incident.get("incident_type") == incident_type
+            ):
+                return {"found": True, "incident": incident}
+        return {"found": False}
+
+    coll = get_db().collection(INCIDENTS_COLLECTION)
     query = (
         coll.where("timestamp", "==", timestamp)
         .where("location", "==", location)
@@ -64,15 +183,135 @@ def find_incident(timestamp: str, location: str, incident_type: str) -> dict:
     return {"found": True, "incident": _serialize_doc(doc)}
 
 
+def find_open_incidents(location: str, organization_id: str = None, incident_type: str = None) -> list:
+    """
+    Open (not fixed) incidents at a location, optionally narrowed to an organization and type.
+    Incidents without an organization (reported before frames carried one) match any organization.
+    """
+    index = get_incident_index()
+    if index is not None:
+        return index.lookup(location, organization_id, incident_type)
+
+    query = _open_incidents_query().where("location", "==", location)
+    if incident_type is not None:
+        query = query.where("incident_type", "==", incident_type)
+    incidents = [_serialize_doc(doc) for doc in query.stream()]
+    if organization_id is None:
+        return incidents
+    return [i for i in incidents if i.get("organization_id") in (organization_id, None)]
+
+
 def report_incident(data: Dict[str, Any]) -> dict:
-    """Create a new incident in Firestore."""
-    ref = db.collection(INCIDENTS_COLLECTION).add(data)[1]  # returns (write_result, reference)
-    return {"success": True, "doc_id": ref.id}
+    """Create a new incident in Firestore (queued on the batch writer when enabled)."""
+    started = time.time()
+    writer = get_writer()
+    if writer is not None:
+        doc_id, future = writer.create(INCIDENTS_COLLECTION, data)
+        _trace_write(data.get("trace_id"), "create", doc_id, started, future)
+    else:
+        doc_id = get_db().collection(INCIDENTS_COLLECTION).add(data)[1].id  # returns (write_result, reference)
+        _trace_write(data.get("trace_id"), "create", doc_id, started)
+    if writer is not None:
+        _remember_write(future)
+    index = get_incident_index()
+    if index is not None:
+        index.add({**_serialize_firestore_data(data), "_doc_id": doc_id})
+        if writer is not None:
+            # A dropped create must not leave a phantom open incident behind
+            _undo_on_failure(future, lambda: index.remove(doc_id), f"create of incident {doc_id}")
+    return {"success": True, "doc_id": doc_id, "queued": writer is not None}
 
 
-def mark_incident_fixed(doc_id: str) -> dict:
-    """Mark an incident as fixed in Firestore."""
-    db.collection(INCIDENTS_COLLECTION).document(doc_id).update(
-        {"is_fixed": True, "fixed_at": firestore.SERVER_TIMESTAMP}
-    )
-    return {"success": True, "doc_id": doc_id, "status": "fixed"}
+def mark_incident_fixed(doc_id: str, trace_id: str = None) -> dict:
+    """Mark an incident as fixed in Firestore (queued on the batch writer when enabled)."""
+    fields = {"is_fixed": True, "fixed_at": firestore.SERVER_TIMESTAMP}
+    if trace_id is not None:
+        fields["fixed_trace_id"] = trace_id
+    started = time.time()
+    writer = get_writer()
+    future = None
+    if writer is not None:
+        future = writer.update(INCIDENTS_COLLECTION, doc_id, fields)
+        _remember_write(future)
+        _trace_write(trace_id, "resolve", doc_id, started, future)
+    else:
+        get_db().collection(INCIDENTS_COLLECTION).document(doc_id).update(fields)
+        _trace_write(trace_id, "resolve", doc_id, started)
+    index = get_incident_index()
+    if index is not None:
+        incident = index.remove(doc_id)
+        if future is not None and incident is not None:
+            # A dropped resolve leaves the document open, so the index keeps it open too
+            _undo_on_failure(future, lambda: index.add(incident), f"resolve of incident {doc_id}")
+    return {"success": True, "doc_id": doc_id, "status": "fixed", "queued": writer is not None}
+
+
+# Futures of the writes queued by the frame being reconciled, set by collect_writes()
+_frame_writes = ContextVar("frame_writes", default=None)
+
+
+@contextmanager
+def collect_writes():
+    """Collect the futures of batched writes queued meanwhile (by this thread or task) into the yielded list"""
+    futures = []
+    token = _frame_writes.set(futures)
+    try:
+        yield futures
+    finally:
+        _frame_writes.reset(token)
+
+
+def _remember_write(future):
+    futures = _frame_writes.get()
+    if futures is not None:
+        futures.append(future)
+
+
+def _undo_on_failure(future, undo, description):
+    """
+    Revert an index change made when a write was queued, if the writer drops
+    the write. Registered after the change, so a write that already failed
+    is undone right away.
+    """
+    def landed(f):
+        if f.exception() is None:
+            return
+        logger.error(f"Reverting the open-incident index after the {description} was dropped")
+        try:
+            undo()
+        except Exception as e:
+            logger.error(f"Could not revert the open-incident index: {e}")
+
+    future.add_done_callback(landed)
+
+
+# ---------- WRITE TRACING ----------
+
+_write_listener = None
+
+
+def set_write_listener(listener):
+    """
+    Call listener(trace_id, operation, doc_id, started, ended, error) once each
+    write of a traced frame lands in Firestore (times in epoch seconds); None
+    stops tracing writes.
+    """
+    global _write_listener
+    _write_listener = listener
+
+
+def _trace_write(trace_id, operation, doc_id, started, future=None):
+    listener = _write_listener
+    if listener is None or trace_id is None:
+        return
+
+    def landed(error):
+        try:
+            listener(trace_id, operation, doc_id, started, time.time(), error)
+        except Exception as e:
+            logger.warning(f"Write listener failed: {e}")
+
+    if future is None:
+        landed(None)
+    else:
+        future.add_done_callback(lambda f: landed(f.exception()))
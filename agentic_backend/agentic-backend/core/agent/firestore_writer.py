@@ -0,0 +1,156 @@
+"""
+Background Firestore writer - collects incident creates and updates into batch
+writes so frame analysis never waits on a Firestore round trip
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 operations
+MAX_BATCH_OPERATIONS = 500
+
+_FLUSH = object()
+
+
+class _WriteOp:
+    __slots__ = ("kind", "ref", "data", "future", "queued_at")
+
+    def __init__(self, kind, ref, data):
+        self.kind = kind  # "set" or "update"
+        self.ref = ref
+        self.data = data
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+class BatchedFirestoreWriter:
+    """
+    Queue of pending writes flushed as one Firestore batch when max_batch
+    operations are waiting or flush_interval seconds have passed since the
+    first one. Failed batches are retried with jittered exponential backoff;
+    a batch that still fails is split and each write committed on its own, so
+    one bad write (e.g. an update to a deleted document) only fails itself.
+    Every write returns a Future that resolves to the document ID once
+    committed, or to the error once the write is dropped.
+    """
+
+    def __init__(self, db, max_batch=100, flush_interval=0.05, max_retries=5, backoff=0.2):
+        """
+        Args:
+            db: Firestore client
+            max_batch: Operations per batch (capped at Firestore's 500)
+            flush_interval: Longest a write waits for its batch to fill, in seconds
+            max_retries: Commit attempts of a batch before its writes are tried one by one
+            backoff: Base delay between retries, in seconds
+        """
+        self.db = db
+        self.max_batch = min(max_batch, MAX_BATCH_OPERATIONS)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="firestore-writer", daemon=True)
+        self._thread.start()
+
+    def create(self, collection: str, data: dict):
+        """
+        Queue a new document. The ID is allocated client-side, so it is known
+        before the write lands.
+
+        Returns:
+            tuple: (doc_id, Future resolving to doc_id after commit)
+        """
+        ref = self.db.collection(collection).document()
+        return ref.id, self._submit("set", ref, data)
+
+    def update(self, collection: str, doc_id: str, fields: dict) -> Future:
+        """Queue a field update; the Future resolves to doc_id after commit"""
+        return self._submit("update", self.db.collection(collection).document(doc_id), fields)
+
+    def _submit(self, kind, ref, data) -> Future:
+        if self._closed:
+            raise RuntimeError("Firestore writer is closed")
+        op = _WriteOp(kind, ref, data)
+        self._queue.put(op)
+        return op.future
+
+    def pending(self) -> int:
+        """Writes queued but not yet committed"""
+        return self._queue.qsize()
+
+    def _collect(self, first):
+        """Gather more operations until the batch is full or the interval ends"""
+        ops = [first]
+        deadline = first.queued_at + self.flush_interval
+        while len(ops) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                op = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if op is _FLUSH:
+                self._queue.put(_FLUSH)  # stop after this batch
+                break
+            ops.append(op)
+        return ops
+
+    def _commit(self, ops, attempts):
+        """Commit one batch, retrying with jittered exponential backoff; returns the last error or None"""
+        for attempt in range(1, attempts + 1):
+            try:
+                batch = self.db.batch()
+                for op in ops:
+                    if op.kind == "set":
+                        batch.set(op.ref, op.data)
+                    else:
+                        batch.update(op.ref, op.data)
+                batch.commit()
+                return None
+            except Exception as e:
+                if attempt == attempts:
+                    return e
+                delay = self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                logger.warning(f"Firestore batch of {len(ops)} failed ({e}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _FLUSH:
+                break
+
+            ops = self._collect(first)
+            error = self._commit(ops, self.max_retries)
+            if error is None:
+                for op in ops:
+                    op.future.set_result(op.ref.id)
+                continue
+
+            # Batches commit atomically, so find the writes that fail on their own;
+            # the batch already used up the retries, each write gets one attempt
+            if len(ops) > 1:
+                logger.warning(f"Firestore batch of {len(ops)} failed after {self.max_retries} attempts, "
+                               f"committing its writes one by one")
+            for op in ops:
+                op_error = self._commit([op], 1) if len(ops) > 1 else error
+                if op_error is None:
+                    op.future.set_result(op.ref.id)
+                else:
+                    logger.error(f"Dropping Firestore {op.kind} of {op.ref.id}: {op_error}")
+                    op.future.set_exception(op_error)
+
+    def close(self, timeout: float = None):
+        """Flush everything queued, then stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_FLUSH)
+        self._thread.join(timeout)
@@ -0,0 +1,114 @@
+"""
+In-memory image helpers - detect the frame format from its bytes and only
+re-encode when Gemini can't take the format as-is
+"""
+
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+# Formats Gemini accepts directly; anything else is transcoded to JPEG
+PASSTHROUGH_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+
+
+def sniff_mime(data) -> str | None:
+    """Identify common image formats from their magic bytes"""
+    head = bytes(data[:12])
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head.startswith(b"BM"):
+        return "image/bmp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    return None
+
+
+def flatten_to_rgb(image: Image.Image) -> Image.Image:
+    """Convert to RGB, compositing any alpha channel onto white"""
+    if image.mode in ("RGBA", "LA"):
+        background = Image.new("RGB", image.size, (255, 255, 255))  # white background
+        background.paste(image, mask=image.split()[-1])  # paste using alpha channel as mask
+        return background
+    return image.convert("RGB")
+
+
+def encode_jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    """Encode a PIL image as JPEG bytes"""
+    buffer = BytesIO()
+    flatten_to_rgb(image).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def prepare_image_bytes(data) -> tuple[bytes, str]:
+    """
+    Get frame bytes ready for the model without touching the filesystem.
+
+    JPEG, PNG and WebP pass through untouched; other formats are decoded and
+    re-encoded as JPEG in memory.
+
+    Returns:
+        tuple: (image bytes, mime type)
+    """
+    mime = sniff_mime(data)
+    if mime in PASSTHROUGH_MIME_TYPES:
+        return data, mime
+    return encode_jpeg(Image.open(BytesIO(data))), "image/jpeg"
+
+
+def downscale_frame(data, max_long_edge: int, quality: int = 80, max_bytes: int = None,
+                    min_quality: int = 50, quality_step: int = 10) -> tuple[bytes, dict]:
+    """
+    Shrink a frame to fit max_long_edge and re-encode it as JPEG.
+
+    JPEG frames are decoded in draft mode, which lets libjpeg scale by 1/2-1/8
+    while decoding instead of decoding full size and resizing. If the result is
+    still larger than max_bytes, quality steps down until it fits or reaches
+    min_quality.
+
+    Returns:
+        tuple: (JPEG bytes, dict with the width, height and quality used)
+    """
+    image = Image.open(BytesIO(data))
+    scale = min(1.0, max_long_edge / max(image.size))
+    target = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    image.draft("RGB", target)
+    image = flatten_to_rgb(image)
+    if image.size != target:
+        # Box (area average) filtering is the cheapest resize that doesn't alias
+        image = image.resize(target, Image.BOX)
+
+    encoded = encode_jpeg(image, quality)
+    while max_bytes and len(encoded) > max_bytes and quality > min_quality:
+        quality = max(min_quality, quality - quality_step)
+        encoded = encode_jpeg(image, quality)
+    return encoded, {"width": image.width, "height": image.height, "quality": quality}
+
+
+def grayscale_thumbnail(data, size: tuple[int, int]) -> Image.Image:
+    """
+    Decode a small grayscale version of the frame.
+
+    For JPEG, draft mode lets the decoder skip straight to a 1/2-1/8 scale,
+    so this costs a fraction of a full decode.
+    """
+    image = Image.open(BytesIO(data))
+    image.draft("L", (size[0] * 2, size[1] * 2))
+    return image.convert("L").resize(size, Image.BILINEAR)
+
+
+def to_data_url(data, mime: str = "image/jpeg") -> str:
+    """Base64 data URL for a multimodal message part"""
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
@@ -0,0 +1,116 @@
+"""
+In-process index of open incidents - seeded once from Firestore, kept current
+by our own writes and (optionally) a Firestore snapshot listener, so per-frame
+lookups never have to query the incidents collection
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class OpenIncidentIndex:
+    """
+    Open (not fixed) incidents keyed by (organization_id, location), each
+    holding {doc_id: incident}. Lookups filter that small set by incident type.
+    Incidents reported before frames carried an organization are keyed by
+    (None, location) and match lookups of any organization at the location;
+    a lookup without an organization matches every organization's incidents.
+    """
+
+    def __init__(self):
+        self._incidents = {}  # (organization_id, location) -> {doc_id: incident}
+        self._keys = {}       # doc_id -> (organization_id, location)
+        self._lock = threading.RLock()
+        self._watch = None
+        self.seeded = False
+
+    @staticmethod
+    def _key(incident: dict):
+        return incident.get("organization_id"), incident.get("location")
+
+    def add(self, incident: dict):
+        """Insert or update an incident (must carry _doc_id); fixed ones are removed"""
+        doc_id = incident["_doc_id"]
+        if incident.get("is_fixed"):
+            self.remove(doc_id)
+            return
+        with self._lock:
+            self.remove(doc_id)
+            key = self._key(incident)
+            self._incidents.setdefault(key, {})[doc_id] = incident
+            self._keys[doc_id] = key
+
+    def remove(self, doc_id: str):
+        """Drop an incident (fixed or deleted); returns it, or None if it was not indexed"""
+        with self._lock:
+            key = self._keys.pop(doc_id, None)
+            if key is None:
+                return None
+            bucket = self._incidents.get(key, {})
+            incident = bucket.pop(doc_id, None)
+            if not bucket:
+                self._incidents.pop(key, None)
+            return incident
+
+    def lookup(self, location: str, organization_id: str = None, incident_type: str = None) -> list:
+        """
+        Open incidents at a location, optionally of one type. An organization
+        also matches incidents without one; None matches every organization,
+        as the Firestore query in find_open_incidents does.
+        """
+        with self._lock:
+            if organization_id is None:
+                buckets = [bucket for key, bucket in self._incidents.items() if key[1] == location]
+            else:
+                buckets = [self._incidents.get(key, {}) for key in ((organization_id, location), (None, location))]
+            incidents = [incident for bucket in buckets for incident in bucket.values()]
+            return [
+                incident for incident in incidents
+                if incident_type is None or incident.get("incident_type") == incident_type
+            ]
+
+    def all(self) -> list:
+        """Every open incident"""
+        with self._lock:
+            return [incident for bucket in self._incidents.values() for incident in bucket.values()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._keys)
+
+    def seed(self, query, serialize):
+        """
+        Load every open incident once
+
+        Args:
+            query: Firestore query for open incidents
+            serialize: Callable turning a DocumentSnapshot into a dict with _doc_id
+        """
+        with self._lock:
+            for doc in query.stream():
+                self.add(serialize(doc))
+            self.seeded = True
+        logger.info(f"Open incident index seeded with {len(self)} incidents")
+
+    def watch(self, query, serialize):
+        """
+        Follow changes made by other processes through a snapshot listener.
+        Documents leaving the open-incidents query (fixed or deleted) are dropped.
+        """
+        def on_snapshot(_docs, changes, _read_time):
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    self.remove(change.document.id)
+                else:
+                    self.add(serialize(change.document))
+
+        self._watch = query.on_snapshot(on_snapshot)
+        logger.info("Open incident index listening for Firestore changes")
+
+    def stop(self):
+        """Detach the snapshot listener"""
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
@@ -0,0 +1,160 @@
+"""
+Local CPU screen in front of the LLM - colour heuristics for fire and smoke
+and an optional OpenCV HOG person detector decide whether a frame is
+confidently normal, so empty, quiet scenes never reach Gemini
+
+It only knows upright people (HOG) and flame or smoke colours. A collapsed
+person, an unattended package, water on the floor or a weapon without anyone
+standing nearby all look normal to it, so turn it on only for cameras where
+skipping such frames is acceptable (LOCAL_SCREEN_ENABLED, off by default).
+
+Throughput at the default 640 px analysis width is about 15 frames/s per core
+(benchmarks/bench_local_screen.py); the HOG detector takes ~85% of that time,
+the draft-mode decode and colour checks the rest.
+"""
+
+import io
+import logging
+import os
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+try:
+    import cv2
+except ImportError:  # person detection is optional
+    cv2 = None
+
+
+def fire_mask(r: np.ndarray, g: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Flame-coloured pixels: bright, red-dominant, R >= G > B with a strong red-blue gap"""
+    return (r > 180) & (r >= g) & (g > b) & (r - b > 90)
+
+
+def smoke_mask(r: np.ndarray, g: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Smoke-coloured pixels: low-saturation greys in the mid-to-light range"""
+    spread = np.maximum(np.maximum(r, g), b) - np.minimum(np.minimum(r, g), b)
+    total = r + g + b
+    return (spread < 20) & (total > 270) & (total < 660)
+
+
+class PeopleDetector:
+    """OpenCV's HOG + linear SVM pedestrian detector (CPU only)"""
+
+    def __init__(self, width: int = 640, min_weight: float = 0.5, scale: float = 1.1):
+        """
+        Args:
+            width: Frames are resized to this width before detection (people
+                must be at least 64x128 pixels at this size to be found)
+            min_weight: SVM score a detection needs to count
+            scale: Image pyramid step; 1.05 finds a few more people at about
+                twice the cost
+        """
+        self.width = width
+        self.min_weight = min_weight
+        self.scale = scale
+        self._hog = cv2.HOGDescriptor()
+        self._hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def count(self, gray: np.ndarray) -> int:
+        """Number of people found in a grayscale frame"""
+        height, width = gray.shape
+        if width != self.width:
+            gray = cv2.resize(gray, (self.width, round(height * self.width / width)), interpolation=cv2.INTER_AREA)
+        _, weights = self._hog.detectMultiScale(gray, winStride=(8, 8), padding=(8, 8), scale=self.scale)
+        return int(np.count_nonzero(np.asarray(weights).ravel() > self.min_weight))
+
+
+class LocalScreen:
+    """
+    Cheap first-stage classifier. A frame is confidently normal when it has
+    (almost) no flame-coloured pixels, little smoke-coloured area and no more
+    than max_people people; anything else goes to the LLM. Without OpenCV the
+    people count is unknown, so no frame is ever confidently normal.
+    """
+
+    def __init__(
+        self,
+        fire_fraction: float = 0.002,
+        smoke_fraction: float = 0.25,
+        max_people: int = 0,
+        analysis_width: int = 640,
+        people_detector: PeopleDetector = None
+    ):
+        """
+        Args:
+            fire_fraction: Share of flame-coloured pixels that escalates a frame
+            smoke_fraction: Share of smoke-coloured pixels that escalates a frame
+            max_people: Most people a confidently normal frame may contain
+            analysis_width: Width the frame is decoded to (JPEG draft mode)
+            people_detector: Person detector (defaults to HOG when OpenCV is installed)
+        """
+        self.fire_fraction = fire_fraction
+        self.smoke_fraction = smoke_fraction
+        self.max_people = max_people
+        self.analysis_width = analysis_width
+        if people_detector is None and cv2 is not None:
+            people_detector = PeopleDetector(width=analysis_width)
+        self.people_detector = people_detector
+        if self.people_detector is None:
+            logger.warning("OpenCV not installed - local screen cannot count people and will escalate every frame")
+
+    @classmethod
+    def from_env(cls):
+        """Build from LOCAL_SCREEN_* environment variables, or None when disabled"""
+        if os.getenv("LOCAL_SCREEN_ENABLED", "false").lower() != "true":
+            return None
+        return cls(
+            fire_fraction=float(os.getenv("LOCAL_SCREEN_FIRE_FRACTION", "0.002")),
+            smoke_fraction=float(os.getenv("LOCAL_SCREEN_SMOKE_FRACTION", "0.25")),
+            max_people=int(os.getenv("LOCAL_SCREEN_MAX_PEOPLE", "0")),
+            analysis_width=int(os.getenv("LOCAL_SCREEN_WIDTH", "640"))
+        )
+
+    def decode(self, data) -> np.ndarray:
+        """RGB array of the frame at roughly analysis_width (JPEG decodes at 1/2-1/8 scale)"""
+        image = Image.open(io.BytesIO(data))
+        scale = min(1.0, self.analysis_width / image.width)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image.draft("RGB", size)
+        image = image.convert("RGB")
+        if image.size != size:
+            image = image.resize(size, Image.BOX)
+        return np.asarray(image)
+
+    def screen(self, data) -> dict:
+        """
+        Score a frame
+
+        Returns:
+            dict: fire_fraction, smoke_fraction, people_count (None without a
+                detector), normal (confidently normal) and confidence
+        """
+        rgb = self.decode(data)
+        # Colour shares are stable at half resolution, which quarters the work
+        r, g, b = (rgb[::2, ::2, i].astype(np.int16) for i in range(3))
+        fire = float(fire_mask(r, g, b).mean())
+        smoke = float(smoke_mask(r, g, b).mean())
+
+        people = None
+        if self.people_detector is not None:
+            gray = np.asarray(Image.fromarray(rgb).convert("L"))
+            people = self.people_detector.count(gray)
+
+        normal = (
+            people is not None
+            and people <= self.max_people
+            and fire < self.fire_fraction
+            and smoke < self.smoke_fraction
+        )
+        # 1.0 for a frame far below both thresholds, 0.5 right at them
+        margin = max(fire / self.fire_fraction, smoke / self.smoke_fraction)
+        return {
+            "fire_fraction": fire,
+            "smoke_fraction": smoke,
+            "people_count": people,
+            "normal": normal,
+            "confidence": round(max(0.5, 1.0 - 0.5 * margin), 3),
+        }
@@ -0,0 +1,126 @@
+"""
+Deterministic incident reconciliation - applies the incident management rules
+directly instead of asking the model which Firebase tools to call
+"""
+
+from datetime import datetime
+
+from .firebase_tools import find_open_incidents, mark_incident_fixed, report_incident
+
+# Incident types of degraded verdicts (local screen only, model unavailable)
+UNVERIFIED_PREFIX = "unverified_"
+
+
+def build_incident_record(
+    timestamp: str,
+    location: str,
+    incident_type: str,
+    severity: str,
+    description: str,
+    confidence: float,
+    people_count: int,
+    recommended_action: str,
+    organization_id: str = None,
+    region: dict = None,
+    trace_id: str = None,
+    needs_review: bool = False
+) -> dict:
+    """Firestore document for a newly reported incident"""
+    record = {
+        "timestamp": timestamp,
+        "location": location,
+        "organization_id": organization_id,
+        "incident_type": incident_type,
+        "severity": severity,
+        "description": description,
+        "confidence": confidence,
+        "people_count": people_count,
+        "recommended_action": recommended_action,
+        "is_fixed": False,
+        "reported_at": datetime.now().isoformat()
+    }
+    if region is not None:
+        # Name and full-frame pixel box of the region of interest the incident was seen in
+        record["region"] = region
+    if trace_id is not None:
+        # Trace of the frame that raised the incident, for capture-to-alert latency
+        record["trace_id"] = trace_id
+    if needs_review:
+        # Raised without the model; someone has to confirm it
+        record["needs_review"] = True
+    return record
+
+
+def reconcile_incidents(state: dict) -> dict:
+    """
+    Bring Firebase in line with the latest analysis of a camera:
+    - problem and no open incident of that type at the location: report it
+    - problem and an open incident already exists: nothing to do
+    - no problem: resolve every open incident at the location
+
+    Verdicts of the degraded path (model_tier "degraded") are reported with
+    needs_review. The model's next verdict at the location supersedes them:
+    a confirmed problem resolves them before its own incident is reported.
+
+    Open incidents prefetched during analysis (state["existing_incidents"])
+    are used instead of a second lookup.
+
+    Returns:
+        dict: State updates (existing_incidents, incident_reported,
+            incident_resolved, firebase_doc_id, firebase_complete)
+    """
+    location = state.get("location")
+    organization_id = state.get("organization_id")
+    prefetched = state.get("existing_incidents")
+    updates = {
+        "incident_reported": False,
+        "incident_resolved": False,
+        "firebase_doc_id": None,
+        "firebase_complete": True,
+    }
+
+    if state.get("is_problem"):
+        degraded = state.get("model_tier") == "degraded"
+        if degraded:
+            at_location = prefetched
+        else:
+            # The model saw the scene, so unverified incidents there are settled either way
+            at_location = prefetched if prefetched is not None else find_open_incidents(location, organization_id)
+            for incident in at_location:
+                if incident.get("needs_review"):
+                    mark_incident_fixed(incident["_doc_id"], state.get("trace_id"))
+                    updates["incident_resolved"] = True
+            at_location = [i for i in at_location if not i.get("needs_review")]
+        if at_location is not None:
+            existing = [i for i in at_location if i.get("incident_type") == state["incident_type"]]
+        else:
+            existing = find_open_incidents(location, organization_id, state["incident_type"])
+        updates["existing_incidents"] = existing
+        if existing:
+            updates["firebase_doc_id"] = existing[0]["_doc_id"]
+            return updates
+
+        result = report_incident(build_incident_record(
+            timestamp=state["timestamp"],
+            location=location,
+            incident_type=state["incident_type"],
+            severity=state["severity"],
+            description=state["description"],
+            confidence=state["confidence"],
+            people_count=state["people_count"],
+            recommended_action=state["recommended_action"],
+            organization_id=organization_id,
+            region=state.get("incident_region"),
+            trace_id=state.get("trace_id"),
+            needs_review=degraded
+        ))
+        updates["incident_reported"] = True
+        updates["firebase_doc_id"] = result["doc_id"]
+        return updates
+
+    existing = prefetched if prefetched is not None else find_open_incidents(location, organization_id)
+    updates["existing_incidents"] = existing
+    for incident in existing:
+        mark_incident_fixed(incident["_doc_id"], state.get("trace_id"))
+        updates["incident_resolved"] = True
+    return updates
@@ -0,0 +1,432 @@
+"""
+Client-side protection for model calls - a token-bucket limiter sized to the
+requests/tokens-per-minute quota, per-call timeouts, jittered retries, a
+circuit breaker and optional hedged requests for slow calls
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Gemini bills an image of up to 768x768 as 258 tokens; frames are
+# downscaled to about 1024 px, i.e. two such tiles
+IMAGE_TOKENS = 516
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = ("ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError", "TooManyRequests")
+
+
+class CircuitOpenError(RuntimeError):
+    """The model is failing and calls are short-circuited until the breaker resets"""
+
+
+def estimate_tokens(messages, max_output_tokens: int = 300) -> int:
+    """Rough token count of a request (text at ~4 characters per token) plus its reply"""
+    tokens = max_output_tokens
+    for message in messages:
+        content = message.content
+        parts = content if isinstance(content, list) else [content]
+        for part in parts:
+            if isinstance(part, str):
+                tokens += len(part) // 4
+            elif part.get("type") == "text":
+                tokens += len(part["text"]) // 4
+            else:
+                tokens += IMAGE_TOKENS
+    return tokens
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, 429s and 5xx responses are worth retrying"""
+    if isinstance(error, (TimeoutError, ConnectionError, concurrent.futures.TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and status in RETRYABLE_STATUS:
+        return True
+    text = f"{type(error).__name__} {error}"
+    return any(name in text for name in RETRYABLE_NAMES) or "429" in text
+
+
+class TokenBucket:
+    """
+    Reservation-style token bucket: a caller takes its tokens straight away
+    (the balance may go negative) and waits until the debt is refilled, so
+    callers are served in arrival order and large requests can't starve.
+    """
+
+    def __init__(self, per_minute: float, burst: float = None):
+        """
+        Args:
+            per_minute: Refill rate (the quota)
+            burst: Most tokens that can be saved up (default a tenth of the quota)
+        """
+        self.rate = per_minute / 60
+        self.capacity = burst or max(1.0, per_minute / 10)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount tokens and return how long to wait before using them, in seconds"""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def try_take(self, amount: float) -> bool:
+        """Take amount tokens only if they are available right now"""
+        with self._lock:
+            self._refill()
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def adjust(self, amount: float):
+        """Charge (or refund, if negative) the difference between an estimate and the actual use"""
+        with self._lock:
+            self._tokens -= amount
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures; while open every call
+    fails fast. After reset_timeout one trial call is let through (half open)
+    and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.opened = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True  # the trial call
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                    logger.warning(f"⚡ Model circuit breaker open for {self.reset_timeout:.0f}s")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls, for the hedging threshold"""
+
+    def __init__(self, size: int = 500):
+        self._samples = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int) -> float | None:
+        """The q quantile, or None until min_samples calls were seen"""
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ModelGuard:
+    """
+    Wraps every call of a model tier. A call waits for rate-limit tokens,
+    runs with a timeout and is retried with full-jitter exponential backoff
+    on retryable errors. Failures feed the circuit breaker, which turns calls
+    into CircuitOpenError while the model is down. With hedging on, a call
+    still running after the p95 latency gets a duplicate on another pooled
+    client (if the quota has room) and the first answer wins.
+
+    A sync request cannot be cancelled once it runs, so timed-out attempts
+    and losing hedges keep their thread until the model answers. They count
+    as abandoned calls; while max_abandoned of them are still running, new
+    calls fail fast with CircuitOpenError instead of queueing behind them.
+    """
+
+    def __init__(
+        self,
+        rpm: float = None,
+        tpm: float = None,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        breaker: CircuitBreaker = None,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        max_abandoned: int = 8
+    ):
+        """
+        Args:
+            rpm: Requests-per-minute quota (None for no limit)
+            tpm: Tokens-per-minute quota (None for no limit)
+            timeout: Seconds before an attempt is abandoned (None waits forever)
+            max_retries: Retries after the first attempt
+            backoff: Base of the exponential backoff, in seconds
+            max_backoff: Longest pause between attempts, in seconds
+            breaker: Circuit breaker (default opens after 5 failures for 30s)
+            hedge: Send a duplicate request when a call outlives the hedge quantile
+            hedge_quantile: Latency quantile after which a call is hedged
+            hedge_min_samples: Calls to observe before hedging starts
+            max_abandoned: Timed-out or losing sync requests still running
+                before calls are short-circuited (hedging stops at half)
+        """
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyWindow()
+        self.max_abandoned = max_abandoned
+
+        self._stats_lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.abandoned = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-call")
+
+    @classmethod
+    def from_env(cls, prefix: str = "LLM_"):
+        """
+        Build from <prefix>RPM, TPM, TIMEOUT_SECONDS, MAX_RETRIES,
+        BREAKER_FAILURES, BREAKER_RESET_SECONDS, HEDGE and MAX_ABANDONED, or
+        None when <prefix>GUARD_ENABLED is false
+        """
+        env = lambda name, default: os.getenv(prefix + name, default)
+        if env("GUARD_ENABLED", "true").lower() != "true":
+            return None
+        rpm, tpm, timeout = env("RPM", ""), env("TPM", ""), env("TIMEOUT_SECONDS", "30")
+        return cls(
+            rpm=float(rpm) if rpm else None,
+            tpm=float(tpm) if tpm else None,
+            timeout=float(timeout) if timeout else None,
+            max_retries=int(env("MAX_RETRIES", "3")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(env("BREAKER_FAILURES", "5")),
+                reset_timeout=float(env("BREAKER_RESET_SECONDS", "30"))
+            ),
+            hedge=env("HEDGE", "false").lower() == "true",
+            max_abandoned=int(env("MAX_ABANDONED", "8"))
+        )
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.counts[key] += 1
+
+    def _reserve(self, estimate: int) -> float:
+        """Seconds to wait for quota before sending a request"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(estimate))
+        if wait:
+            self._count("throttled")
+        return wait
+
+    def _try_reserve_hedge(self, estimate: int) -> bool:
+        """Quota for a hedge is only taken if it is free right now"""
+        if self.requests is not None and not self.requests.try_take(1):
+            return False
+        if self.tokens is not None and not self.tokens.try_take(estimate):
+            if self.requests is not None:
+                self.requests.adjust(-1)
+            return False
+        return True
+
+    def _settle(self, response, estimate: int):
+        """Correct the token bucket with the usage the model reported"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        if self.tokens is not None and usage.get("total_tokens"):
+            self.tokens.adjust(usage["total_tokens"] - estimate)
+
+    def _hedge_after(self) -> float | None:
+        if not self.hedge or self.abandoned >= self.max_abandoned / 2:
+            return None
+        return self.latency.quantile(self.hedge_quantile, self.hedge_min_samples)
+
+    def _pause(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _start(self):
+        if self.abandoned >= self.max_abandoned:
+            self._count("short_circuited")
+            raise CircuitOpenError(f"{self.abandoned} timed-out model calls are still running")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("Model circuit breaker is open")
+
+    def _abandon(self, futures):
+        """Leave requests running without a caller, counted until they end"""
+        for future in futures:
+            if future.cancel():
+                continue  # never started
+            with self._stats_lock:
+                self.abandoned += 1
+            future.add_done_callback(self._abandoned_done)
+
+    def _abandoned_done(self, _future):
+        with self._stats_lock:
+            self.abandoned -= 1
+
+    def _finish(self, error: Exception = None, started: float = None) -> bool:
+        """Record an attempt's outcome; True when the call should be retried"""
+        if error is None:
+            self.breaker.record_success()
+            self.latency.add(time.perf_counter() - started)
+            return False
+        retryable = is_retryable(error)
+        if retryable:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()  # the model answered, the request was bad
+        self._count("timeouts" if isinstance(error, (TimeoutError, concurrent.futures.TimeoutError)) else "errors")
+        return retryable
+
+    def _attempt(self, call, estimate: int):
+        """One attempt, hedged if it runs past the hedge threshold"""
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        pending = {self._executor.submit(call)}
+        hedge_after = self._hedge_after()
+        if hedge_after is not None:
+            done, _ = concurrent.futures.wait(pending, timeout=hedge_after)
+            if not done and self._try_reserve_hedge(estimate):
+                self._count("hedged")
+                pending.add(self._executor.submit(call))
+
+        error = None
+        try:
+            while pending:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                if not done:
+                    raise TimeoutError(f"Model call timed out after {self.timeout:.0f}s")
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            self._abandon(pending)
+
+    def call(self, call, messages):
+        """
+        Run call() (one model request on a fresh pooled client) under the guard
+
+        Raises:
+            CircuitOpenError: The breaker is open
+            Exception: The last error once retries are used up
+        """
+        estimate = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            self._start()
+            time.sleep(self._reserve(estimate))
+            started = time.perf_counter()
+            try:
+                response = self._attempt(call, estimate)
+            except Exception as e:
+                if not self._finish(e) or attempt == self.max_retries:
+                    raise
+                self._count("retries")
+                time.sleep(self._pause(attempt))
+                continue
+            self._finish(started=started)
+            self._settle(response, estimate)
+            return response
+
+    async def _aattempt(self, acall, estimate: int):
+        """Async variant of _attempt; losing and timed-out requests are cancelled"""
+        pending = {asyncio.ensure_future(acall())}
+        try:
+            deadline = asyncio.get_running_loop().time() + self.timeout if self.timeout else None
+            hedge_after = self._hedge_after()
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(pending, timeout=hedge_after)
+                if not done and self._try_reserve_hedge(estimate):
+                    self._count("hedged")
+                    pending.add(asyncio.ensure_future(acall()))
+
+            error = None
+            while pending:
+                remaining = None if deadline is None else max(0.0, deadline - asyncio.get_running_loop().time())
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f"Model call timed out after {self.timeout:.0f}s")
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def acall(self, acall, messages):
+        """Async variant of call; acall() returns an awaitable model request"""
+        estimate = estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            self._start()
+            await asyncio.sleep(self._reserve(estimate))
+            started = time.perf_counter()
+            try:
+                response = await self._aattempt(acall, estimate)
+            except Exception as e:
+                if not self._finish(e) or attempt == self.max_retries:
+                    raise
+                self._count("retries")
+                await asyncio.sleep(self._pause(attempt))
+                continue
+            self._finish(started=started)
+            self._settle(response, estimate)
+            return response
+
+    def close(self):
+        """Stop the request threads once the calls still running end"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Throttled, retried, hedged, timed-out, failed and short-circuited calls, abandoned calls still running and the breaker state"""
+        with self._stats_lock:
+            counts = dict(self.counts)
+            abandoned = self.abandoned
+        return {**counts, "abandoned": abandoned, "breaker": self.breaker.state, "breaker_opened": self.breaker.opened}
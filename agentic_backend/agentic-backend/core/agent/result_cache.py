@@ -0,0 +1,174 @@
+"""
+Content-addressed cache of analysis verdicts - byte-identical frames (camera
+re-sends, replays, client upload retries) reuse the verdict of the first copy
+instead of calling the model again
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(image_parts, prompt_version: str, model: str) -> str:
+    """
+    Cache key of a frame's analysis
+
+    Args:
+        image_parts: Bytes-like parts the model sees (the frame, or region
+            names and crops)
+        prompt_version: Hash of the prompt templates
+        model: Model (or tier chain) producing the verdict
+    """
+    digest = hashlib.sha256()
+    for part in image_parts:
+        digest.update(part if not isinstance(part, str) else part.encode())
+        digest.update(b"\0")
+    digest.update(f"{prompt_version}\0{model}".encode())
+    return digest.hexdigest()
+
+
+class SQLiteResultStore:
+    """On-disk tier: one row per verdict in a WAL-mode SQLite file, shared by the consumer's processes"""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, verdict TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> dict | None:
+        row = self._connection().execute(
+            "SELECT verdict FROM results WHERE key = ? AND stored_at >= ?", (key, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, verdict: dict):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, verdict, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(verdict), time.time())
+            )
+        with self._puts_lock:
+            self._puts += 1
+            purge = self._puts % 1000 == 0
+        if purge:
+            self.purge()
+
+    def purge(self) -> int:
+        """Delete expired rows; returns how many went"""
+        with self._connection() as connection:
+            cursor = connection.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+        return cursor.rowcount
+
+
+class ResultCache:
+    """
+    Two-tier verdict cache: an in-memory LRU in front of an optional SQLite
+    file. Entries expire after ttl_seconds in both tiers; a disk hit is
+    promoted to memory.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 3600, path: str = None):
+        """
+        Args:
+            max_entries: Verdicts kept in memory
+            ttl_seconds: How long a verdict can be reused
+            path: SQLite file for the on-disk tier (None keeps memory only)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk = SQLiteResultStore(path, ttl_seconds) if path else None
+        self._entries = OrderedDict()  # key -> (verdict, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build from RESULT_CACHE_* environment variables, or None when RESULT_CACHE_ENABLED=false"""
+        if os.getenv("RESULT_CACHE_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            max_entries=int(os.getenv("RESULT_CACHE_SIZE", "4096")),
+            ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600")),
+            path=os.getenv("RESULT_CACHE_PATH") or None
+        )
+
+    def get(self, key: str) -> dict | None:
+        """Cached verdict for key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+
+        verdict = None
+        if self.disk is not None:
+            try:
+                verdict = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Result cache read failed: {e}")
+        with self._lock:
+            if verdict is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(key, verdict)
+        return verdict
+
+    def _remember(self, key: str, verdict: dict):
+        with self._lock:
+            self._entries[key] = (verdict, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key: str, verdict: dict):
+        """Remember the verdict of a frame"""
+        self._remember(key, verdict)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, verdict)
+            except sqlite3.Error as e:
+                logger.warning(f"Result cache write failed: {e}")
+
+    def stats(self) -> dict:
+        """Memory hits, disk hits and misses"""
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+            }
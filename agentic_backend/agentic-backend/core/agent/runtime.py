@@ -0,0 +1,207 @@
+"""
+Long-lived model runtime for the security monitoring agent - keeps Gemini
+clients (and their connections) alive across frames instead of rebuilding them
+"""
+
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from .local_screen import LocalScreen
+from .resilience import ModelGuard
+from .result_cache import ResultCache
+from .tiering import EscalationPolicy, ModelTier
+
+logger = logging.getLogger(__name__)
+
+
+def default_model_factory(temperature: float, model: str = None):
+    """Build a Gemini chat client for the given model (default LLM_MODEL)"""
+    return ChatGoogleGenerativeAI(
+        model=model or os.getenv("LLM_MODEL", "gemini-2.0-flash-exp"),
+        temperature=temperature
+    )
+
+
+def _price(env_var: str) -> float:
+    return float(os.getenv(env_var, "0") or 0)
+
+
+class ModelPool:
+    """Round-robin pool of chat model clients shared by all frames"""
+
+    def __init__(self, factory, size: int = 4):
+        """
+        Args:
+            factory: Zero-argument callable returning a model client
+            size: Number of clients to keep open
+        """
+        self._factory = factory
+        self._size = max(1, int(size))
+        self._clients = []
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def _ensure_clients(self):
+        if self._cycle is None:
+            self._clients = [self._factory() for _ in range(self._size)]
+            self._cycle = itertools.cycle(self._clients)
+
+    def get(self):
+        """Return the next client in the pool (clients are created on first use)"""
+        with self._lock:
+            self._ensure_clients()
+            return next(self._cycle)
+
+    def clients(self):
+        """All clients in the pool"""
+        with self._lock:
+            self._ensure_clients()
+            return list(self._clients)
+
+
+class AgentRuntime:
+    """
+    Model clients shared by every frame the agent processes.
+
+    The analysis pool serves the image analysis node, the Firebase pool holds
+    clients already bound to the incident tools, and the local screen is the
+    CPU detector that runs before the analysis node. With a fast model
+    configured, analysis runs on the fast tier first and escalates to the
+    strong tier (the analysis pool) according to the escalation policy.
+    The lookup executor runs open-incident lookups while the model call is
+    in flight.
+    """
+
+    def __init__(self, model_factory=None, pool_size: int = None, tools=(), reconciler: str = None,
+                 local_screen=None, fast_model_factory=None, escalation: EscalationPolicy = None,
+                 prefetch_incidents: bool = None, result_cache=None):
+        """
+        Args:
+            model_factory: Callable(temperature) returning a chat model
+                (defaults to Gemini using LLM_MODEL)
+            pool_size: Clients per pool (default from LLM_POOL_SIZE or 4)
+            tools: Tools bound to the Firebase management clients
+            reconciler: "rules" (deterministic, default) or "llm" (tool-calling
+                agent); defaults to INCIDENT_RECONCILER
+            local_screen: LocalScreen that lets confidently normal frames skip
+                the LLM (default from LOCAL_SCREEN_* env vars; False disables)
+            fast_model_factory: Callable(temperature) for the first-pass model
+                (defaults to Gemini using LLM_FAST_MODEL; tiering is off when
+                neither is set)
+            escalation: When a fast verdict goes to the strong tier (default
+                from TIER_* env vars)
+            prefetch_incidents: Look up the location's open incidents in
+                parallel with the model call (default from INCIDENT_PREFETCH,
+                on by default)
+            result_cache: ResultCache of verdicts for byte-identical frames
+                (default from RESULT_CACHE_* env vars; False disables)
+        """
+        self.model_factory = model_factory or default_model_factory
+        pool_size = pool_size or int(os.getenv("LLM_POOL_SIZE", "4"))
+        self.tools = list(tools)
+        self.reconciler = reconciler or os.getenv("INCIDENT_RECONCILER", "rules")
+        self.local_screen = local_screen if local_screen is not None else LocalScreen.from_env()
+        self._fallback_screen = None
+        self.result_cache = result_cache if result_cache is not None else ResultCache.from_env()
+        self._fallback_lock = threading.Lock()
+
+        self.analysis_models = ModelPool(lambda: self.model_factory(0.3), pool_size)
+        self.strong_tier = ModelTier(
+            "strong", self.analysis_models, _price("LLM_PRICE_INPUT"), _price("LLM_PRICE_OUTPUT"),
+            guard=ModelGuard.from_env("LLM_")
+        )
+        
+        fast_model = os.getenv("LLM_FAST_MODEL")
+        if fast_model_factory is None and fast_model:
+            fast_model_factory = lambda temperature: default_model_factory(temperature, fast_model)
+        self.fast_tier = None
+        if fast_model_factory is not None:
+            self.fast_tier = ModelTier(
+                "fast",
+                ModelPool(lambda: fast_model_factory(0.3), pool_size),
+                _price("LLM_FAST_PRICE_INPUT"),
+                _price("LLM_FAST_PRICE_OUTPUT"),
+                guard=ModelGuard.from_env("LLM_FAST_")
+            )
+        self.escalation = escalation or EscalationPolicy.from_env()
+        self.firebase_models = ModelPool(
+            lambda: self.model_factory(0).bind_tools(self.tools), pool_size
+        )
+        
+        if prefetch_incidents is None:
+            prefetch_incidents = os.getenv("INCIDENT_PREFETCH", "true").lower() == "true"
+        # The tool-calling reconciler looks incidents up itself
+        self.prefetch_incidents = prefetch_incidents and self.reconciler != "llm"
+        # Threads start on first use, one per analysis client at most
+        self.lookups = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="incident-prefetch")
+
+    def analysis_model(self):
+        """Client for the image analysis node"""
+        return self.analysis_models.get()
+
+    def fallback_screen(self) -> LocalScreen:
+        """Local screen for the degraded path (the configured one, else a default one built on first use)"""
+        with self._fallback_lock:
+            if self._fallback_screen is None:
+                self._fallback_screen = self.local_screen or LocalScreen()
+            return self._fallback_screen
+
+    def model_signature(self) -> str:
+        """Models that produce a verdict, part of the result cache key"""
+        return ">".join(tier.model_name for tier in (self.fast_tier, self.strong_tier) if tier is not None)
+
+    def first_tier(self) -> ModelTier:
+        """Tier that analyses every frame first (the fast one when configured)"""
+        return self.fast_tier or self.strong_tier
+
+    def tier_stats(self) -> dict:
+        """Per-tier call, latency, token and cost counters"""
+        tiers = [self.fast_tier, self.strong_tier]
+        return {tier.name: tier.stats() for tier in tiers if tier is not None}
+
+    def firebase_model(self):
+        """Tool-bound client for the Firebase management node"""
+        return self.firebase_models.get()
+
+    def warm_up(self, ping: bool = None):
+        """
+        Create every pooled client up front so the first frames don't pay for it.
+
+        Args:
+            ping: Also send a tiny request through each analysis client to open
+                its connection (default from LLM_WARMUP_PING, off by default
+                because it costs a request per client)
+        """
+        if ping is None:
+            ping = os.getenv("LLM_WARMUP_PING", "false").lower() == "true"
+
+        clients = self.analysis_models.clients()
+        if self.fast_tier is not None:
+            clients = self.fast_tier.pool.clients() + clients
+        if self.reconciler == "llm":
+            self.firebase_models.clients()
+        logger.info(f"Agent runtime ready with {len(clients)} analysis model clients")
+
+        if ping:
+            for client in clients:
+                try:
+                    client.invoke([HumanMessage(content="ping")])
+                except Exception as e:
+                    logger.warning(f"Model warm-up request failed: {e}")
+
+    def config(self) -> dict:
+        """LangGraph config that routes the graph's nodes to this runtime"""
+        return {"configurable": {"runtime": self}}
+
+    def close(self):
+        """Stop the lookup and model request threads once no more frames are analysed"""
+        self.lookups.shutdown(wait=True)
+        for tier in (self.fast_tier, self.strong_tier):
+            if tier is not None and tier.guard is not None:
+                tier.guard.close()
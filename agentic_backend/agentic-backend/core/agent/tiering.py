@@ -0,0 +1,133 @@
+"""
+Tiered model routing - a fast, cheap model answers first and frames are
+re-analysed by the stronger model only when its verdict looks suspicious
+"""
+
+import os
+import threading
+import time
+
+
+class ModelTier:
+    """
+    A pool of clients for one model, with call, latency, token and cost
+    counters. Cost is estimated from the token usage the model reports and
+    the configured USD price per million input/output tokens. With a guard,
+    calls are rate limited, retried and hedged across the pool's clients.
+    """
+
+    def __init__(self, name: str, pool, input_price: float = 0.0, output_price: float = 0.0, guard=None):
+        """
+        Args:
+            name: Tier name used in results and stats ("fast" or "strong")
+            pool: ModelPool of clients for this tier
+            input_price: USD per million input tokens
+            output_price: USD per million output tokens
+            guard: ModelGuard the calls go through (None calls the model directly)
+        """
+        self.name = name
+        self.pool = pool
+        self.input_price = input_price
+        self.output_price = output_price
+        self.guard = guard
+        self._model_name = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @property
+    def model_name(self) -> str:
+        """Model the tier's clients call (the client class for clients without one)"""
+        if self._model_name is None:
+            client = self.pool.get()
+            self._model_name = str(getattr(client, "model", None) or type(client).__name__)
+        return self._model_name
+
+    def _record(self, started, response=None):
+        usage = getattr(response, "usage_metadata", None) or {}
+        with self._lock:
+            self.calls += 1
+            self.errors += response is None
+            self.latency += time.perf_counter() - started
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def invoke(self, messages):
+        """Call the next client in the pool and record the call"""
+        started = time.perf_counter()
+        try:
+            if self.guard is None:
+                response = self.pool.get().invoke(messages)
+            else:
+                response = self.guard.call(lambda: self.pool.get().invoke(messages), messages)
+        except Exception:
+            self._record(started)
+            raise
+        self._record(started, response)
+        return response
+
+    async def ainvoke(self, messages):
+        """Async variant of invoke"""
+        started = time.perf_counter()
+        try:
+            if self.guard is None:
+                response = await self.pool.get().ainvoke(messages)
+            else:
+                response = await self.guard.acall(lambda: self.pool.get().ainvoke(messages), messages)
+        except Exception:
+            self._record(started)
+            raise
+        self._record(started, response)
+        return response
+
+    def stats(self) -> dict:
+        """Calls, errors, mean latency, tokens, estimated cost and guard counters of this tier"""
+        guard = self.guard.stats() if self.guard is not None else {}
+        with self._lock:
+            cost = (self.input_tokens * self.input_price + self.output_tokens * self.output_price) / 1_000_000
+            return {
+                **guard,
+                "calls": self.calls,
+                "errors": self.errors,
+                "mean_latency_ms": 1000 * self.latency / self.calls if self.calls else 0.0,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cost_usd": round(cost, 6),
+            }
+
+
+class EscalationPolicy:
+    """Decides whether a fast-tier verdict must be confirmed by the strong tier"""
+
+    def __init__(self, on_problem: bool = True, min_confidence: float = 0.7, severities=("high", "critical")):
+        """
+        Args:
+            on_problem: Escalate every verdict with is_problem=True
+            min_confidence: Escalate verdicts less confident than this
+            severities: Escalate verdicts with one of these severities
+        """
+        self.on_problem = on_problem
+        self.min_confidence = min_confidence
+        self.severities = set(severities)
+
+    @classmethod
+    def from_env(cls):
+        """Build from TIER_* environment variables"""
+        return cls(
+            on_problem=os.getenv("TIER_ESCALATE_ON_PROBLEM", "true").lower() == "true",
+            min_confidence=float(os.getenv("TIER_MIN_CONFIDENCE", "0.7")),
+            severities=[s.strip() for s in os.getenv("TIER_ESCALATE_SEVERITIES", "high,critical").split(",") if s.strip()]
+        )
+
+    def escalation_reason(self, state: dict) -> str | None:
+        """Why a verdict needs the strong tier, or None if the fast verdict stands"""
+        if self.on_problem and state.get("is_problem"):
+            return "problem"
+        if (state.get("confidence") or 0.0) < self.min_confidence:
+            return "low_confidence"
+        if state.get("severity") in self.severities:
+            return "severity"
+        return None
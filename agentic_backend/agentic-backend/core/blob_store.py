@@ -0,0 +1,176 @@
+"""
+Content-addressed blob store for the claim-check frame mode - the ingest API
+stores frame bytes here and Kafka only carries a reference to them
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """Interface for claim-check backends; keys look like "sha256:<hex>"."""
+
+    def put(self, data: bytes) -> str:
+        """Store bytes and return their key (storing the same bytes twice is a no-op)"""
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        """Bytes for a key; raises KeyError if the blob is gone"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Remove a blob if it exists"""
+        raise NotImplementedError
+
+    def sweep(self, max_age_seconds: float) -> int:
+        """Remove blobs older than max_age_seconds and return how many went"""
+        raise NotImplementedError
+
+
+def blob_key(data: bytes) -> str:
+    """Content address of a blob"""
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+class FilesystemBlobStore(BlobStore):
+    """Blobs as files under root/<hex[0:2]>/<hex[2:4]>/<hex>, written atomically"""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        algorithm, _, digest = key.partition(":")
+        if algorithm != "sha256" or len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise KeyError(key)
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data: bytes) -> str:
+        key = blob_key(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            os.utime(path)  # refresh its age so the sweeper keeps it
+            return key
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return key
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except (FileNotFoundError, KeyError):
+            pass
+
+    def sweep(self, max_age_seconds: float) -> int:
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for directory, _subdirs, files in os.walk(self.root, topdown=False):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+            if directory != self.root:
+                try:
+                    os.rmdir(directory)  # only succeeds once the shard is empty
+                except OSError:
+                    pass
+        return removed
+
+
+BACKENDS = {
+    "filesystem": FilesystemBlobStore,
+}
+
+
+def blob_store_from_env() -> BlobStore:
+    """Blob store selected by BLOB_STORE_BACKEND (default: filesystem at BLOB_STORE_DIR)"""
+    backend = os.getenv("BLOB_STORE_BACKEND", "filesystem")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown blob store backend: {backend}")
+    return BACKENDS[backend](os.getenv("BLOB_STORE_DIR", "./blobs"))
+
+
+class CachedBlobReader:
+    """Read-through LRU cache in front of a blob store, bounded by total bytes"""
+
+    def __init__(self, store: BlobStore, max_bytes: int = 64 * 1024 * 1024):
+        self.store = store
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes:
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                return data
+
+        data = self.store.get(key)
+        if len(data) <= self.max_bytes:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = data
+                    self._size += len(data)
+                while self._size > self.max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._size -= len(evicted)
+        return data
+
+
+class BlobSweeper:
+    """Background thread removing blobs older than ttl_seconds"""
+
+    def __init__(self, store: BlobStore, ttl_seconds: float, interval_seconds: float = 60):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="blob-sweeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                removed = self.store.sweep(self.ttl_seconds)
+                if removed:
+                    logger.info(f"Blob sweeper removed {removed} expired frames")
+            except Exception as e:
+                logger.error(f"Blob sweep failed: {e}")
+
+    def stop(self):
+        self._stop.set()
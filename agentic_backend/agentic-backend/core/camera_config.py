@@ -0,0 +1,48 @@
+"""
+Per-camera settings - a set of defaults overridden per location from a JSON
+environment variable (inline JSON or a path to a JSON file)
+"""
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class CameraConfig:
+    """
+    Resolves settings for a camera location.
+
+    The JSON has the shape {"default": {...}, "<location>": {...}}; location
+    entries override "default", which overrides the built-in defaults.
+    """
+
+    def __init__(self, defaults: dict, overrides: dict = None):
+        overrides = dict(overrides or {})
+        self.defaults = {**defaults, **overrides.pop("default", {})}
+        self.overrides = overrides
+        self._resolved = {}
+
+    @classmethod
+    def from_env(cls, env_var: str, defaults: dict):
+        """Load overrides from env_var; invalid JSON falls back to the defaults"""
+        raw = os.getenv(env_var, "").strip()
+        overrides = {}
+        if raw:
+            try:
+                if not raw.startswith("{"):
+                    with open(raw) as f:
+                        raw = f.read()
+                overrides = json.loads(raw)
+            except (OSError, ValueError) as e:
+                logger.error(f"Ignoring invalid {env_var}: {e}")
+        return cls(defaults, overrides)
+
+    def for_location(self, location) -> dict:
+        """Merged settings for a camera"""
+        resolved = self._resolved.get(location)
+        if resolved is None:
+            resolved = {**self.defaults, **self.overrides.get(location, {})}
+            self._resolved[location] = resolved
+        return resolved
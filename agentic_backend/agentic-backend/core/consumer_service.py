@@ -3,26 +3,70 @@ Kafka Consumer Service - Reads images from Kafka and invokes security monitoring
 """
 
 import os
-import json
+import asyncio
 import logging
+import multiprocessing.util
+import signal
+import threading
+from concurrent.futures import wait
 from datetime import datetime
-from io import BytesIO
-from kafka import KafkaConsumer
+from kafka import KafkaConsumer, TopicPartition
+from kafka.consumer.subscription_state import ConsumerRebalanceListener
 from kafka.errors import NoBrokersAvailable
-from PIL import Image
+from kafka.structs import OffsetAndMetadata
 import time
-import base64
 
 # Import your agent
-from agent import monitor_security_image
+from agent import monitor_security_image, amonitor_security_image, monitor_security_batch, get_runtime, close_runtime
+import numpy as np
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from agent.firebase_tools import close_writer, get_incident_index, set_write_listener
+from agent.imaging import grayscale_thumbnail, prepare_image_bytes, sniff_mime
+from blob_store import BlobSweeper, CachedBlobReader, blob_store_from_env
+from frame_archive import FrameArchive
+from frame_batcher import FrameBatcher
+from frame_dedup import FrameDedupCache, dhash
+from frame_format import decode_frame
+from frame_preprocess import FramePreprocessor
+from frame_roi import RegionCropper
+from metrics import CONSUMER_LAG, FRAMES, IN_FLIGHT, INCIDENTS, STAGE_SECONDS, label, observe_timings, start_metrics_server
+from motion_gate import THUMBNAIL_SIZE, MotionGate
+from structured_logging import configure_logging, log_context
+from tracing import JsonlTraceExporter, build_trace, new_trace_id
+from worker_pool import OffsetTracker, OrderedWorkerPool
+
+# Configure logging (LOG_* environment variables)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Per-frame payload that is never kept alongside a reusable analysis
+_FRAME_PAYLOAD_KEYS = ("image_bytes", "image_path", "roi_images", "messages", "timings", "trace_id", "write_futures",
+                      "fast_verdict")
+
+
+def _lap(timings, stage, started):
+    """Record the milliseconds since started under stage and return the current perf_counter reading"""
+    now = time.perf_counter()
+    timings[stage] = round(1000 * (now - started), 3)
+    return now
+
+
+def _with_timings(result, timings, started):
+    """Result with the consumer's stage timings, the agent's own and the frame's total"""
+    timings = {**timings, **(result.get("timings") or {})}
+    _lap(timings, "total", started)
+    return {**result, "timings": timings}
+
+
+def _error_result(error, timestamp):
+    """Result of a frame whose processing failed"""
+    logger.error(f"Error processing image: {error}")
+    return {
+        "error": str(error),
+        "timestamp": timestamp,
+        "analysis_complete": False
+    }
+
 
 class SecurityImageConsumer:
     """Kafka consumer for security image analysis"""
@@ -33,7 +77,19 @@ class SecurityImageConsumer:
         topic="images",
         group_id="security-monitor-group",
         save_images=True,
-        image_dir="./received_images"
+        image_dir="./received_images",
+        num_workers=4,
+        worker_mode="thread",
+        max_pending=None,
+        max_in_flight=32,
+        dedup=None,
+        motion_gate=None,
+        blobs=None,
+        preprocessor=None,
+        cropper=None,
+        batcher=None,
+        tracer=None,
+        archive=None
     ):
         """
         Initialize the Kafka consumer
@@ -42,24 +98,65 @@ class SecurityImageConsumer:
             kafka_broker: Kafka broker address (default from env or 'kafka:9092')
             topic: Kafka topic to consume from
             group_id: Consumer group ID
-            save_images: Whether to save images to disk before analysis
-            image_dir: Directory to save images
+            save_images: Whether to archive received images to disk
+            image_dir: Directory of the frame archive
+            num_workers: Number of concurrent frame workers
+            worker_mode: "thread" or "process"
+            max_pending: Frames queued or running before fetching pauses
+                (defaults to 4 per worker)
+            max_in_flight: Frames analysed concurrently by aconsume()
+            dedup: FrameDedupCache for near-duplicate frames
+                (defaults to one built from DEDUP_* env vars)
+            motion_gate: MotionGate that skips unchanged frames
+                (defaults to one built from MOTION_GATE_* env vars)
+            blobs: Reader for claim-check frames (defaults to a cached reader
+                over the BLOB_STORE_* store, opened on the first reference)
+            preprocessor: FramePreprocessor that downscales frames before the
+                model (defaults to one built from PREPROCESS_* env vars)
+            cropper: RegionCropper that cuts frames down to each camera's
+                regions of interest (defaults to one built from ROI_CONFIG)
+            batcher: FrameBatcher that shares model requests between frames
+                (defaults to one built from BATCH_* env vars; False disables)
+            tracer: JsonlTraceExporter for capture-to-alert traces (defaults
+                to one built from TRACE_* env vars; False disables)
+            archive: FrameArchive the frames are saved to when save_images is
+                on (defaults to one in image_dir built from ARCHIVE_* env vars)
         """
         self.kafka_broker = kafka_broker or os.getenv("KAFKA_BROKER", "kafka:9092")
         self.topic = topic
         self.group_id = group_id
         self.save_images = save_images
         self.image_dir = image_dir
+        self.num_workers = num_workers
+        self.worker_mode = worker_mode
+        self.max_pending = max_pending or num_workers * 4
+        self.max_in_flight = max_in_flight
+        self.dedup = dedup if dedup is not None else FrameDedupCache.from_env()
+        self.motion_gate = motion_gate if motion_gate is not None else MotionGate.from_env()
+        self.blobs = blobs
+        self.preprocessor = preprocessor if preprocessor is not None else FramePreprocessor.from_env()
+        self.cropper = cropper if cropper is not None else RegionCropper.from_env()
+        self.batcher = batcher if batcher is not None else FrameBatcher.from_env(monitor_security_batch)
+        self.tracer = tracer if tracer is not None else JsonlTraceExporter.from_env()
+        if self.tracer:
+            set_write_listener(self.tracer.record_write)
         self.consumer = None
-        
-        # Create image directory if saving images
+        self.pool = None
+        self.offsets = OffsetTracker()
+        self._paused = False
+        self._stop_event = threading.Event()
+        self.lag_interval = float(os.getenv("METRICS_LAG_INTERVAL_SECONDS", "15"))
+        self._lag_reported = 0.0
+        # Frames are packed into segment files by a background writer
+        self.archive = None
         if self.save_images:
-            os.makedirs(self.image_dir, exist_ok=True)
+            self.archive = archive if archive is not None else FrameArchive.from_env(self.image_dir)
         
         # Statistics
         self.messages_processed = 0
         self.incidents_detected = 0
         self.errors = 0
+        self._stats_lock = threading.Lock()
     
     def connect(self, max_retries=5, retry_delay=5):
         """Connect to Kafka broker with retries"""
@@ -68,14 +165,14 @@ class SecurityImageConsumer:
                 logger.info(f"Attempting to connect to Kafka at {self.kafka_broker} (attempt {attempt + 1}/{max_retries})")
                 
                 self.consumer = KafkaConsumer(
-                    self.topic,
                     bootstrap_servers=self.kafka_broker,
                     group_id=self.group_id,
                     auto_offset_reset='earliest',  # Start from beginning if no offset
-                    enable_auto_commit=True,
+                    enable_auto_commit=False,  # Offsets are committed once frames finish
                     value_deserializer=lambda m: m,  # Keep as bytes
                     # consumer_timeout_ms removed - will wait indefinitely for messages
                 )
+                self.consumer.subscribe([self.topic], listener=_CommitOnRevoke(self))
                 
                 logger.info(f"Successfully connected to Kafka at {self.kafka_broker}")
                 logger.info(f"Subscribed to topic: {self.topic}")
@@ -97,67 +194,222 @@ class SecurityImageConsumer:
         
         return False
     
-    def process_image(self, image_bytes, timestamp=None, location=None, organization_id=None):
+    def archive_frame(self, image_bytes, mime, location, timestamp):
+        """Queue the frame for the archive (only when saving is enabled); the writer thread stores it"""
+        if not self.archive.archive(image_bytes, mime, location, timestamp):
+            logger.warning(f"Frame archive is behind, frame from {location} not archived")
+    
+    def screen_frame(self, image_bytes, location, timestamp):
+        """
+        Cheap CPU checks before the agent: the motion gate, then the dedup cache.
+        Both work on one small grayscale thumbnail.
+        
+        Returns:
+            tuple: (frame hash or None, reused result or None)
+        """
+        if self.motion_gate is None and self.dedup is None:
+            return None, None
+        try:
+            thumbnail = grayscale_thumbnail(image_bytes, THUMBNAIL_SIZE)
+        except Exception as e:
+            logger.warning(f"Could not decode frame thumbnail, analysing it anyway: {e}")
+            return None, None
+        
+        if self.motion_gate is not None:
+            last = self.motion_gate.check(location, np.asarray(thumbnail))
+            if last is not None:
+                logger.info(f"⏭ No significant change at {location}, reusing last analysis")
+                return None, {**last, "timestamp": timestamp, "motion_skipped": True}
+        
+        if self.dedup is None:
+            return None, None
+        
+        frame_hash = dhash(thumbnail)
+        cached = self.dedup.lookup(location, frame_hash)
+        if cached is None:
+            return frame_hash, None
+        
+        logger.info(f"♻ Near-duplicate frame from {location}, reusing analysis")
+        return frame_hash, {**cached, "timestamp": timestamp, "dedup_hit": True}
+    
+    def remember_result(self, location, frame_hash, result):
+        """Keep a successful model analysis for the motion gate and dedup cache"""
+        if result.get("error") or not result.get("analysis_complete"):
+            return
+        if result.get("model_tier") == "degraded":
+            return  # the model has to see the next frame to supersede it
+        summary = {k: v for k, v in result.items() if k not in _FRAME_PAYLOAD_KEYS}
+        if self.motion_gate is not None:
+            self.motion_gate.record(location, summary)
+        # Like the motion gate, never reuse an incident: later frames must reach reconciliation
+        if frame_hash is not None and not result.get("is_problem"):
+            self.dedup.store(location, frame_hash, summary)
+    
+    def resolve_frame(self, image_bytes, image_ref=None):
+        """
+        Frame bytes for a message - inline bytes as they are, claim-check
+        references read from the blob store
+        
+        Raises:
+            KeyError: If the referenced blob has expired or never existed
+        """
+        if image_ref is None:
+            return image_bytes
+        if self.blobs is None:
+            self.blobs = CachedBlobReader(
+                blob_store_from_env(),
+                max_bytes=int(os.getenv("BLOB_CACHE_MB", "64")) * 1024 * 1024
+            )
+        return self.blobs.get(image_ref)
+    
+    def prepare_frame(self, location, image_bytes):
+        """
+        Frame bytes and mime type for the model - downscaled per camera when
+        the preprocessor is on, otherwise only transcoded if Gemini needs it
+        """
+        if self.preprocessor is None:
+            return prepare_image_bytes(image_bytes)
+        return self.preprocessor.apply(location, image_bytes)
+    
+    def crop_regions(self, location, image_bytes):
+        """
+        Crops of the camera's regions of interest, cut from the full-resolution
+        frame and then sized like any other frame
+        
+        Returns:
+            tuple: (list of JPEG crops, list of ROI dicts) or (None, None)
+        """
+        if self.cropper is None:
+            return None, None
+        crops, roi = self.cropper.apply(location, image_bytes)
+        if crops is None:
+            return None, None
+        return [self.prepare_frame(location, crop)[0] for crop in crops], roi
+    
+    def analyze(self, **frame):
+        """Run the agent on a frame, through the micro-batcher when batching is on"""
+        if self.batcher:
+            return self.batcher.submit(frame).result()
+        return monitor_security_image(**frame)
+    
+    async def aanalyze(self, **frame):
+        """Async variant of analyze"""
+        if self.batcher:
+            return await asyncio.wrap_future(self.batcher.submit(frame))
+        return await amonitor_security_image(**frame)
+    
+    def prepare_analysis(self, image_bytes, timestamp, location=None, organization_id=None, image_ref=None,
+                         trace_id=None, timings=None):
+        """
+        Everything before the agent: resolve the frame, preprocess, archive,
+        screen and crop it, recording each stage in timings
+        
+        Returns:
+            tuple: (agent keyword arguments, frame hash, reused result); a
+                reused result (motion gate or dedup hit) skips the agent
+        """
+        lap = time.perf_counter()
+        timings = timings if timings is not None else {}
+        location = location or "Kafka Stream"
+        raw_bytes = self.resolve_frame(image_bytes, image_ref)
+        lap = _lap(timings, "resolve", lap)
+        image_bytes, mime = self.prepare_frame(location, raw_bytes)
+        lap = _lap(timings, "preprocess", lap)
+        if self.archive:
+            # Evidence keeps the upload's full resolution, not the copy sized for the model
+            self.archive_frame(raw_bytes, sniff_mime(raw_bytes) or "application/octet-stream", location, timestamp)
+            lap = _lap(timings, "archive", lap)
+        
+        frame_hash, cached = self.screen_frame(image_bytes, location, timestamp)
+        lap = _lap(timings, "screen", lap)
+        if cached is not None:
+            return None, None, cached
+        roi_images, roi = self.crop_regions(location, raw_bytes)
+        _lap(timings, "crop", lap)
+        
+        frame = {
+            "image_bytes": image_bytes,
+            "image_mime": mime,
+            "timestamp": timestamp,
+            "location": location,
+            "organization_id": organization_id,
+            "roi": roi,
+            "roi_images": roi_images,
+            "trace_id": trace_id,
+        }
+        return frame, frame_hash, None
+    
+    def finish_analysis(self, frame, frame_hash, result, timings, lap, started):
+        """Record the agent's time, remember the analysis for later frames and attach the timings"""
+        _lap(timings, "agent", lap)
+        self.remember_result(frame["location"], frame_hash, result)
+        return _with_timings(result, timings, started)
+    
+    def process_image(self, image_bytes, timestamp=None, location=None, organization_id=None, image_ref=None,
+                      trace_id=None):
         """
         Process a single image through the security agent
         
+        The frame stays in memory the whole way: frames over the camera's size
+        limits are downscaled and recompressed, small JPEG/PNG/WebP frames go
+        to the model untouched, and the filesystem is only used when
+        save_images is on (the frame is archived as uploaded, at full
+        resolution, appended to a segment file by the archive's writer thread).
+        Cameras with regions of interest send crops of those regions instead
+        of the whole frame.
+        
         Args:
-            image_bytes: Raw image bytes from Kafka
+            image_bytes: Raw image bytes from Kafka (None for claim-check frames)
             timestamp: Optional timestamp string
             location: Optional location string
+            organization_id: Optional organization the camera belongs to
+            image_ref: Blob store key of a claim-check frame
+            trace_id: Trace of the frame, stored on the incidents it raises or resolves
         
         Returns:
-            dict: Analysis results from the agent
+            dict: Analysis results from the agent, with the milliseconds
+                spent in each stage under "timings"
         """
+        started = time.perf_counter()
+        timings = {}
+        # Generate timestamp if not provided
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            # Generate timestamp if not provided
-            if timestamp is None:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Save image to temporary file
-            if self.save_images:
-                image_filename = f"image_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jpg"
-                image_path = os.path.join(self.image_dir, image_filename)
-            else:
-                # Create temporary file
-                image_path = f"/tmp/temp_image_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jpg"
-            
-            # Convert bytes to image and save
-            image = Image.open(BytesIO(image_bytes))
-            if image.mode in ("RGBA", "LA"):
-                background = Image.new("RGB", image.size, (255, 255, 255))  # white background
-                background.paste(image, mask=image.split()[-1])  # paste using alpha channel as mask
-                image = background
-            else:
-                image = image.convert("RGB")
-            image.save(image_path, format="JPEG")
-
-            logger.info(f"Processing image: {image_path}")
+            frame, frame_hash, cached = self.prepare_analysis(
+                image_bytes, timestamp, location, organization_id, image_ref, trace_id, timings
+            )
+            if cached is not None:
+                return _with_timings(cached, timings, started)
             
             # Invoke the security monitoring agent
-            result = monitor_security_image(
-                image_path=image_path,
-                timestamp=timestamp,
-                location=location or "Kafka Stream",
-                organization_id=organization_id
-            )
+            lap = time.perf_counter()
+            result = self.analyze(**frame)
+            return self.finish_analysis(frame, frame_hash, result, timings, lap, started)
             
-            # Clean up temporary file if not saving
-            if not self.save_images:
-                try:
-                    os.remove(image_path)
-                except:
-                    pass
+        except Exception as e:
+            return _error_result(e, timestamp)
+    
+    async def aprocess_image(self, image_bytes, timestamp=None, location=None, organization_id=None, image_ref=None,
+                             trace_id=None):
+        """Async variant of process_image; the image work runs in a thread, the model call is awaited"""
+        started = time.perf_counter()
+        timings = {}
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            frame, frame_hash, cached = await asyncio.to_thread(
+                self.prepare_analysis, image_bytes, timestamp, location, organization_id, image_ref, trace_id, timings
+            )
+            if cached is not None:
+                return _with_timings(cached, timings, started)
             
-            return result
+            lap = time.perf_counter()
+            result = await self.aanalyze(**frame)
+            return self.finish_analysis(frame, frame_hash, result, timings, lap, started)
             
         except Exception as e:
-            logger.error(f"Error processing image: {e}")
-            return {
-                "error": str(e),
-                "timestamp": timestamp,
-                "analysis_complete": False
-            }
+            return _error_result(e, timestamp)
     
     def handle_analysis_result(self, result):
         """
@@ -167,13 +419,21 @@ class SecurityImageConsumer:
             result: Analysis result from the agent
         """
         try:
+            observe_timings(result.get("timings"))
+            organization = label(result.get("organization_id"))
             if result.get("error"):
                 logger.error(f"Analysis error: {result['error']}")
-                self.errors += 1
+                FRAMES.labels(organization=organization, outcome="error").inc()
+                with self._stats_lock:
+                    self.errors += 1
                 return
             
+            reused = result.get("motion_skipped") or result.get("dedup_hit")
+            FRAMES.labels(organization=organization, outcome="reused" if reused else "analysed").inc()
             if result.get("is_problem"):
-                self.incidents_detected += 1
+                INCIDENTS.labels(incident_type=label(result.get("incident_type")), organization=organization).inc()
+                with self._stats_lock:
+                    self.incidents_detected += 1
                 severity = result.get("severity", "unknown")
                 incident_type = result.get("incident_type", "unknown")
                 
@@ -195,11 +455,35 @@ class SecurityImageConsumer:
             else:
                 logger.info(f"✓ No issues detected - {result.get('incident_type', 'normal')}")
             
-            self.messages_processed += 1
+            with self._stats_lock:
+                self.messages_processed += 1
             
         except Exception as e:
             logger.error(f"Error handling analysis result: {e}")
     
+    def export_trace(self, frame, result):
+        """Export the capture-to-alert trace of a handled frame"""
+        if not self.tracer:
+            return
+        try:
+            self.tracer.export(build_trace(frame["trace"], result, time.time()))
+        except Exception as e:
+            logger.warning(f"Could not export trace: {e}")
+    
+    def log_statistics(self):
+        """Log running counters"""
+        message = (f"Statistics - Processed: {self.messages_processed}, "
+                   f"Incidents: {self.incidents_detected}, Errors: {self.errors}")
+        if self.dedup is not None:
+            dedup = self.dedup.stats()
+            message += f", Dedup hits: {dedup['hits']}/{dedup['hits'] + dedup['misses']} ({dedup['hit_rate']:.0%})"
+        if self.motion_gate is not None:
+            message += f", Motion skips: {self.motion_gate.stats()['skipped']}"
+        if self.archive:
+            archive = self.archive.stats()
+            message += f", Archived: {archive['written']} (dropped {archive['dropped']})"
+        logger.info(message)
+    
     def send_alert(self, result):
         """Send alert for critical incidents (implement your alert mechanism)"""
         # TODO: Implement your alerting logic
@@ -232,6 +516,150 @@ class SecurityImageConsumer:
         logger.info(f"[RESPONSE] Triggering response for: {result['incident_type']}")
         pass
     
+    def parse_message(self, message):
+        """
+        Decode a Kafka message into frame fields (binary or legacy JSON format)
+        
+        Returns:
+            dict: image_bytes, timestamp, location, organization_id, content_type,
+                frame_id, image_ref (claim-check frames are resolved later,
+                on the worker) and trace (the trace context)
+        """
+        delivered_at = time.time()
+        started = time.perf_counter()
+        frame = decode_frame(message.value, message.headers)
+        decode_seconds = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage="decode").observe(decode_seconds)
+        # Frames from producers without tracing start their trace here
+        frame["trace"] = {
+            **(frame["trace"] or {"trace_id": new_trace_id()}),
+            "frame_id": frame["frame_id"],
+            "delivered_at": delivered_at,
+            "decode_ms": 1000 * decode_seconds,
+        }
+        return frame
+    
+    def _dispatch(self, message):
+        """Hand a message to the worker lane for its camera"""
+        tp = TopicPartition(message.topic, message.partition)
+        self.offsets.track(tp, message.offset)
+        
+        try:
+            frame = self.parse_message(message)
+        except Exception as e:
+            logger.error(f"Failed to parse message: {e}")
+            with self._stats_lock:
+                self.errors += 1
+            self.offsets.complete(tp, message.offset)
+            return
+        
+        if self.worker_mode == "process":
+            fn = _process_in_worker
+        else:
+            fn = self.process_image
+        
+        def on_done(result, error):
+            writes = None
+            try:
+                if error is not None:
+                    logger.error(f"Error processing Kafka message: {error}")
+                    FRAMES.labels(organization=label(frame["organization_id"]), outcome="error").inc()
+                    with self._stats_lock:
+                        self.errors += 1
+                    result = {"error": str(error), "location": frame["location"]}
+                else:
+                    writes = result.pop("write_futures", None)
+                    self.handle_analysis_result(result)
+                self.export_trace(frame, result)
+                
+                self.log_statistics()
+            finally:
+                self.complete_after_writes(tp, message.offset, writes)
+        
+        self.pool.submit(
+            frame["location"],
+            _in_log_context,
+            args=(
+                fn, frame["image_bytes"], frame["timestamp"], frame["location"],
+                frame["organization_id"], frame["image_ref"], frame["trace"]["trace_id"]
+            ),
+            callback=on_done
+        )
+    
+    def complete_after_writes(self, tp, offset, writes=None):
+        """
+        Mark a frame's offset as processed once the Firestore writes it queued
+        on the batch writer have landed, so a crash before they do redelivers
+        the frame. A write the writer drops also completes the frame (its index
+        change is rolled back, so a later frame reports or resolves it again).
+        """
+        pending = [future for future in writes or () if not future.done()]
+        if not pending:
+            self.offsets.complete(tp, offset)
+            return
+        remaining = [len(pending)]
+        lock = threading.Lock()
+        
+        def landed(_future):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.offsets.complete(tp, offset)
+        
+        for future in pending:
+            future.add_done_callback(landed)
+    
+    def commit_completed(self):
+        """Commit offsets of fully processed frames (must run on the polling thread)"""
+        points = self.offsets.pop_committable()
+        if not points:
+            return
+        try:
+            self.consumer.commit({tp: OffsetAndMetadata(offset, None) for tp, offset in points.items()})
+        except Exception as e:
+            logger.error(f"Offset commit failed: {e}")
+    
+    def report_lag(self, force=False):
+        """
+        Set the consumer lag gauge of every assigned partition: messages between
+        the committed offset (or the position, before the first commit) and the
+        end of the partition. Asks the broker at most every lag_interval seconds
+        (must run on the polling thread).
+        """
+        now = time.monotonic()
+        if not force and now - self._lag_reported < self.lag_interval:
+            return
+        self._lag_reported = now
+        try:
+            partitions = list(self.consumer.assignment())
+            if not partitions:
+                return
+            end_offsets = self.consumer.end_offsets(partitions)
+            for tp in partitions:
+                committed = self.consumer.committed(tp)
+                offset = committed if committed is not None else self.consumer.position(tp)
+                CONSUMER_LAG.labels(topic=tp.topic, partition=str(tp.partition)).set(max(0, end_offsets[tp] - offset))
+        except Exception as e:
+            logger.debug(f"Could not measure consumer lag: {e}")
+    
+    def _apply_backpressure(self):
+        """Pause fetching while the workers are saturated, resume once they catch up"""
+        pending = self.pool.pending()
+        IN_FLIGHT.set(pending)
+        if not self._paused and pending >= self.max_pending:
+            self.consumer.pause(*self.consumer.assignment())
+            self._paused = True
+            logger.info(f"⏸ Pausing fetch - {pending} frames pending")
+        elif self._paused and pending <= self.max_pending // 2:
+            self.consumer.resume(*self.consumer.paused())
+            self._paused = False
+            logger.info(f"▶ Resuming fetch - {pending} frames pending")
+    
+    def stop(self):
+        """Ask the consume loop to exit after the current poll"""
+        self._stop_event.set()
+    
     def consume(self):
         """Main consumer loop - continuously process messages from Kafka"""
         if self.consumer is None:
@@ -239,44 +667,27 @@ class SecurityImageConsumer:
             return
         
         logger.info(f"🔄 Starting to consume messages from topic: {self.topic}")
+        logger.info(f"Workers: {self.num_workers} ({self.worker_mode}), max pending: {self.max_pending}")
         logger.info("Press Ctrl+C to stop...")
         
+        self.pool = OrderedWorkerPool(
+            num_workers=self.num_workers,
+            mode=self.worker_mode,
+            initializer=_init_worker,
+            initargs=(self.save_images, self.image_dir)
+        )
+        
         try:
-            for message in self.consumer:
-                try:
-                    logger.info(f"\n{'='*60}")
-                    logger.info(f"Received message - Partition: {message.partition}, Offset: {message.offset}")
-                    
-                    # Extract image bytes
-                    try:
-                        data = json.loads(message.value.decode("utf-8"))
-                        image_bytes = base64.b64decode(data["image"])
-                        timestamp = data.get("timestamp")
-                        location = data.get("location")
-                    except Exception as e:
-                        logger.error(f"Failed to parse message: {e}")
-                        self.errors += 1
-                        continue
-                    
-                    # Process the image
-                    result = self.process_image(
-                        image_bytes=image_bytes,
-                        timestamp=timestamp,
-                        location=location
-                    )
-                    
-                    # Handle the result
-                    self.handle_analysis_result(result)
-                    
-                    # Print statistics
-                    logger.info(f"Statistics - Processed: {self.messages_processed}, "
-                              f"Incidents: {self.incidents_detected}, Errors: {self.errors}")
-                    logger.info(f"{'='*60}\n")
-                    
-                except Exception as e:
-                    logger.error(f"Error processing Kafka message: {e}")
-                    self.errors += 1
-                    continue
+            while not self._stop_event.is_set():
+                self.commit_completed()
+                self.report_lag()
+                self._apply_backpressure()
+                
+                records = self.consumer.poll(timeout_ms=500)
+                for messages in records.values():
+                    for message in messages:
+                        logger.info(f"Received message - Partition: {message.partition}, Offset: {message.offset}")
+                        self._dispatch(message)
         
         except KeyboardInterrupt:
             logger.info("\n🛑 Shutting down consumer...")
@@ -284,9 +695,125 @@ class SecurityImageConsumer:
         finally:
             self.close()
     
+    async def _arun_frame(self, frame, tp, offset, previous, semaphore):
+        """Analyse one frame after the previous frame from the same camera finishes"""
+        writes = None
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            with log_context(trace_id=frame["trace"]["trace_id"], location=frame["location"]):
+                result = await self.aprocess_image(
+                    frame["image_bytes"], frame["timestamp"], frame["location"],
+                    frame["organization_id"], frame["image_ref"], frame["trace"]["trace_id"]
+                )
+            writes = result.pop("write_futures", None)
+            self.handle_analysis_result(result)
+            self.export_trace(frame, result)
+            self.log_statistics()
+        except Exception as e:
+            logger.error(f"Error processing Kafka message: {e}")
+            FRAMES.labels(organization=label(frame["organization_id"]), outcome="error").inc()
+            with self._stats_lock:
+                self.errors += 1
+            self.export_trace(frame, {"error": str(e), "location": frame["location"]})
+        finally:
+            self.complete_after_writes(tp, offset, writes)
+            semaphore.release()
+    
+    async def aconsume(self):
+        """
+        Asyncio consumer loop. Up to max_in_flight frames are analysed at once;
+        when the limit is reached the assigned partitions are paused so Kafka
+        stops fetching until slots free up. Frames from the same camera still
+        run in order.
+        """
+        if self.consumer is None:
+            logger.error("Consumer not connected. Call connect() first.")
+            return
+        
+        logger.info(f"🔄 Starting async consumer on topic: {self.topic} (max in flight: {self.max_in_flight})")
+        
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        lanes = {}  # location -> task of the latest frame from that camera
+        tasks = set()
+        
+        try:
+            while not self._stop_event.is_set():
+                self.commit_completed()
+                if time.monotonic() - self._lag_reported >= self.lag_interval:
+                    # Asks the broker, so keep it off the event loop like poll()
+                    await loop.run_in_executor(None, self.report_lag)
+                IN_FLIGHT.set(len(tasks))
+                
+                free = self.max_in_flight - len(tasks)
+                if free <= 0 and not self._paused:
+                    self.consumer.pause(*self.consumer.assignment())
+                    self._paused = True
+                elif free > 0 and self._paused:
+                    self.consumer.resume(*self.consumer.paused())
+                    self._paused = False
+                
+                # poll() blocks, so it runs in a thread while frames keep progressing
+                records = await loop.run_in_executor(
+                    None, lambda: self.consumer.poll(timeout_ms=500, max_records=max(free, 1))
+                )
+                
+                for messages in records.values():
+                    for message in messages:
+                        tp = TopicPartition(message.topic, message.partition)
+                        self.offsets.track(tp, message.offset)
+                        try:
+                            frame = self.parse_message(message)
+                        except Exception as e:
+                            logger.error(f"Failed to parse message: {e}")
+                            with self._stats_lock:
+                                self.errors += 1
+                            self.offsets.complete(tp, message.offset)
+                            continue
+                        
+                        await semaphore.acquire()
+                        location = frame["location"]
+                        task = asyncio.create_task(
+                            self._arun_frame(frame, tp, message.offset, lanes.get(location), semaphore)
+                        )
+                        lanes[location] = task
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                        task.add_done_callback(
+                            lambda t, loc=location: lanes.pop(loc, None) if lanes.get(loc) is t else None
+                        )
+        
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            logger.info("\n🛑 Shutting down consumer...")
+        
+        finally:
+            if tasks:
+                logger.info(f"Draining {len(tasks)} in-flight frames...")
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.close()
+    
     def close(self):
-        """Close the consumer connection"""
+        """Drain in-flight frames, commit their offsets and close the consumer"""
+        if self.pool:
+            logger.info(f"Draining {self.pool.pending()} in-flight frames...")
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        if self.batcher:
+            self.batcher.close()
+        if self.archive:
+            self.archive.close()
+            logger.info(f"Frame archive: {self.archive.stats()}")
+        
+        # Land any incident writes still queued on the batch writer
+        close_writer(timeout=30)
+        if self.tracer:
+            set_write_listener(None)
+            logger.info(f"Exported {self.tracer.exported} trace records to {self.tracer.path}")
+            self.tracer.close()
+        
         if self.consumer:
+            self.commit_completed()
             logger.info("Closing Kafka consumer...")
             self.consumer.close()
             logger.info("✓ Consumer closed")
@@ -298,7 +825,83 @@ class SecurityImageConsumer:
             logger.info(f"Total messages processed: {self.messages_processed}")
             logger.info(f"Total incidents detected: {self.incidents_detected}")
             logger.info(f"Total errors: {self.errors}")
+            if self.dedup is not None:
+                logger.info(f"Dedup cache: {self.dedup.stats()}")
+            if self.motion_gate is not None:
+                logger.info(f"Motion gate: {self.motion_gate.stats()}")
+            if self.preprocessor is not None:
+                logger.info(f"Preprocessing: {self.preprocessor.stats()}")
+            if self.batcher:
+                logger.info(f"Batching: {self.batcher.stats()}")
+            for tier, stats in get_runtime().tier_stats().items():
+                logger.info(f"Model tier {tier}: {stats}")
+            if get_runtime().result_cache:
+                logger.info(f"Result cache: {get_runtime().result_cache.stats()}")
             logger.info(f"{'='*60}\n")
+        
+        close_runtime()
+
+
+class _CommitOnRevoke(ConsumerRebalanceListener):
+    """Commit finished offsets before partitions move to another consumer"""
+    
+    def __init__(self, service):
+        self.service = service
+    
+    def on_partitions_revoked(self, revoked):
+        self.service.commit_completed()
+        # Frames still in flight for these partitions will be redelivered to the new owner
+        self.service.offsets.forget(revoked)
+    
+    def on_partitions_assigned(self, assigned):
+        logger.info(f"Assigned partitions: {sorted(tp.partition for tp in assigned)}")
+
+
+# Per-process consumer used by the "process" worker mode
+_worker_consumer = None
+
+
+def _init_worker(save_images, image_dir):
+    """Build the frame processor once in each worker process"""
+    global _worker_consumer
+    # A worker process only ever holds one frame, so there is nothing to batch
+    _worker_consumer = SecurityImageConsumer(save_images=save_images, image_dir=image_dir, batcher=False)
+    # Child processes skip atexit, and the writer thread is a daemon; multiprocessing
+    # runs its finalizers when the pool shuts the child down
+    multiprocessing.util.Finalize(None, close_writer, kwargs={"timeout": 30}, exitpriority=10)
+    warm_up_agent()
+
+
+def warm_up_agent():
+    """Build model clients and seed the open-incident index before frames arrive"""
+    get_runtime().warm_up()
+    try:
+        get_incident_index()
+    except Exception as e:
+        logger.warning(f"Could not seed open incident index yet: {e}")
+
+
+def _in_log_context(fn, image_bytes, timestamp, location, organization_id, image_ref, trace_id):
+    """Run a frame function with the frame's trace ID and camera on every log record"""
+    with log_context(trace_id=trace_id, location=location):
+        return fn(image_bytes, timestamp, location, organization_id, image_ref, trace_id)
+
+
+def _process_in_worker(image_bytes, timestamp, location, organization_id, image_ref=None, trace_id=None):
+    """Run process_image inside a worker process"""
+    result = _worker_consumer.process_image(
+        image_bytes=image_bytes,
+        timestamp=timestamp,
+        location=location,
+        organization_id=organization_id,
+        image_ref=image_ref,
+        trace_id=trace_id
+    )
+    # Write futures cannot leave the process, so the frame's writes land before it counts as done
+    writes = result.pop("write_futures", None)
+    if writes:
+        wait(writes)
+    return result
 
 
 def main():
@@ -311,6 +914,12 @@ def main():
     group_id = os.getenv("KAFKA_GROUP_ID", "security-monitor-group")
     save_images = os.getenv("SAVE_IMAGES", "true").lower() == "true"
     image_dir = os.getenv("IMAGE_DIR", "./received_images")
+    num_workers = int(os.getenv("CONSUMER_WORKERS", "4"))
+    worker_mode = os.getenv("CONSUMER_WORKER_MODE", "thread")
+    max_pending = int(os.getenv("CONSUMER_MAX_PENDING", "0")) or None
+    consumer_mode = os.getenv("CONSUMER_MODE", "pool")  # "pool" (worker threads/processes) or "async"
+    max_in_flight = int(os.getenv("CONSUMER_MAX_IN_FLIGHT", "32"))
+    blob_ttl = float(os.getenv("BLOB_TTL_SECONDS", "3600"))
     
     logger.info("Starting Security Image Consumer Service")
     logger.info(f"Configuration:")
@@ -319,23 +928,63 @@ def main():
     logger.info(f"  Group ID: {group_id}")
     logger.info(f"  Save Images: {save_images}")
     logger.info(f"  Image Directory: {image_dir}")
+    if consumer_mode == "async":
+        logger.info(f"  Mode: async, max in flight: {max_in_flight}")
+    else:
+        logger.info(f"  Workers: {num_workers} ({worker_mode})")
     logger.info(f"  Running in: {'Docker' if os.path.exists('/.dockerenv') else 'Local'}")
     
+    # Frames only meet in one process in the thread and async modes
+    process_workers = consumer_mode != "async" and worker_mode == "process"
+    if process_workers and os.getenv("BATCH_ENABLED", "false").lower() == "true":
+        logger.warning("  Batching is not available with process workers, frames are analysed one by one")
+    
     # Create consumer
     consumer = SecurityImageConsumer(
         kafka_broker=kafka_broker,
         topic=topic,
         group_id=group_id,
         save_images=save_images,
-        image_dir=image_dir
+        image_dir=image_dir,
+        num_workers=num_workers,
+        worker_mode=worker_mode,
+        max_pending=max_pending,
+        max_in_flight=max_in_flight,
+        batcher=False if process_workers else None
     )
     
+    # Stop cleanly on `docker stop` so in-flight frames drain and get committed
+    signal.signal(signal.SIGTERM, lambda signum, frame: consumer.stop())
+    
+    # Claim-check frames are never deleted by the producer; expire them here
+    sweeper = None
+    if os.getenv("CLAIM_CHECK_ENABLED", "false").lower() == "true" and blob_ttl > 0:
+        sweeper = BlobSweeper(
+            blob_store_from_env(),
+            ttl_seconds=blob_ttl,
+            interval_seconds=float(os.getenv("BLOB_SWEEP_INTERVAL_SECONDS", "60"))
+        ).start()
+        logger.info(f"  Claim-check blobs expire after {blob_ttl:.0f}s")
+    
+    # Prometheus scrape endpoint (METRICS_PORT)
+    start_metrics_server()
+    
+    # Build the shared agent runtime before the first frame arrives
+    if consumer_mode == "async" or worker_mode == "thread":
+        warm_up_agent()
+    
     # Connect to Kafka
     if consumer.connect():
         # Start consuming messages
-        consumer.consume()
+        if consumer_mode == "async":
+            asyncio.run(consumer.aconsume())
+        else:
+            consumer.consume()
     else:
         logger.error("Failed to connect to Kafka. Exiting.")
+    
+    if sweeper is not None:
+        sweeper.stop()
 
 
 if __name__ == "__main__":
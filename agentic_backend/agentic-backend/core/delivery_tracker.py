@@ -0,0 +1,58 @@
+"""
+Delivery status of ingested frames - filled in by Kafka producer callbacks so
+the ingest view can return immediately and clients can poll by frame ID
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class DeliveryTracker:
+    """
+    Bounded, in-process map of frame ID -> delivery status. The oldest
+    entries are dropped once max_entries is reached. Status lives in the
+    Django process that accepted the frame.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def queued(self, frame_id, **metadata):
+        """Record a frame handed to the producer"""
+        with self._lock:
+            self._entries[frame_id] = {
+                "frame_id": frame_id,
+                "status": "queued",
+                "queued_at": time.time(),
+                **metadata
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delivered(self, frame_id, record_metadata):
+        """Producer callback: the broker acknowledged the frame"""
+        with self._lock:
+            entry = self._entries.get(frame_id)
+            if entry is not None:
+                entry.update({
+                    "status": "delivered",
+                    "partition": record_metadata.partition,
+                    "offset": record_metadata.offset,
+                    "delivered_at": time.time(),
+                })
+
+    def failed(self, frame_id, exception):
+        """Producer errback: the frame could not be delivered"""
+        with self._lock:
+            entry = self._entries.get(frame_id)
+            if entry is not None:
+                entry.update({"status": "failed", "error": str(exception)})
+
+    def get(self, frame_id):
+        """Status of a frame, or None if unknown (or already evicted)"""
+        with self._lock:
+            entry = self._entries.get(frame_id)
+            return dict(entry) if entry is not None else None
@@ -0,0 +1,452 @@
+"""
+Packed frame archive - frames are appended to rolling segment files instead of
+one image file each, with a compact index by camera and timestamp
+
+A segment is a pair of files named after its start time and writer process:
+
+    frames-<start ms>-<pid>-<seq>.seg   records: entry header, mime, camera, image bytes
+    frames-<start ms>-<pid>-<seq>.idx   the same entry headers, without the image bytes
+
+The index lets a reader find frames without touching the images, and the
+headers in the segment let it be rebuilt if the index is lost. Frames are
+queued by the consumer and written in batches by a background thread;
+retention deletes whole segments, oldest first. FrameArchiveReader maps
+segments into memory for random access.
+"""
+
+import bisect
+import logging
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# magic, timestamp, image offset, image length, crc32, mime length, camera length
+ENTRY = struct.Struct("<4sdQIIBH")
+MAGIC = b"FRA1"
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+_SEGMENT_NAME = re.compile(r"^frames-(\d+)-(\d+)-(\d+)$")
+
+ArchivedFrame = namedtuple("ArchivedFrame", "timestamp location mime segment offset length crc32")
+
+
+def frame_time(timestamp=None) -> float:
+    """Epoch seconds of a frame timestamp (epoch number or "%Y-%m-%d %H:%M:%S"), now when missing or unparsable"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if timestamp:
+        try:
+            return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp()
+        except (TypeError, ValueError):
+            pass
+    return time.time()
+
+
+def _entry(timestamp, offset, image, mime, location):
+    """Entry header of a frame whose image starts at offset"""
+    return ENTRY.pack(MAGIC, timestamp, offset, len(image), zlib.crc32(image), len(mime), len(location)) \
+        + mime + location
+
+
+def _parse_entries(buffer, segment, end=None):
+    """
+    Entries in an index buffer, or in a segment buffer when end is None (image
+    bytes follow each header there). A torn trailing entry is ignored.
+    """
+    frames = []
+    position, limit = 0, len(buffer)
+    while position + ENTRY.size <= limit:
+        magic, timestamp, offset, length, crc32, mime_length, location_length = ENTRY.unpack_from(buffer, position)
+        if magic != MAGIC:
+            logger.warning(f"Corrupt archive entry in {segment} at byte {position}, ignoring the rest")
+            break
+        position += ENTRY.size
+        if position + mime_length + location_length > limit:
+            break
+        mime = bytes(buffer[position:position + mime_length]).decode("utf-8")
+        position += mime_length
+        location = bytes(buffer[position:position + location_length]).decode("utf-8", errors="replace")
+        position += location_length
+        if end is None:
+            if offset + length > limit:
+                break
+            position = offset + length
+        elif offset + length > end:
+            break  # the image never fully reached the segment
+        frames.append(ArchivedFrame(timestamp, location, mime, segment, offset, length, crc32))
+    return frames
+
+
+def list_segments(directory: str) -> list:
+    """Segment names (without suffix) in the directory, oldest first"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    segments = []
+    for name in names:
+        stem, suffix = os.path.splitext(name)
+        match = _SEGMENT_NAME.match(stem)
+        if suffix == SEGMENT_SUFFIX and match:
+            segments.append((int(match.group(1)), int(match.group(2)), int(match.group(3)), stem))
+    return [stem for *_, stem in sorted(segments)]
+
+
+class FrameArchive:
+    """
+    Appends frames to rolling segment files from a background thread. The
+    frame's own thread only queues it; when the queue is full the frame is
+    dropped from the archive rather than holding up analysis.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 256 * 1024 * 1024,
+        segment_seconds: float = 3600,
+        retention_seconds: float = 0,
+        max_bytes: int = 0,
+        queue_frames: int = 1000,
+        batch_frames: int = 64,
+        flush_seconds: float = 0.5
+    ):
+        """
+        Args:
+            directory: Where segments are written
+            segment_bytes: Start a new segment once the current one reaches this size
+            segment_seconds: Start a new segment once the current one is this old
+            retention_seconds: Delete segments last written longer ago than this (0 keeps them)
+            max_bytes: Delete the oldest segments while the archive is larger than this (0 for no limit)
+            queue_frames: Frames waiting for the writer before new ones are dropped
+            batch_frames: Most frames written with one write
+            flush_seconds: Longest a queued frame waits for a batch to fill
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.batch_frames = batch_frames
+        self.flush_seconds = flush_seconds
+        os.makedirs(directory, exist_ok=True)
+
+        self.written = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.segments_removed = 0
+        self._queue = queue.Queue(queue_frames)
+        self._segment = None
+        self._data = None
+        self._index = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._sequence = 0
+        self._retention_checked = 0.0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, directory: str = None):
+        """Build from ARCHIVE_* environment variables, writing to directory (default IMAGE_DIR)"""
+        return cls(
+            directory or os.getenv("IMAGE_DIR", "./received_images"),
+            segment_bytes=int(float(os.getenv("ARCHIVE_SEGMENT_MB", "256")) * 1024 * 1024),
+            segment_seconds=float(os.getenv("ARCHIVE_SEGMENT_SECONDS", "3600")),
+            retention_seconds=float(os.getenv("ARCHIVE_RETENTION_HOURS", "0")) * 3600,
+            max_bytes=int(float(os.getenv("ARCHIVE_MAX_GB", "0")) * 1024 ** 3),
+            queue_frames=int(os.getenv("ARCHIVE_QUEUE_FRAMES", "1000")),
+            batch_frames=int(os.getenv("ARCHIVE_BATCH_FRAMES", "64")),
+            flush_seconds=float(os.getenv("ARCHIVE_FLUSH_MS", "500")) / 1000,
+        )
+
+    def archive(self, image_bytes, mime: str, location: str, timestamp=None) -> bool:
+        """
+        Queue a frame for the archive
+
+        Args:
+            image_bytes: Frame bytes (kept by reference until written)
+            mime: Image type, e.g. "image/jpeg"
+            location: Camera the frame came from
+            timestamp: Capture time (epoch seconds or the frame's timestamp string)
+
+        Returns:
+            bool: False if the frame was dropped because the writer is behind
+        """
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((frame_time(timestamp), image_bytes, mime or "image/jpeg", location or ""))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._stop.is_set():
+                # Not a daemon, so queued frames are written when the process exits
+                self._thread = threading.Thread(target=self._run, name="frame-archive")
+                self._thread.start()
+
+    def _run(self):
+        main = threading.main_thread()
+        while True:
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    logger.error(f"Archiving {len(batch)} frames failed: {e}")
+                    self._close_segment()
+            elif self._stop.is_set() or not main.is_alive():
+                break
+            self._maybe_enforce_retention()
+        self._close_segment()
+
+    def _next_batch(self):
+        """Wait up to flush_seconds for the first frame, then take whatever else is queued"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_seconds)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_frames:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch):
+        if self._segment is None or self._size >= self.segment_bytes or \
+                time.time() - self._opened_at >= self.segment_seconds:
+            self._roll()
+        records, entries = [], []
+        offset = self._size
+        for timestamp, image, mime, location in batch:
+            mime = mime.encode("utf-8")[:255]
+            location = location.encode("utf-8")[:65535]
+            # The image follows its entry header in the segment
+            offset += ENTRY.size + len(mime) + len(location)
+            entry = _entry(timestamp, offset, image, mime, location)
+            records.append(entry)
+            records.append(image)
+            entries.append(entry)
+            offset += len(image)
+        self._data.write(b"".join(records))
+        self._data.flush()
+        # The index only ever points at bytes already in the segment
+        self._index.write(b"".join(entries))
+        self._index.flush()
+        with self._lock:
+            self.bytes_written += offset - self._size
+            self.written += len(batch)
+        self._size = offset
+
+    def _roll(self):
+        """Close the current segment and open the next one"""
+        self._close_segment()
+        self._opened_at = time.time()
+        self._sequence += 1
+        self._segment = f"frames-{int(self._opened_at * 1000):013d}-{os.getpid()}-{self._sequence:04d}"
+        path = os.path.join(self.directory, self._segment)
+        self._data = open(path + SEGMENT_SUFFIX, "ab")
+        self._index = open(path + INDEX_SUFFIX, "ab")
+        self._size = self._data.tell()
+        logger.info(f"Archiving frames to segment {self._segment}")
+
+    def _close_segment(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError as e:
+                    logger.error(f"Closing archive segment {self._segment} failed: {e}")
+        self._segment = self._data = self._index = None
+
+    def _maybe_enforce_retention(self):
+        if not (self.retention_seconds or self.max_bytes):
+            return
+        now = time.monotonic()
+        if now - self._retention_checked < 60:
+            return
+        self._retention_checked = now
+        try:
+            removed = self.enforce_retention()
+            if removed:
+                logger.info(f"Archive retention removed {removed} segments")
+        except Exception as e:
+            logger.error(f"Archive retention failed: {e}")
+
+    def enforce_retention(self) -> int:
+        """
+        Delete whole segments past retention_seconds, then the oldest ones while
+        the archive is over max_bytes. Never deletes the segment being written.
+
+        Returns:
+            int: Segments removed
+        """
+        now = time.time()
+        cutoff = now - self.retention_seconds
+        segments = []
+        for segment in list_segments(self.directory):
+            if segment == self._segment:
+                continue
+            path = os.path.join(self.directory, segment)
+            try:
+                stat = os.stat(path + SEGMENT_SUFFIX)
+            except FileNotFoundError:
+                continue  # removed by another worker process
+            segments.append((segment, stat.st_size, stat.st_mtime))
+
+        removed = 0
+        total = sum(size for _, size, _ in segments) + self._size
+        for segment, size, modified in segments:
+            expired = self.retention_seconds and modified < cutoff
+            # A recently written segment may still be open in another worker process
+            oversize = self.max_bytes and total > self.max_bytes and now - modified >= 60
+            if not (expired or oversize):
+                continue
+            path = os.path.join(self.directory, segment)
+            for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self.segments_removed += removed
+        return removed
+
+    def stats(self) -> dict:
+        """Frames written and dropped, bytes written and segments removed by retention"""
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped": self.dropped,
+                "queued": self._queue.qsize(),
+                "bytes_written": self.bytes_written,
+                "segments_removed": self.segments_removed,
+            }
+
+    def close(self, timeout: float = 30):
+        """Write the frames still queued and close the current segment"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning(f"Frame archive still had {self._queue.qsize()} frames queued after {timeout}s")
+
+
+class FrameArchiveReader:
+    """Finds archived frames through the segment indexes and reads them from memory-mapped segments"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._indexes = {}  # segment -> (index size when read, frames by timestamp, their timestamps)
+        self._maps = {}  # segment -> (file, mmap)
+
+    def segments(self) -> list:
+        return list_segments(self.directory)
+
+    def index(self, segment: str) -> list:
+        """Frames in a segment ordered by timestamp"""
+        return self._load(segment)[1]
+
+    def _load(self, segment):
+        """Cached index of a segment, re-read once the index grows; scans the segment when the index is missing"""
+        path = os.path.join(self.directory, segment)
+        try:
+            size = os.path.getsize(path + INDEX_SUFFIX)
+        except FileNotFoundError:
+            size = None
+        cached = self._indexes.get(segment)
+        if cached is not None and size is not None and cached[0] == size:
+            return cached
+        try:
+            if size is None:
+                frames = _parse_entries(self._map(segment), segment)
+            else:
+                data_size = os.path.getsize(path + SEGMENT_SUFFIX)
+                with open(path + INDEX_SUFFIX, "rb") as f:
+                    frames = _parse_entries(f.read(), segment, end=data_size)
+        except (FileNotFoundError, ValueError):  # gone, or an empty segment that cannot be mapped
+            self._indexes.pop(segment, None)
+            return None, [], []
+        frames.sort(key=lambda frame: frame.timestamp)
+        loaded = (size, frames, [frame.timestamp for frame in frames])
+        self._indexes[segment] = loaded
+        return loaded
+
+    def find(self, location: str = None, start: float = None, end: float = None) -> list:
+        """
+        Archived frames, oldest first
+
+        Args:
+            location: Only frames from this camera
+            start: Only frames at or after this time (epoch seconds)
+            end: Only frames before this time (epoch seconds)
+        """
+        frames = []
+        for segment in self.segments():
+            _, indexed, timestamps = self._load(segment)
+            low = bisect.bisect_left(timestamps, start) if start is not None else 0
+            high = bisect.bisect_left(timestamps, end) if end is not None else len(timestamps)
+            frames.extend(frame for frame in indexed[low:high] if location is None or frame.location == location)
+        frames.sort(key=lambda frame: frame.timestamp)
+        return frames
+
+    def _map(self, segment, needed=0):
+        cached = self._maps.get(segment)
+        if cached is not None and len(cached[1]) >= needed:
+            return cached[1]
+        if cached is not None:
+            # The segment grew since it was mapped
+            cached[1].close()
+            cached[0].close()
+        f = open(os.path.join(self.directory, segment + SEGMENT_SUFFIX), "rb")
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            f.close()
+            self._maps.pop(segment, None)
+            raise
+        self._maps[segment] = (f, mapped)
+        return mapped
+
+    def read(self, frame: ArchivedFrame, verify: bool = True) -> bytes:
+        """
+        Bytes of an archived frame; raises KeyError if its segment is gone and
+        ValueError if the bytes fail their checksum
+        """
+        end = frame.offset + frame.length
+        try:
+            mapped = self._map(frame.segment, end)
+        except FileNotFoundError:
+            self._maps.pop(frame.segment, None)
+            raise KeyError(frame.segment)
+        if len(mapped) < end:
+            raise KeyError(f"{frame.segment} is shorter than its index")
+        data = mapped[frame.offset:end]
+        if verify and zlib.crc32(data) != frame.crc32:
+            raise ValueError(f"Checksum mismatch in {frame.segment} at byte {frame.offset}")
+        return data
+
+    def close(self):
+        for f, mapped in self._maps.values():
+            mapped.close()
+            f.close()
+        self._maps.clear()
+        self._indexes.clear()
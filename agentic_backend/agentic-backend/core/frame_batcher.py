@@ -0,0 +1,134 @@
+"""
+Micro-batching of frames across cameras - frames arriving within a short
+window share one multimodal model request instead of one request each
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _PendingFrame:
+    __slots__ = ("frame", "future", "queued_at")
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+class FrameBatcher:
+    """
+    Groups submitted frames into batches of up to max_batch, waiting at most
+    max_wait seconds after the first frame of a batch, and runs each batch on
+    a small thread pool. Every frame gets a Future for its own result.
+    """
+
+    def __init__(self, run_batch, max_batch: int = 4, max_wait: float = 0.2, max_concurrent: int = 4):
+        """
+        Args:
+            run_batch: Callable taking a list of frames (monitor_security_image
+                keyword arguments) and returning one result per frame; a result
+                may be an exception for a frame that failed
+            max_batch: Most frames per model request
+            max_wait: Longest a frame waits for its batch to fill, in seconds
+            max_concurrent: Batches analysed at the same time
+        """
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.batches = 0
+        self.frames = 0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="frame-batch")
+        self._thread = threading.Thread(target=self._run, name="frame-batcher", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, run_batch):
+        """Build from BATCH_* environment variables, or None when batching is off"""
+        if os.getenv("BATCH_ENABLED", "false").lower() != "true":
+            return None
+        return cls(
+            run_batch,
+            max_batch=int(os.getenv("BATCH_MAX_SIZE", "4")),
+            max_wait=int(os.getenv("BATCH_MAX_WAIT_MS", "200")) / 1000,
+            max_concurrent=int(os.getenv("BATCH_MAX_CONCURRENT", "4"))
+        )
+
+    def submit(self, frame: dict) -> Future:
+        """Queue a frame; the Future resolves to its analysis result"""
+        if self._closed:
+            raise RuntimeError("Frame batcher is closed")
+        pending = _PendingFrame(frame)
+        self._queue.put(pending)
+        return pending.future
+
+    def _collect(self, first):
+        """Gather frames until the batch is full or the wait window ends"""
+        batch = [first]
+        deadline = first.queued_at + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is _STOP:
+                self._queue.put(_STOP)  # stop after this batch
+                break
+            batch.append(pending)
+        return batch
+
+    def _analyse(self, batch):
+        try:
+            results = self.run_batch([pending.frame for pending in batch])
+        except Exception as e:
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        for pending, result in zip(batch, results):
+            if isinstance(result, Exception):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = self._collect(first)
+            with self._stats_lock:
+                self.batches += 1
+                self.frames += len(batch)
+            self._executor.submit(self._analyse, batch)
+
+    def stats(self) -> dict:
+        """Batches sent and mean frames per batch"""
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "mean_batch_size": self.frames / self.batches if self.batches else 0.0,
+            }
+
+    def close(self):
+        """Send what is queued, wait for running batches, then stop"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
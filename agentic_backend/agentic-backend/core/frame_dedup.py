@@ -0,0 +1,117 @@
+"""
+Perceptual-hash frame deduplication - fixed cameras mostly send near-identical
+frames, so a frame close enough to a recently analysed one reuses its result
+instead of going through Gemini and Firebase again
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def dhash(thumbnail: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: compare neighbouring pixels of a (hash_size+1) x hash_size
+    shrink of a grayscale thumbnail. Returns a hash_size*hash_size bit integer.
+    """
+    pixels = list(thumbnail.resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+class FrameDedupCache:
+    """
+    Bounded per-location cache of recent frame hashes and their analysis.
+
+    Each location keeps up to max_per_location entries (LRU), entries expire
+    after ttl_seconds, and at most max_locations cameras are tracked.
+    """
+
+    def __init__(self, threshold=6, ttl_seconds=60, max_per_location=32, max_locations=1024):
+        """
+        Args:
+            threshold: Maximum Hamming distance (of 64 bits) to count as a duplicate
+            ttl_seconds: How long an analysis result can be reused
+            max_per_location: Hashes kept per camera
+            max_locations: Cameras tracked before the least recent is dropped
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_per_location = max_per_location
+        self.max_locations = max_locations
+        self._entries = OrderedDict()  # location -> OrderedDict(hash -> (result, stored_at))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build from DEDUP_* environment variables, or None when DEDUP_ENABLED=false"""
+        if os.getenv("DEDUP_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            threshold=int(os.getenv("DEDUP_HAMMING_THRESHOLD", "6")),
+            ttl_seconds=float(os.getenv("DEDUP_TTL_SECONDS", "60")),
+            max_per_location=int(os.getenv("DEDUP_MAX_PER_LOCATION", "32")),
+            max_locations=int(os.getenv("DEDUP_MAX_LOCATIONS", "1024")),
+        )
+
+    def lookup(self, location, frame_hash):
+        """
+        Find the analysis of a recent, similar frame from the same location
+
+        Returns:
+            dict | None: The cached result, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(location)
+            if entries:
+                for cached_hash, (result, stored_at) in list(entries.items()):
+                    if now - stored_at > self.ttl_seconds:
+                        del entries[cached_hash]
+                        continue
+                    if hamming_distance(cached_hash, frame_hash) <= self.threshold:
+                        entries.move_to_end(cached_hash)
+                        self._entries.move_to_end(location)
+                        self.hits += 1
+                        return result
+            self.misses += 1
+            return None
+
+    def store(self, location, frame_hash, result):
+        """Remember the analysis of a frame"""
+        with self._lock:
+            entries = self._entries.setdefault(location, OrderedDict())
+            entries[frame_hash] = (result, time.monotonic())
+            entries.move_to_end(frame_hash)
+            self._entries.move_to_end(location)
+            while len(entries) > self.max_per_location:
+                entries.popitem(last=False)
+            while len(self._entries) > self.max_locations:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for tuning the threshold"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
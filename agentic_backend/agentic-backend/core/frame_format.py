@@ -0,0 +1,148 @@
+"""
+Kafka frame format shared by the ingest API (producer) and the consumer.
+
+Version 1 (binary): the message value is the raw image bytes and the metadata
+travels in Kafka headers. Messages without a frame-format header are the
+legacy JSON format ({"image": <base64>, "timestamp", "location",
+"organization_id"}) and are still readable.
+
+Version 2 (claim check): same headers as version 1, but the value is empty and
+a blob-ref header names the frame in the shared blob store.
+
+Both versions may carry a trace context: the trace ID minted by the ingest API
+and the epoch seconds the frame was captured, received and produced at.
+"""
+
+import base64
+import json
+
+FORMAT_HEADER = "frame-format"
+FORMAT_VERSION = "1"
+CLAIM_CHECK_VERSION = "2"
+
+HEADER_CONTENT_TYPE = "content-type"
+HEADER_TIMESTAMP = "timestamp"
+HEADER_LOCATION = "location"
+HEADER_ORGANIZATION = "organization-id"
+HEADER_FRAME_ID = "frame-id"
+HEADER_BLOB_REF = "blob-ref"
+HEADER_CONTENT_LENGTH = "content-length"
+HEADER_TRACE_ID = "trace-id"
+# Trace context field -> header holding it (epoch seconds)
+TRACE_TIME_HEADERS = {"captured_at": "captured-at", "received_at": "received-at", "produced_at": "produced-at"}
+
+
+def encode_frame(image_bytes, timestamp, location, organization_id, content_type="image/jpeg", frame_id=None,
+                 trace=None):
+    """
+    Build a binary frame message
+
+    Args:
+        trace: Trace context (trace_id, captured_at, received_at, produced_at)
+
+    Returns:
+        tuple: (value bytes, list of (header name, header bytes))
+    """
+    headers = [
+        (FORMAT_HEADER, FORMAT_VERSION.encode()),
+        (HEADER_CONTENT_TYPE, (content_type or "application/octet-stream").encode()),
+        (HEADER_TIMESTAMP, timestamp.encode()),
+        (HEADER_LOCATION, location.encode()),
+    ]
+    if organization_id is not None:
+        headers.append((HEADER_ORGANIZATION, str(organization_id).encode()))
+    if frame_id is not None:
+        headers.append((HEADER_FRAME_ID, frame_id.encode()))
+    if trace:
+        headers.append((HEADER_TRACE_ID, trace["trace_id"].encode()))
+        for field, header in TRACE_TIME_HEADERS.items():
+            if trace.get(field) is not None:
+                headers.append((header, repr(float(trace[field])).encode()))
+    return image_bytes, headers
+
+
+def encode_frame_reference(blob_ref, size, timestamp, location, organization_id,
+                           content_type="image/jpeg", frame_id=None, trace=None):
+    """
+    Build a claim-check message pointing at a frame in the blob store
+
+    Returns:
+        tuple: (empty value, list of (header name, header bytes))
+    """
+    _, headers = encode_frame(b"", timestamp, location, organization_id, content_type, frame_id, trace)
+    headers[0] = (FORMAT_HEADER, CLAIM_CHECK_VERSION.encode())
+    headers.append((HEADER_BLOB_REF, blob_ref.encode()))
+    headers.append((HEADER_CONTENT_LENGTH, str(size).encode()))
+    return b"", headers
+
+
+def encode_legacy_frame(image_bytes, timestamp, location, organization_id, frame_id=None, trace=None):
+    """Build a legacy base64-in-JSON message value"""
+    return json.dumps({
+        "image": base64.b64encode(image_bytes).decode("utf-8"),
+        "timestamp": timestamp,
+        "location": location,
+        "organization_id": organization_id,
+        "frame_id": frame_id,
+        "trace": trace
+    }).encode("utf-8")
+
+
+def decode_frame(value, headers=None) -> dict:
+    """
+    Decode a frame message in either format
+
+    Args:
+        value: Kafka message value
+        headers: Kafka message headers as (name, bytes) pairs
+
+    Returns:
+        dict: image_bytes, timestamp, location, organization_id, content_type,
+            frame_id, image_ref (for claim-check messages image_bytes is
+            None and image_ref holds the blob key) and trace (None when the
+            producer sent no trace context)
+    """
+    header_map = {name: raw.decode("utf-8") for name, raw in (headers or []) if raw is not None}
+    version = header_map.get(FORMAT_HEADER)
+
+    if version is None:
+        data = json.loads(value.decode("utf-8"))
+        return {
+            "image_bytes": base64.b64decode(data["image"]),
+            "timestamp": data.get("timestamp"),
+            "location": data.get("location"),
+            "organization_id": data.get("organization_id"),
+            "content_type": None,
+            "frame_id": data.get("frame_id"),
+            "image_ref": None,
+            "trace": data.get("trace"),
+        }
+
+    if version not in (FORMAT_VERSION, CLAIM_CHECK_VERSION):
+        raise ValueError(f"Unsupported frame format version: {version}")
+
+    image_ref = header_map.get(HEADER_BLOB_REF) if version == CLAIM_CHECK_VERSION else None
+    if version == CLAIM_CHECK_VERSION and not image_ref:
+        raise ValueError("Claim-check frame without a blob reference")
+
+    return {
+        "image_bytes": None if image_ref else value,
+        "image_ref": image_ref,
+        "timestamp": header_map.get(HEADER_TIMESTAMP),
+        "location": header_map.get(HEADER_LOCATION),
+        "organization_id": header_map.get(HEADER_ORGANIZATION),
+        "content_type": header_map.get(HEADER_CONTENT_TYPE),
+        "frame_id": header_map.get(HEADER_FRAME_ID),
+        "trace": _decode_trace(header_map),
+    }
+
+
+def _decode_trace(header_map):
+    trace_id = header_map.get(HEADER_TRACE_ID)
+    if trace_id is None:
+        return None
+    trace = {"trace_id": trace_id}
+    for field, header in TRACE_TIME_HEADERS.items():
+        if header in header_map:
+            trace[field] = float(header_map[header])
+    return trace
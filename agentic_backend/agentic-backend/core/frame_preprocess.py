@@ -0,0 +1,101 @@
+"""
+Frame preprocessing before model submission - downscale and recompress frames
+per camera so the model gets no more pixels than incident detection needs
+"""
+
+import logging
+import os
+import threading
+from io import BytesIO
+
+from PIL import Image
+
+from agent.imaging import PASSTHROUGH_MIME_TYPES, downscale_frame, prepare_image_bytes, sniff_mime
+from camera_config import CameraConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "max_long_edge": 1024,      # Longest side sent to the model, in pixels
+    "quality": 80,              # Starting JPEG quality
+    "max_bytes": 150_000,       # Step quality down until the frame fits (0 disables)
+    "min_quality": 50,          # Never go below this quality
+}
+
+
+class FramePreprocessor:
+    """
+    Per-camera downscale and recompression.
+
+    Frames already within max_long_edge and max_bytes in a format Gemini
+    accepts go through untouched; everything else is shrunk and re-encoded
+    as JPEG.
+    """
+
+    def __init__(self, config: CameraConfig = None):
+        self.config = config or CameraConfig(DEFAULT_SETTINGS)
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.resized = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build from PREPROCESS_* environment variables, or None when disabled"""
+        if os.getenv("PREPROCESS_ENABLED", "true").lower() != "true":
+            return None
+        return cls(CameraConfig.from_env("PREPROCESS_CONFIG", DEFAULT_SETTINGS))
+
+    def needs_resize(self, data, settings) -> bool:
+        """Whether a frame is over its camera's size limits (reads only the header)"""
+        if sniff_mime(data) not in PASSTHROUGH_MIME_TYPES:
+            return True
+        if settings["max_bytes"] and len(data) > settings["max_bytes"]:
+            return True
+        return max(Image.open(BytesIO(data)).size) > settings["max_long_edge"]
+
+    def apply(self, location, data) -> tuple[bytes, str]:
+        """
+        Prepare a frame for the model
+
+        Args:
+            location: Camera location (selects the settings)
+            data: Frame bytes in any format Pillow reads
+
+        Returns:
+            tuple: (image bytes, mime type)
+        """
+        settings = self.config.for_location(location)
+        if self.needs_resize(data, settings):
+            output, used = downscale_frame(
+                data,
+                settings["max_long_edge"],
+                quality=settings["quality"],
+                max_bytes=settings["max_bytes"],
+                min_quality=settings["min_quality"]
+            )
+            mime, resized = "image/jpeg", True
+            logger.debug(
+                f"Downscaled frame from {location}: {len(data)} -> {len(output)} bytes "
+                f"({used['width']}x{used['height']} q{used['quality']})"
+            )
+        else:
+            (output, mime), resized = prepare_image_bytes(data), False
+
+        with self._lock:
+            self.frames += 1
+            self.resized += resized
+            self.bytes_in += len(data)
+            self.bytes_out += len(output)
+        return output, mime
+
+    def stats(self) -> dict:
+        """Frames seen and resized, and bytes in versus bytes sent"""
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "resized": self.resized,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
@@ -0,0 +1,128 @@
+"""
+Per-camera regions of interest - crop (or mask) each frame down to the parts a
+camera is there to watch, optionally tiling wide scenes, before analysis
+"""
+
+import logging
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from agent.imaging import encode_jpeg, flatten_to_rgb
+from camera_config import CameraConfig
+
+logger = logging.getLogger(__name__)
+
+# Coordinates are fractions of the frame (0-1), so they survive resolution changes
+DEFAULT_SETTINGS = {
+    "regions": [],      # [{"name": "door", "rect": [x0, y0, x1, y1]} | {"name": ..., "polygon": [[x, y], ...]}]
+    "tiles": [1, 1],    # Split each region (or the whole frame) into columns x rows
+    "overlap": 0.05,    # Tile overlap, as a fraction of the tile size
+    "quality": 85,      # JPEG quality of the crops
+}
+
+# Pixels outside a polygon are painted this neutral grey
+MASK_FILL = (128, 128, 128)
+
+
+def _region_box(region, width, height):
+    """Pixel bounding box of a rect or polygon region"""
+    if "polygon" in region:
+        xs = [x for x, _ in region["polygon"]]
+        ys = [y for _, y in region["polygon"]]
+        x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+    else:
+        x0, y0, x1, y1 = region["rect"]
+    box = (
+        max(0, int(x0 * width)), max(0, int(y0 * height)),
+        min(width, round(x1 * width)), min(height, round(y1 * height)),
+    )
+    if box[2] <= box[0] or box[3] <= box[1]:
+        raise ValueError(f"Empty region: {region}")
+    return box
+
+
+def _mask_polygon(crop, polygon, box, width, height):
+    """Grey out everything in the crop outside the polygon"""
+    points = [(x * width - box[0], y * height - box[1]) for x, y in polygon]
+    mask = Image.new("L", crop.size, 0)
+    ImageDraw.Draw(mask).polygon(points, fill=255)
+    return Image.composite(crop, Image.new("RGB", crop.size, MASK_FILL), mask)
+
+
+def _tile_boxes(box, columns, rows, overlap):
+    """Split a pixel box into a columns x rows grid of overlapping boxes"""
+    x0, y0, x1, y1 = box
+    tile_w = (x1 - x0) / columns
+    tile_h = (y1 - y0) / rows
+    pad_x, pad_y = tile_w * overlap, tile_h * overlap
+    for row in range(rows):
+        for column in range(columns):
+            yield row, column, (
+                max(x0, int(x0 + column * tile_w - pad_x)),
+                max(y0, int(y0 + row * tile_h - pad_y)),
+                min(x1, round(x0 + (column + 1) * tile_w + pad_x)),
+                min(y1, round(y0 + (row + 1) * tile_h + pad_y)),
+            )
+
+
+class RegionCropper:
+    """
+    Cuts frames into the regions configured for their camera.
+
+    Rect regions are cropped; polygon regions are cropped to their bounding
+    box and masked outside the polygon. Every region (or the whole frame, if
+    only tiling is configured) can be split into tiles for very wide scenes.
+    """
+
+    def __init__(self, config: CameraConfig = None):
+        self.config = config or CameraConfig(DEFAULT_SETTINGS)
+
+    @classmethod
+    def from_env(cls):
+        """Build from ROI_CONFIG, or None when no camera has regions or tiling"""
+        config = CameraConfig.from_env("ROI_CONFIG", DEFAULT_SETTINGS)
+        if not any(cls._active(settings) for settings in [config.defaults, *config.overrides.values()]):
+            return None
+        return cls(config)
+
+    @staticmethod
+    def _active(settings) -> bool:
+        return bool(settings.get("regions")) or tuple(settings.get("tiles", (1, 1))) != (1, 1)
+
+    def apply(self, location, data):
+        """
+        Crop a frame to its camera's regions
+
+        Args:
+            location: Camera location (selects the regions)
+            data: Frame bytes
+
+        Returns:
+            tuple: (list of JPEG crops, list of ROI dicts with name, box in
+                full-frame pixels and frame_size) - or (None, None) when the
+                camera has no regions
+        """
+        settings = self.config.for_location(location)
+        if not self._active(settings):
+            return None, None
+
+        image = flatten_to_rgb(Image.open(BytesIO(data)))
+        width, height = image.size
+        regions = settings["regions"] or [{"name": "frame", "rect": [0, 0, 1, 1]}]
+        columns, rows = settings["tiles"]
+
+        crops, roi = [], []
+        for index, region in enumerate(regions):
+            name = region.get("name") or f"region {index + 1}"
+            box = _region_box(region, width, height)
+            area = image.crop(box)
+            if "polygon" in region:
+                area = _mask_polygon(area, region["polygon"], box, width, height)
+
+            for row, column, tile in _tile_boxes(box, columns, rows, settings["overlap"]):
+                tile_name = name if columns * rows == 1 else f"{name} [row {row + 1}, col {column + 1}]"
+                local = (tile[0] - box[0], tile[1] - box[1], tile[2] - box[0], tile[3] - box[1])
+                crops.append(encode_jpeg(area.crop(local), settings["quality"]))
+                roi.append({"name": tile_name, "box": list(tile), "frame_size": [width, height]})
+        return crops, roi
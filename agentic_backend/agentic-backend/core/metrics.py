@@ -0,0 +1,131 @@
+"""
+Prometheus metrics for the consumer and the Django ingest - stage latency
+histograms, consumer lag and in-flight gauges, and frame/incident counters
+
+Without prometheus_client installed every metric is a no-op, so neither
+service depends on it to run.
+"""
+
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, start_http_server
+except ImportError:  # metrics are optional
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    Counter = Gauge = Histogram = generate_latest = start_http_server = None
+
+# Seconds; the model sits in the 0.5-10 s range, CPU stages well below
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus_client is missing"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+def _metric(kind, name, documentation, labels=(), **kwargs):
+    if kind is None:
+        return _NoopMetric()
+    return kind(name, documentation, labels, **kwargs)
+
+
+# ---------- CONSUMER ----------
+
+STAGE_SECONDS = _metric(
+    Histogram, "frame_stage_seconds",
+    "Time a frame spends in each pipeline stage (decode, preprocess, model, manage_firebase, ...)",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+FRAMES = _metric(
+    Counter, "frames_total", "Frames handled, by organization and outcome (analysed, reused, error)",
+    ["organization", "outcome"]
+)
+INCIDENTS = _metric(
+    Counter, "incidents_detected_total", "Frames with an incident, by incident type and organization",
+    ["incident_type", "organization"]
+)
+IN_FLIGHT = _metric(Gauge, "frames_in_flight", "Frames queued or being analysed by the consumer")
+CONSUMER_LAG = _metric(
+    Gauge, "kafka_consumer_lag", "Messages between the committed offset and the end of each partition",
+    ["topic", "partition"]
+)
+
+# ---------- INGEST ----------
+
+PRODUCE_SECONDS = _metric(
+    Histogram, "kafka_produce_seconds", "Time for KafkaProducer.send() to accept a frame",
+    buckets=LATENCY_BUCKETS
+)
+DELIVERY_SECONDS = _metric(
+    Histogram, "kafka_delivery_seconds", "Time from send() until the broker acknowledged the frame",
+    buckets=LATENCY_BUCKETS
+)
+INGESTED = _metric(
+    Counter, "frames_ingested_total", "Frames accepted by the ingest API, by organization and delivery outcome",
+    ["organization", "outcome"]
+)
+
+
+def label(value, default="unknown", max_length=40) -> str:
+    """
+    Label value for free text such as model-chosen incident types: lower
+    case, runs of other characters collapsed to "_", length capped, so the
+    number of series stays bounded
+    """
+    text = re.sub(r"[^a-z0-9]+", "_", str(value or "").lower()).strip("_")
+    return text[:max_length] or default
+
+
+def observe_timings(timings):
+    """Feed a result's stage timings (milliseconds) into the stage histogram"""
+    for stage, ms in (timings or {}).items():
+        STAGE_SECONDS.labels(stage=stage).observe(ms / 1000)
+
+
+def exposition():
+    """
+    Current metrics in the Prometheus text format
+
+    Returns:
+        tuple: (body bytes or None without prometheus_client, content type)
+    """
+    if generate_latest is None:
+        return None, CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int = None):
+    """
+    Serve /metrics over HTTP from a background thread (port from METRICS_PORT;
+    0 or unset disables it)
+
+    Returns:
+        bool: Whether the server started
+    """
+    port = port if port is not None else int(os.getenv("METRICS_PORT", "0") or 0)
+    if not port:
+        return False
+    if start_http_server is None:
+        logger.warning("prometheus_client not installed - metrics endpoint disabled")
+        return False
+    start_http_server(port)
+    logger.info(f"📈 Metrics served on :{port}/metrics")
+    return True
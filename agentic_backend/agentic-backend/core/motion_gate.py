@@ -0,0 +1,128 @@
+"""
+Motion / scene-change prefilter - skips the LLM for frames where nothing has
+changed since the camera's last analysed frame
+"""
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from camera_config import CameraConfig
+
+logger = logging.getLogger(__name__)
+
+# Size of the grayscale thumbnail the gate (and the dedup hash) works on
+THUMBNAIL_SIZE = (160, 120)
+
+DEFAULT_SETTINGS = {
+    "pixel_threshold": 25,          # Grey-level difference for a pixel to count as changed
+    "min_changed_fraction": 0.02,   # Share of changed pixels that triggers analysis
+    "max_staleness_seconds": 30,    # Always analyse at least this often
+    "background_alpha": 0.05,       # Running background update rate per frame
+}
+
+class _CameraState:
+    __slots__ = ("background", "diff", "last_analyzed_at", "last_result")
+
+    def __init__(self, frame):
+        self.background = frame.copy()
+        self.diff = np.empty_like(frame)
+        self.last_analyzed_at = None
+        self.last_result = None
+
+
+class MotionGate:
+    """
+    Frame differencing against a per-camera running background.
+
+    A frame is analysed when enough pixels differ from the background, when
+    the camera hasn't been analysed for max_staleness_seconds, or when its last
+    analysis reported an open problem. Otherwise the last analysis is reused.
+    """
+
+    def __init__(self, config: CameraConfig = None):
+        self.config = config or CameraConfig(DEFAULT_SETTINGS)
+        self._cameras = {}
+        self._lock = threading.Lock()
+        self.analyzed = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build from MOTION_GATE_* environment variables, or None when disabled"""
+        if os.getenv("MOTION_GATE_ENABLED", "true").lower() != "true":
+            return None
+        return cls(CameraConfig.from_env("MOTION_GATE_CONFIG", DEFAULT_SETTINGS))
+
+    def changed_fraction(self, location, frame: np.ndarray) -> float | None:
+        """
+        Update the camera's background with a grayscale frame and return the
+        share of pixels that changed (None for the first frame of a camera)
+        """
+        settings = self.config.for_location(location)
+        frame = np.asarray(frame, dtype=np.float32)
+
+        camera = self._cameras.get(location)
+        if camera is None or camera.background.shape != frame.shape:
+            self._cameras[location] = _CameraState(frame)
+            return None
+
+        diff = camera.diff
+        np.subtract(frame, camera.background, out=diff)
+        np.abs(diff, out=diff)
+        changed = np.count_nonzero(diff > settings["pixel_threshold"]) / diff.size
+
+        # background += alpha * (frame - background)
+        np.subtract(frame, camera.background, out=diff)
+        diff *= settings["background_alpha"]
+        camera.background += diff
+        return changed
+
+    def check(self, location, frame: np.ndarray):
+        """
+        Decide whether a frame needs analysis
+
+        Args:
+            location: Camera location
+            frame: Grayscale thumbnail (THUMBNAIL_SIZE) as a 2-D array
+
+        Returns:
+            dict | None: The last analysis to reuse, or None if the frame must be analysed
+        """
+        settings = self.config.for_location(location)
+        now = time.monotonic()
+
+        with self._lock:
+            changed = self.changed_fraction(location, frame)
+            camera = self._cameras[location]
+            last = camera.last_result
+
+            if (
+                changed is None
+                or last is None
+                or last.get("is_problem")
+                or camera.last_analyzed_at is None
+                or now - camera.last_analyzed_at >= settings["max_staleness_seconds"]
+                or changed >= settings["min_changed_fraction"]
+            ):
+                self.analyzed += 1
+                return None
+
+            self.skipped += 1
+            return last
+
+    def record(self, location, result):
+        """Remember a completed analysis as the camera's reference point"""
+        with self._lock:
+            camera = self._cameras.get(location)
+            if camera is not None:
+                camera.last_analyzed_at = time.monotonic()
+                camera.last_result = result
+
+    def stats(self) -> dict:
+        """Analysed / skipped counters"""
+        with self._lock:
+            return {"analyzed": self.analyzed, "skipped": self.skipped}
@@ -0,0 +1,263 @@
+"""
+Logging for the consumer and the Django ingest - plain text or JSON lines,
+written by a background thread so frame processing never waits on a stream
+or file, with size or time rotation and per-frame sampling under load
+
+The consumer calls configure_logging(); Django's settings build LOGGING with
+build_logging_config(). Both read the LOG_* environment variables.
+"""
+
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import weakref
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Fields of the frame being processed (trace_id, location, ...), set by log_context()
+frame_context = ContextVar("frame_context", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (e.g. trace_id, location) to every record logged by this thread or task meanwhile"""
+    token = frame_context.set({**(frame_context.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        frame_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the frame context onto records; runs in the logging thread, before the queue"""
+
+    def filter(self, record):
+        for key, value in (frame_context.get() or {}).items():
+            if value is not None and not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps every WARNING and above. Below that, the first `burst` records of
+    each second pass; past the burst, only a `rate` share of frames keep their
+    records. The choice hashes the frame's trace_id, so a frame keeps all of
+    its lines or none. Records outside a frame are sampled at random.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 100):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.dropped = 0
+        self._second = 0
+        self._count = 0
+        self._threshold = int(rate * 0xFFFFFFFF)
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        # Every handler runs the filter; the first one decides for all of them
+        decision = getattr(record, "_sampled", None)
+        if decision is not None:
+            return decision
+        record._sampled = self._decide(record)
+        return record._sampled
+
+    def _decide(self, record):
+        now = int(time.monotonic())
+        with self._lock:
+            if now != self._second:
+                self._second, self._count = now, 0
+            self._count += 1
+            if self._count <= self.burst:
+                return True
+        trace_id = getattr(record, "trace_id", None) or (frame_context.get() or {}).get("trace_id")
+        if trace_id is not None:
+            keep = zlib.crc32(str(trace_id).encode()) <= self._threshold
+        else:
+            keep = random.random() < self.rate
+        if not keep:
+            self.dropped += 1  # approximate under contention; only reported
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, context and `extra` fields, exception"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail when stopping with a full queue
+        self.queue.put(self._sentinel)
+
+
+class BackgroundLogHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a writer thread, which formats and writes them to stderr
+    or to a rotating file. When the queue is full, records are dropped rather
+    than blocking the caller. Filters on this handler run in the calling
+    thread, so sampled-out records never reach the queue.
+    """
+
+    def __init__(self, filename: str = None, max_bytes: int = 0, backup_count: int = 5, when: str = None,
+                 queue_size: int = 10000):
+        """
+        Args:
+            filename: Log file (None writes to stderr)
+            max_bytes: Rotate the file at this size (0 disables size rotation)
+            backup_count: Rotated files kept
+            when: Rotate on time instead ("midnight", "H", ... as TimedRotatingFileHandler)
+            queue_size: Records waiting for the writer before new ones are dropped
+        """
+        super().__init__(queue.Queue(queue_size))
+        if filename is None:
+            self.target = logging.StreamHandler(sys.stderr)
+        elif when:
+            self.target = logging.handlers.TimedRotatingFileHandler(
+                filename, when=when, backupCount=backup_count, encoding="utf-8", delay=True
+            )
+        else:
+            self.target = logging.handlers.RotatingFileHandler(
+                filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+            )
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._start_listener()
+        # The writer thread does not survive fork() into worker processes
+        reference = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: _restart_after_fork(reference))
+
+    def _start_listener(self):
+        self.listener = _Listener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def _restart_in_child(self):
+        if self.listener is not None:
+            self.queue = queue.Queue(self.queue_size)
+            self._start_listener()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the writer thread, with the target's formatter
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Only merge the message arguments here; timestamps, JSON and tracebacks
+        # are formatted on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Drains the queue before returning
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+
+def _restart_after_fork(reference):
+    handler = reference()
+    if handler is not None:
+        handler._restart_in_child()
+
+
+def build_logging_config(level: str = None, filename: str = None, loggers: dict = None) -> dict:
+    """
+    dictConfig for the LOG_* environment variables
+
+    LOG_FORMAT is "text" or "json". LOG_FILE adds a file next to stderr,
+    rotated at LOG_MAX_BYTES, or on LOG_ROTATE_WHEN when set, keeping
+    LOG_BACKUP_COUNT files. LOG_SAMPLE_RATE below 1 samples INFO and DEBUG
+    records by frame once more than LOG_SAMPLE_BURST records arrive in a
+    second.
+
+    Args:
+        level: Root level (default LOG_LEVEL or INFO)
+        filename: Log file when LOG_FILE is unset
+        loggers: Levels of named loggers, e.g. {"django": "INFO"}; they
+            propagate to the root handlers instead of getting their own
+    """
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    filename = os.getenv("LOG_FILE", filename) or None
+    json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    handlers = {
+        "console": {
+            "()": BackgroundLogHandler,
+            "formatter": "default",
+            "filters": ["context", "sampling"],
+        }
+    }
+    if filename:
+        handlers["file"] = {
+            "()": BackgroundLogHandler,
+            "formatter": "default",
+            "filters": ["context", "sampling"],
+            "filename": filename,
+            "max_bytes": int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024))),
+            "backup_count": int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            "when": os.getenv("LOG_ROTATE_WHEN") or None,
+        }
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "default": {"()": JsonFormatter} if json_format else {"format": TEXT_FORMAT},
+        },
+        "filters": {
+            "context": {"()": ContextFilter},
+            "sampling": {
+                "()": SamplingFilter,
+                "rate": float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+                "burst": int(os.getenv("LOG_SAMPLE_BURST", "100")),
+            },
+        },
+        "handlers": handlers,
+        "loggers": {name: {"level": logger_level} for name, logger_level in (loggers or {}).items()},
+        "root": {"level": level, "handlers": list(handlers)},
+    }
+
+
+def configure_logging(level: str = None, filename: str = None, loggers: dict = None):
+    """Apply build_logging_config() to this process"""
+    logging.config.dictConfig(build_logging_config(level, filename, loggers))
@@ -0,0 +1,182 @@
+"""
+Capture-to-alert tracing - the ingest API mints a trace ID per frame that
+travels in the Kafka headers, the agent state and the incident document, and
+the consumer exports one record per frame with a span for every hop:
+
+    upload        camera capture -> ingest API (only when the client sends captured_at)
+    ingest        ingest API -> handed to the Kafka producer
+    queue         producer -> polled by the consumer (batching, broker, consumer lag)
+    decode        message -> frame fields
+    worker_queue  waiting for a worker lane in the consumer
+    process       process_image, with its stages (preprocess, screen, model,
+                  reconcile, ...) as child spans
+    write         queued incident write -> committed to Firestore (exported
+                  in its own record once the batch lands)
+
+Span times are wall-clock epoch seconds, so hops measured on different hosts
+are only as accurate as their clock sync. Records are JSON lines; log shippers
+and collectors can tail the file.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Stage timings renamed in traces
+STAGE_SPANS = {"manage_firebase": "reconcile"}
+
+# Spans spent waiting rather than working on the frame
+WAIT_SPANS = ("queue", "worker_queue")
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_trace(captured_at=None) -> dict:
+    """
+    Trace context for a frame arriving at the ingest API
+
+    Args:
+        captured_at: Epoch seconds the camera took the frame (ignored unless numeric)
+    """
+    trace = {"trace_id": new_trace_id(), "received_at": time.time()}
+    try:
+        if captured_at not in (None, ""):
+            trace["captured_at"] = float(captured_at)
+    except (TypeError, ValueError):
+        logger.debug(f"Ignoring captured_at {captured_at!r}")
+    return trace
+
+
+def _span(name, start, end=None, ms=None, parent=None, **attributes):
+    span = {"name": name, "start": start, "ms": round(ms if ms is not None else 1000 * (end - start), 3)}
+    if parent is not None:
+        span["parent"] = parent
+    span.update(attributes)
+    return span
+
+
+def build_trace(trace: dict, result: dict, finished_at: float) -> dict:
+    """
+    Trace record of a handled frame
+
+    Args:
+        trace: Trace context of the frame (from the headers, plus frame_id,
+            delivered_at and decode_ms stamped by the consumer)
+        result: process_image result (its "timings" become child spans)
+        finished_at: Epoch seconds the result was handled
+
+    Returns:
+        dict: trace_id, frame fields, origin, finished_at and spans
+    """
+    captured, received, produced = trace.get("captured_at"), trace.get("received_at"), trace.get("produced_at")
+    delivered = trace["delivered_at"]
+    spans = []
+    if captured is not None and received is not None:
+        spans.append(_span("upload", captured, received))
+    if received is not None and produced is not None:
+        spans.append(_span("ingest", received, produced))
+    if produced is not None:
+        spans.append(_span("queue", produced, delivered))
+    decoded = delivered + trace.get("decode_ms", 0.0) / 1000
+    spans.append(_span("decode", delivered, decoded))
+
+    timings = dict(result.get("timings") or {})
+    total = timings.pop("total", None)
+    if total is not None:
+        started = finished_at - total / 1000
+        spans.append(_span("worker_queue", decoded, ms=max(0.0, 1000 * (started - decoded))))
+        spans.append(_span("process", started, ms=total))
+        spans.extend(_span(STAGE_SPANS.get(stage, stage), None, ms=ms, parent="process") for stage, ms in timings.items())
+
+    return {
+        "trace_id": trace["trace_id"],
+        "frame_id": trace.get("frame_id"),
+        "location": result.get("location"),
+        "organization_id": result.get("organization_id"),
+        "is_problem": result.get("is_problem"),
+        "incident_type": result.get("incident_type"),
+        "error": result.get("error"),
+        "origin": next(t for t in (captured, received, delivered) if t is not None),
+        "finished_at": finished_at,
+        "spans": spans,
+    }
+
+
+class JsonlTraceExporter:
+    """Appends trace records to a JSON-lines file (one line per frame or write)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # O_APPEND keeps whole lines intact when worker processes share the file
+        self._file = open(path, "a", buffering=1, encoding="utf-8")
+        self._lock = threading.Lock()
+        self.exported = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build from TRACE_* environment variables, or None unless TRACE_ENABLED=true"""
+        if os.getenv("TRACE_ENABLED", "false").lower() != "true":
+            return None
+        return cls(os.getenv("TRACE_EXPORT_PATH", "./traces/frames.jsonl"))
+
+    def export(self, record: dict):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            self.exported += 1
+
+    def record_write(self, trace_id, operation, doc_id, started, ended, error=None):
+        """Firestore write listener: export the write span of a traced frame"""
+        self.export({
+            "trace_id": trace_id,
+            "spans": [_span("write", started, ended, operation=operation, doc_id=doc_id,
+                            error=str(error) if error else None)],
+        })
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_traces(path: str) -> dict:
+    """
+    Read an exported trace file, merging write spans into their frame's record
+
+    Returns:
+        dict: trace_id -> record (frames whose record is missing are dropped)
+    """
+    frames, writes = {}, {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "origin" in record:
+                frames[record["trace_id"]] = record
+            else:
+                writes.setdefault(record["trace_id"], []).extend(record["spans"])
+    for trace_id, spans in writes.items():
+        if trace_id in frames:
+            frames[trace_id]["spans"].extend(spans)
+    return frames
+
+
+def end_to_end_ms(record: dict) -> float:
+    """Origin (capture, else ingest) to the last Firestore write, or to the handled result without one"""
+    end = record["finished_at"]
+    for span in record["spans"]:
+        if span["name"] == "write" and span["start"] is not None:
+            end = max(end, span["start"] + span["ms"] / 1000)
+    return 1000 * (end - record["origin"])
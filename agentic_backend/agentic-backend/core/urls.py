@@ -16,9 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from .views import AnalyzeImage
+from .views import AnalyzeImage, FrameStatus, Metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/v1/analyze/', AnalyzeImage.as_view(), name="api")
+    path('api/v1/analyze/', AnalyzeImage.as_view(), name="api"),
+    path('api/v1/frames/<str:frame_id>/', FrameStatus.as_view(), name="frame-status"),
+    path('metrics', Metrics.as_view(), name="metrics")
 ]
@@ -1,13 +1,26 @@
 import os
-import json
 import time
+import uuid
+from django.http import HttpResponse
 from kafka import KafkaProducer
 from kafka.errors import NoBrokersAvailable
 from rest_framework.views import APIView
 from rest_framework.response import Response
-import base64
+from .blob_store import blob_store_from_env
+from .delivery_tracker import DeliveryTracker
+from .frame_format import encode_frame, encode_frame_reference, encode_legacy_frame
+from .metrics import DELIVERY_SECONDS, INGESTED, PRODUCE_SECONDS, STAGE_SECONDS, exposition, label
+from .tracing import start_trace
 
 producer = None
+delivery_tracker = DeliveryTracker(max_entries=int(os.getenv("DELIVERY_TRACKER_SIZE", "10000")))
+
+# "binary" (raw bytes + Kafka headers) or "json" (legacy base64-in-JSON)
+FRAME_FORMAT = os.getenv("KAFKA_FRAME_FORMAT", "binary")
+
+# Claim check: frames go to the shared blob store and Kafka carries only a reference
+CLAIM_CHECK_ENABLED = os.getenv("CLAIM_CHECK_ENABLED", "false").lower() == "true"
+blob_store = blob_store_from_env() if CLAIM_CHECK_ENABLED else None
 
 def get_producer():
     global producer
@@ -18,15 +31,25 @@ def get_producer():
                 retries=5,
                 linger_ms=10,
                 max_in_flight_requests_per_connection=1,
-                value_serializer=lambda v: json.dumps(v).encode('utf-8'),
             )
         except NoBrokersAvailable:
             producer = None
     return producer
 
 
+def _record_delivery(sent_at, organization, record_metadata):
+    DELIVERY_SECONDS.observe(time.perf_counter() - sent_at)
+    INGESTED.labels(organization=organization, outcome="delivered").inc()
+
+
+def _record_failure(organization, exception):
+    INGESTED.labels(organization=organization, outcome="failed").inc()
+
+
 class AnalyzeImage(APIView):
     def post(self, request):
+        # Optional capture time (epoch seconds) lets traces start at the camera
+        trace = start_trace(request.data.get("captured_at"))
         image_file = request.FILES.get("image")
         location = request.data.get("location", "Unknown Location")
         organization_id = request.data.get("organization_id", None)
@@ -36,21 +59,74 @@ class AnalyzeImage(APIView):
         if not organization_id:
             return Response({"error": "No organizaiton id sent"}, status=400)
 
-        # Convert image to base64 (so JSON can handle it)
-        image_bytes = base64.b64encode(image_file.read()).decode('utf-8')
+        image_bytes = image_file.read()
 
         kafka_producer = get_producer()
         if kafka_producer is None:
             return Response({"error": "Kafka broker not available"}, status=503)
 
-        message = {
-            "image": image_bytes,
+        frame_id = uuid.uuid4().hex
+        metadata = {
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
             "location": location,
             "organization_id": organization_id
         }
 
-        kafka_producer.send("images", value=message)
-        kafka_producer.flush()
+        blob_ref = None
+        if blob_store is not None:
+            started = time.perf_counter()
+            blob_ref = blob_store.put(image_bytes)
+            STAGE_SECONDS.labels(stage="blob_put").observe(time.perf_counter() - started)
+
+        # The trace's ingest span ends here, its queue span starts
+        trace["produced_at"] = time.time()
+        if blob_ref is not None:
+            value, headers = encode_frame_reference(
+                blob_ref, len(image_bytes), content_type=image_file.content_type, frame_id=frame_id, trace=trace,
+                **metadata
+            )
+        elif FRAME_FORMAT == "json":
+            value, headers = encode_legacy_frame(image_bytes, frame_id=frame_id, trace=trace, **metadata), None
+        else:
+            value, headers = encode_frame(
+                image_bytes, content_type=image_file.content_type, frame_id=frame_id, trace=trace, **metadata
+            )
+
+        # Keyed by camera so each camera's frames land on one partition, in order.
+        # send() only queues the frame; the callbacks record the broker's answer.
+        delivery_tracker.queued(frame_id, trace_id=trace["trace_id"], **metadata)
+        organization = label(organization_id)
+        sent_at = time.perf_counter()
+        future = kafka_producer.send("images", value=value, key=location.encode("utf-8"), headers=headers)
+        PRODUCE_SECONDS.observe(time.perf_counter() - sent_at)
+        future.add_callback(delivery_tracker.delivered, frame_id)
+        future.add_errback(delivery_tracker.failed, frame_id)
+        future.add_callback(_record_delivery, sent_at, organization)
+        future.add_errback(_record_failure, organization)
+
+        return Response(
+            {
+                "message": "Image queued for analysis",
+                "frame_id": frame_id,
+                "trace_id": trace["trace_id"],
+                "status_url": f"/api/v1/frames/{frame_id}/",
+                "metadata": metadata
+            },
+            status=202
+        )
+
+
+class FrameStatus(APIView):
+    def get(self, request, frame_id):
+        status = delivery_tracker.get(frame_id)
+        if status is None:
+            return Response({"error": "Unknown frame id"}, status=404)
+        return Response(status)
+
 
-        return Response({"message": "Image sent to Kafka", "metadata": message})
+class Metrics(APIView):
+    def get(self, request):
+        body, content_type = exposition()
+        if body is None:
+            return HttpResponse("prometheus_client is not installed\n", status=503, content_type="text/plain")
+        return HttpResponse(body, content_type=content_type)
@@ -0,0 +1,172 @@
+"""
+Worker pool for the Kafka consumer - runs frames concurrently while keeping
+frames from the same camera in order and tracking which offsets are safe to commit
+"""
+
+import logging
+import queue
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class OffsetTracker:
+    """
+    Tracks in-flight Kafka offsets per partition.
+
+    Frames finish out of order across workers, so an offset only becomes
+    committable once every earlier offset in the same partition is done.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}    # TopicPartition -> OrderedDict(offset -> done)
+        self._committable = {}  # TopicPartition -> next offset to commit
+
+    def track(self, tp, offset):
+        """Register an offset that has been handed to a worker"""
+        with self._lock:
+            self._in_flight.setdefault(tp, OrderedDict())[offset] = False
+
+    def complete(self, tp, offset):
+        """Mark an offset as fully processed and advance the commit point"""
+        with self._lock:
+            pending = self._in_flight.get(tp)
+            if pending is None or offset not in pending:
+                return
+            pending[offset] = True
+            while pending:
+                first, done = next(iter(pending.items()))
+                if not done:
+                    break
+                pending.popitem(last=False)
+                self._committable[tp] = first + 1
+
+    def pop_committable(self):
+        """Return {TopicPartition: offset} ready to commit and reset it"""
+        with self._lock:
+            points, self._committable = self._committable, {}
+            return points
+
+    def forget(self, partitions):
+        """Drop tracking for revoked partitions (their frames will be redelivered)"""
+        with self._lock:
+            for tp in partitions:
+                self._in_flight.pop(tp, None)
+                self._committable.pop(tp, None)
+
+    def in_flight(self):
+        """Number of offsets handed out but not yet completed"""
+        with self._lock:
+            return sum(
+                sum(1 for done in pending.values() if not done)
+                for pending in self._in_flight.values()
+            )
+
+
+class OrderedWorkerPool:
+    """
+    Fixed set of worker lanes. Every task carries a key (the camera location)
+    and all tasks with the same key run on the same lane, one after another,
+    so per-camera ordering is preserved while different cameras run in parallel.
+
+    In "thread" mode each lane runs tasks in its own thread. In "process" mode
+    each lane owns a single-process executor, so a camera always lands in the
+    same child process and any per-camera state there stays consistent.
+    """
+
+    def __init__(self, num_workers=4, mode="thread", initializer=None, initargs=()):
+        """
+        Args:
+            num_workers: Number of lanes (threads or child processes)
+            mode: "thread" or "process"
+            initializer: Optional callable run once in each child process
+            initargs: Arguments for the initializer
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode: {mode}")
+
+        self.num_workers = max(1, int(num_workers))
+        self.mode = mode
+        self._queues = [queue.Queue() for _ in range(self.num_workers)]
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._executors = []
+
+        if mode == "process":
+            self._executors = [
+                ProcessPoolExecutor(max_workers=1, initializer=initializer, initargs=initargs)
+                for _ in range(self.num_workers)
+            ]
+
+        self._threads = [
+            threading.Thread(target=self._run_lane, args=(i,), name=f"frame-worker-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _lane_for(self, key):
+        return zlib.crc32(str(key).encode("utf-8")) % self.num_workers
+
+    def submit(self, key, fn, args=(), callback=None):
+        """
+        Queue fn(*args) on the lane owning key.
+
+        Args:
+            key: Ordering key (frames with the same key run sequentially)
+            fn: Callable to run (must be picklable in process mode)
+            args: Positional arguments for fn
+            callback: Optional callback(result, error) run on the lane thread
+        """
+        with self._pending_lock:
+            self._pending += 1
+        self._queues[self._lane_for(key)].put((fn, args, callback))
+
+    def pending(self):
+        """Number of tasks queued or running"""
+        with self._pending_lock:
+            return self._pending
+
+    def _run_lane(self, index):
+        lane_queue = self._queues[index]
+        executor = self._executors[index] if self._executors else None
+
+        while True:
+            item = lane_queue.get()
+            if item is _STOP:
+                break
+
+            fn, args, callback = item
+            result, error = None, None
+            try:
+                if executor is not None:
+                    result = executor.submit(fn, *args).result()
+                else:
+                    result = fn(*args)
+            except Exception as e:
+                error = e
+
+            try:
+                if callback is not None:
+                    callback(result, error)
+            except Exception as e:
+                logger.error(f"Worker callback failed: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending -= 1
+
+    def shutdown(self, wait=True):
+        """Stop accepting work; with wait=True drain every queued task first"""
+        for lane_queue in self._queues:
+            lane_queue.put(_STOP)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        for executor in self._executors:
+            executor.shutdown(wait=wait)